@@ -1,11 +1,15 @@
+import io
 import os
-from datetime import datetime
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, WebRtcMode
 import av
 import queue
 from pydub import AudioSegment
 import numpy as np
+from feedback_audio import open_audio_store
+
+# Same audio store the app uses (the manifest path is the process-wide key)
+audio_store = open_audio_store(os.path.abspath("data/audio"), os.path.abspath("data/audio_manifest.json"))
 
 def audio_recorder():
     """Audio recorder component with fixes for local development"""
@@ -51,10 +55,6 @@ def audio_recorder():
         st.info("Saving recording...")
         
         try:
-            os.makedirs("data/audio", exist_ok=True)
-            audio_path = os.path.abspath(os.path.join("data/audio", 
-                f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"))
-            
             # Combine audio chunks with proper metadata
             audio_array = np.concatenate(list(audio_queue.queue))
             audio_segment = AudioSegment(
@@ -63,7 +63,9 @@ def audio_recorder():
                 sample_width=2,  # 16-bit
                 channels=1       # Mono
             )
-            audio_segment.export(audio_path, format="wav", bitrate="128k")
+            buffer = io.BytesIO()
+            audio_segment.export(buffer, format="wav", bitrate="128k")
+            audio_path = audio_store.save(buffer.getvalue(), "wav")
             
             # Update session state
             st.session_state.audio_file = audio_path
@@ -86,13 +88,8 @@ def audio_recorder():
                 st.warning("This file was already uploaded")
                 return
                 
-            os.makedirs("data/audio", exist_ok=True)
             ext = upload.name.split('.')[-1].lower()
-            audio_path = os.path.abspath(os.path.join("data/audio", 
-                f"upload_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"))
-            
-            with open(audio_path, "wb") as f:
-                f.write(upload.getvalue())
+            audio_path = audio_store.save(upload.getvalue(), ext)
                 
             st.session_state.audio_file = audio_path
             st.session_state.last_audio_file = audio_path
@@ -0,0 +1,150 @@
+import io
+import json
+import wave
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from feedback_audio import AudioStore
+from feedback_store import COMMENT_FIELDS, EXPECTED_COLUMNS, RATING_COLUMNS
+
+# Rows handed to save_many at a time while seeding a store
+SEED_BATCH = 50000
+
+# Answer options of the feedback form
+GROUP_TYPES = [
+    "Preschool / ECD Centre", "Primary School (Grade R–3)", "Primary School (Grade 4–7)",
+    "Special Needs School", "NGO / Community Group", "Other"
+]
+PROGRAMMES = ["Play Africa at Constitution Hill", "Outreach Programme", "Special Event or Pop‑Up", "Other"]
+COLLABORATION = ["Yes", "No", "Maybe"]
+
+# The form stores the chosen programmes as a JSON list; visits pick one or two
+PROGRAMME_CHOICES = [json.dumps([p]) for p in PROGRAMMES] + [
+    json.dumps([a, b]) for i, a in enumerate(PROGRAMMES) for b in PROGRAMMES[i + 1:]
+]
+
+# Real feedback leans positive
+RATING_WEIGHTS = [0.03, 0.05, 0.17, 0.35, 0.40]
+
+SCHOOL_PARTS = (
+    ["Sunrise", "Rainbow", "Thaba", "Ubuntu", "Hillside", "Riverside", "Kliptown", "Masakhane", "Lerato", "Acorn"],
+    ["Primary", "Preschool", "Academy", "Learning Centre", "Creche", "Community Project"],
+    ["Soweto", "Alexandra", "Braamfontein", "Tembisa", "Randburg", "Diepsloot", "Orlando", "Yeoville"],
+)
+
+COMMENT_PHRASES = [
+    "The children loved the building blocks and the water play area",
+    "Facilitators were patient and explained every activity clearly",
+    "Some learners were shy at first but joined in after a while",
+    "More shade outside would help on hot days",
+    "The storytelling session sparked lots of questions about the Constitution",
+    "We would recommend Play Africa to every school in our district",
+    "Please send the programme a week earlier so we can prepare",
+    "Our learners with special needs felt welcome and included",
+    "The role play corner was the favourite by far",
+    "It was a little crowded when two schools arrived together",
+    "Children kept talking about the visit for days afterwards",
+    "Ideas on recycling and the environment would be great next time",
+]
+
+# Share of answers left blank, per comment field
+BLANK_SHARE = {'enjoyed': 0.05, 'recommend': 0.05, 'collaboration': 0.1}
+
+
+def uuid4_strings(n: int, rng: np.random.Generator) -> list:
+    """`n` random version-4 UUIDs as text, reproducible from the generator's seed"""
+    raw = rng.integers(0, 256, (n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    text = raw.tobytes().hex()
+    return [
+        f"{text[i:i + 8]}-{text[i + 8:i + 12]}-{text[i + 12:i + 16]}-{text[i + 16:i + 20]}-{text[i + 20:i + 32]}"
+        for i in range(0, n * 32, 32)
+    ]
+
+
+def school_names(count: int, rng: np.random.Generator) -> list:
+    first, kind, place = (rng.choice(parts, count) for parts in SCHOOL_PARTS)
+    return [f"{a} {b}, {c}" for a, b, c in zip(first, kind, place)]
+
+
+def _comments(field: str, n: int, rng: np.random.Generator) -> np.ndarray:
+    text = rng.choice(COMMENT_PHRASES, n).astype(object)
+    # Longer answers add a second sentence
+    longer = rng.random(n) < 0.3
+    text[longer] = text[longer] + ". " + rng.choice(COMMENT_PHRASES, int(longer.sum()))
+    text[rng.random(n) < BLANK_SHARE.get(field, 0.45)] = None
+    return text
+
+
+def wav_stub(index: int, frames: int = 800) -> bytes:
+    """A short silent mono WAV; `index` is encoded in it so every stub is a distinct file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(index.to_bytes(8, "little") + b"\x00" * (frames * 2 - 8))
+    return buffer.getvalue()
+
+
+def write_audio_stubs(audio_store: AudioStore, count: int) -> list:
+    """Store `count` distinct audio stubs and return their paths"""
+    return [audio_store.save(wav_stub(i), "wav") for i in range(count)]
+
+
+def generate_submissions(n: int, seed: int = 0, days: int = 3 * 365, audio_paths: Optional[list] = None,
+                         audio_share: float = 0.02, end: Optional[datetime] = None) -> pd.DataFrame:
+    """`n` realistic submissions spread over the `days` before `end` (default now)
+
+    Each column is drawn in one vectorized call rather than row by row.
+    The same seed and `end` give the same rows, ids included.
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    offsets = np.sort(rng.integers(0, days * 86400, n))
+    timestamps = pd.to_datetime(start) + pd.to_timedelta(offsets, unit="s")
+    schools = school_names(max(50, n // 40), rng)
+
+    df = pd.DataFrame({
+        'id': uuid4_strings(n, rng),
+        'timestamp': timestamps.strftime('%Y-%m-%dT%H:%M:%S'),
+        'school': rng.choice(schools, n),
+        'group_type': rng.choice(GROUP_TYPES, n),
+        'children_no': rng.integers(5, 60, n),
+        'children_age': rng.choice(["3-5", "4-6", "6-9", "9-12", "5-12"], n),
+        'adults_present': rng.integers(1, 8, n),
+        # Visits are submitted on the day or up to a week later
+        'visit_date': (timestamps - pd.to_timedelta(rng.integers(0, 8, n), unit="D")).strftime('%Y-%m-%d'),
+        'programme': rng.choice(PROGRAMME_CHOICES, n),
+        'device_type': rng.choice(["mobile", "desktop"], n, p=[0.6, 0.4]),
+    })
+    for col in RATING_COLUMNS:
+        df[col] = rng.choice(np.arange(1, 6), n, p=RATING_WEIGHTS)
+    for field in COMMENT_FIELDS:
+        if field == 'collaboration':
+            answers = rng.choice(COLLABORATION, n).astype(object)
+            answers[rng.random(n) < BLANK_SHARE[field]] = None
+            df[field] = answers
+        else:
+            df[field] = _comments(field, n, rng)
+    df['audio_file'] = None
+    if audio_paths:
+        with_audio = np.flatnonzero(rng.random(n) < audio_share)
+        df.loc[with_audio, 'audio_file'] = rng.choice(audio_paths, len(with_audio))
+    return df[EXPECTED_COLUMNS]
+
+
+def to_entries(df: pd.DataFrame) -> list:
+    """Rows as the entry dicts the store takes, missing values as None"""
+    values = df.astype(object).where(df.notna(), None)
+    return [dict(zip(values.columns, row)) for row in values.itertuples(index=False, name=None)]
+
+
+def seed_store(store, df: pd.DataFrame, batch: int = SEED_BATCH) -> None:
+    for start in range(0, len(df), batch):
+        store.save_many(to_entries(df.iloc[start:start + batch]))
@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.generate import generate_submissions, seed_store, to_entries, write_audio_stubs
+from feedback_audio import AudioStore
+from feedback_backup import BackupEngine
+from feedback_store import invalidate_cache, open_store
+
+# Dataset sizes by label; 100k and 1m are opt-in since seeding them takes minutes
+SIZES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+DEFAULT_SIZES = ["1k", "10k"]
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# A p50 this much above the baseline (and at least REGRESSION_FLOOR seconds slower) is a regression
+REGRESSION_TOLERANCE = 0.25
+REGRESSION_FLOOR = 0.001
+
+# Every operation runs at least MIN_RUNS times, then until MAX_RUNS or its time budget (seconds) is used up
+MIN_RUNS = 3
+MAX_RUNS = 20
+TIME_BUDGET = 5.0
+
+
+def max_rss_mb() -> float:
+    """Peak resident memory of this process so far, 0 where it cannot be read"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def measure(fn, budget: float = TIME_BUDGET) -> dict:
+    """Latency percentiles (seconds) of repeated calls, plus the peak memory of one more call
+
+    The memory peak counts what Python and numpy allocate; Arrow-backed
+    string columns are not traced, so run_size also records the process's
+    peak resident memory.
+    """
+    times = []
+    started = time.perf_counter()
+    while len(times) < MIN_RUNS or (len(times) < MAX_RUNS and time.perf_counter() - started < budget):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    # Traced separately: tracemalloc slows the call down
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "runs": len(times),
+        "p50": float(np.percentile(times, 50)),
+        "p95": float(np.percentile(times, 95)),
+        "max": max(times),
+        "peak_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def cold(fn):
+    """Run `fn` with the process-wide frame cache emptied first, as after a restart"""
+    def run():
+        invalidate_cache()
+        return fn()
+    return run
+
+
+def operations(store, df, data_dir: str, seed: int) -> list:
+    """(name, callable) of every benchmarked operation
+
+    They mirror what the app does: a form submission, a batch from the
+    write-behind queue, the dashboard's loads, analytics, paging, search,
+    export and backup, and the delete/restore buttons.
+    """
+    rng = np.random.default_rng(seed)
+    ids = df['id'].tolist()
+    fresh = iter(to_entries(generate_submissions((MAX_RUNS + 2) * 101, seed=seed + 1)))
+    recent = ((datetime.now() - timedelta(days=90)).date(), datetime.now().date())
+    backups = BackupEngine(os.path.join(data_dir, "backups"))
+
+    def delete_restore():
+        row_id = ids[rng.integers(len(ids))]
+        store.delete(row_id)
+        store.restore(row_id)
+
+    return [
+        ("save", lambda: store.save(next(fresh))),
+        ("save_many_100", lambda: store.save_many([next(fresh) for _ in range(100)])),
+        ("load_all_cold", cold(lambda: store.load_submissions())),
+        ("load_all_warm", lambda: store.load_submissions()),
+        ("load_columns_cold", cold(lambda: store.load_submissions(['timestamp', 'school']))),
+        ("load_90_days_cold", cold(lambda: store.load_submissions(date_range=recent))),
+        ("analytics_rollups", lambda: store.rating_rollups()),
+        ("page_first", lambda: store.page_submissions(limit=20)),
+        ("count", lambda: store.count_submissions()),
+        ("search_comments", lambda: store.search_comments("children loved")),
+        ("export_scan", lambda: sum(len(chunk) for chunk in store.iter_submissions())),
+        ("delete_restore", delete_restore),
+        ("backup", lambda: backups.create_backup(store.data_files())),
+    ]
+
+
+def run_size(backend: str, label: str, seed: int, budget: float, keep: bool = False) -> dict:
+    size = SIZES[label]
+    work_dir = tempfile.mkdtemp(prefix=f"feedback-bench-{backend}-{label}-")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        audio_dir = os.path.join(data_dir, "audio")
+        os.makedirs(audio_dir)
+        audio_store = AudioStore(audio_dir, os.path.join(data_dir, "audio_manifest.json"))
+        audio_paths = write_audio_stubs(audio_store, min(200, max(10, size // 500)))
+        df = generate_submissions(size, seed=seed, audio_paths=audio_paths)
+
+        store = open_store(data_dir, backend)
+        store.migrate()
+        started = time.perf_counter()
+        seed_store(store, df)
+        results = {"seed_per_1k_rows": {"runs": 1, "p50": (time.perf_counter() - started) / size * 1000}}
+        for name, fn in operations(store, df, data_dir, seed):
+            results[name] = measure(fn, budget)
+        results["process_peak_rss"] = {"runs": 1, "p50": 0.0, "peak_mb": max_rss_mb()}
+        return results
+    finally:
+        if keep:
+            print(f"Kept benchmark data in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("results", {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_baseline(path: str, results: dict) -> None:
+    """Merge results into the baseline file; sizes not run this time keep their old numbers"""
+    merged = {**load_baseline(path), **results}
+    with open(path, "w") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "results": merged
+        }, f, indent=2, sort_keys=True)
+
+
+def is_regression(result: dict, base: dict, tolerance: float) -> bool:
+    return (
+        result["p50"] > base["p50"] * (1 + tolerance)
+        and result["p50"] - base["p50"] > REGRESSION_FLOOR
+    )
+
+
+def report(key: str, results: dict, baseline: dict, tolerance: float) -> list:
+    """Print one dataset's results and return the names of regressed operations"""
+    print(f"\n{key}")
+    print(f"  {'operation':<20} {'runs':>4} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'peak MB':>8}  vs baseline")
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(f"{key}/{name}")
+        comparison = ""
+        if base and result["p50"]:
+            comparison = f"{result['p50'] / base['p50']:.2f}x" if base["p50"] else ""
+            if is_regression(result, base, tolerance):
+                comparison += "  REGRESSION"
+                regressions.append(f"{key}/{name}")
+        print(
+            f"  {name:<20} {result['runs']:>4} {result['p50'] * 1000:>10.2f} "
+            f"{result.get('p95', result['p50']) * 1000:>10.2f} {result.get('max', result['p50']) * 1000:>10.2f} "
+            f"{result.get('peak_mb', 0):>8.2f}  {comparison}"
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the submission store on synthetic data (run from the repository root: "
+                    "python -m benchmarks.run)"
+    )
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help=f"Comma-separated dataset sizes out of {', '.join(SIZES)} (default: {','.join(DEFAULT_SIZES)})")
+    parser.add_argument("--backends", default="csv,sqlite", help="Comma-separated storage backends (default: csv,sqlite)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the data generator")
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET, help="Seconds spent repeating each operation")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Record these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="Allowed p50 slowdown against the baseline, as a fraction")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data directories")
+    args = parser.parse_args(argv)
+
+    labels = [label.strip().lower() for label in args.sizes.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+    backends = [backend.strip().lower() for backend in args.backends.split(",") if backend.strip()]
+
+    baseline = load_baseline(args.baseline)
+    results, regressions = {}, []
+    for backend in backends:
+        for label in labels:
+            key = f"{backend}/{label}"
+            size_results = run_size(backend, label, args.seed, args.budget, args.keep)
+            regressions += report(key, size_results, baseline, args.tolerance)
+            results.update({f"{key}/{name}": result for name, result in size_results.items()})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,40 +5,36 @@ from datetime import datetime
 import os
 from streamlit_lottie import st_lottie
 import altair as alt
-import numpy as np
 from PIL import Image
 import qrcode
 import base64
 from io import BytesIO
 import hashlib
-import shutil
 from typing import Optional, Tuple
 from streamlit.components.v1 import html
 import platform
 import uuid
+from feedback_store import CACHE_STATS, EXPECTED_COLUMNS, lock_stats, open_store
+from feedback_backup import BackupEngine
+from feedback_queue import open_queue
+from feedback_audio import open_audio_store
+from feedback_export import export_file
+from feedback_timing import open_timer
+from feedback_metrics import open_metrics
 from audio_recorder import audio_recorder
 
 # Constants - using absolute paths for reliability
 DATA_DIR = os.path.abspath("data")
-SUBMISSIONS_FILE = os.path.join(DATA_DIR, "submissions.csv")
 AUDIO_DIR = os.path.join(DATA_DIR, "audio")
 BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+EXPORT_DIR = os.path.join(DATA_DIR, "exports")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
-DELETED_ENTRIES_FILE = os.path.join(DATA_DIR, "deleted_entries.csv")
 
 # Ensure directories exist with proper permissions
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-# Define expected columns for submissions, including 'id' as first column
-EXPECTED_COLUMNS = [
-    'id', 'timestamp', 'school', 'group_type', 'children_no', 'children_age',
-    'adults_present', 'visit_date', 'programme', 'engagement', 'safety',
-    'cleanliness', 'fun', 'learning', 'planning', 'safety_space', 'comments',
-    'audio_file', 'device_type'
-]
-
 def init_session():
     """Initialize audio session state"""
     if 'audio_initialized' not in st.session_state:
@@ -56,16 +52,6 @@ init_session()
 def initialize_data_files():
     """Initialize data files with proper structure and permissions"""
     try:
-        # Initialize submissions file
-        if not os.path.exists(SUBMISSIONS_FILE) or os.path.getsize(SUBMISSIONS_FILE) == 0:
-            pd.DataFrame(columns=EXPECTED_COLUMNS).to_csv(SUBMISSIONS_FILE, index=False)
-            os.chmod(SUBMISSIONS_FILE, 0o666)
-        
-        # Initialize deleted entries file
-        if not os.path.exists(DELETED_ENTRIES_FILE) or os.path.getsize(DELETED_ENTRIES_FILE) == 0:
-            pd.DataFrame(columns=EXPECTED_COLUMNS).to_csv(DELETED_ENTRIES_FILE, index=False)
-            os.chmod(DELETED_ENTRIES_FILE, 0o666)
-        
         # Initialize users file
         if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
             with open(USERS_FILE, "w") as f:
@@ -83,22 +69,50 @@ def initialize_data_files():
     except Exception as e:
         st.error(f"Initialization error: {str(e)}")
 
-def ensure_ids_in_datafiles():
-    for csvfile in [SUBMISSIONS_FILE, DELETED_ENTRIES_FILE]:
-        if os.path.exists(csvfile) and os.path.getsize(csvfile) > 0:
-            df = pd.read_csv(csvfile)
-            # If id column is missing, add new UUIDs
-            if 'id' not in df.columns:
-                df['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
-            else:
-                # If id column is present but blank, fill with UUIDs
-                df['id'] = [i if pd.notna(i) and str(i).strip() and str(i) != "nan" else str(uuid.uuid4()) for i in df['id']]
-            df.to_csv(csvfile, index=False)
-ensure_ids_in_datafiles()
-
 # Initialize data files at startup
 initialize_data_files()
 
+# Storage backend shared by all data functions
+store = open_store(DATA_DIR)
+
+# Incremental backups of the data files under BACKUP_DIR
+backups = BackupEngine(BACKUP_DIR)
+
+def run_schema_migrations():
+    """Finish a write interrupted by a crash, then apply pending storage migrations once"""
+    try:
+        store.recover()
+        store.migrate()
+    except Exception as e:
+        st.error(f"Migration error: {str(e)}")
+run_schema_migrations()
+
+# Submissions are journaled and written to the store in batches by a background thread
+writer = open_queue(store, os.path.join(DATA_DIR, "queue"))
+
+# Content-addressed recordings in AUDIO_DIR and their manifest, so audio checks do not stat every file
+audio_store = open_audio_store(AUDIO_DIR, os.path.join(DATA_DIR, "audio_manifest.json"))
+
+# Rolling render timings of the app's sections, shown on the admin Performance page
+timer = open_timer()
+
+# Prometheus metrics of this process, served on FEEDBACK_METRICS_PORT and/or written to FEEDBACK_METRICS_FILE
+metrics = open_metrics(store, timer, DATA_DIR, writer)
+
+def sync_audio_references():
+    """Count which recordings stored submissions reference (once, after upgrading)"""
+    try:
+        if audio_store.needs_recount():
+            writer.flush()
+            paths = pd.concat([
+                store.load_submissions(['audio_file'])['audio_file'],
+                store.load_deleted_entries(['audio_file'])['audio_file']
+            ])
+            audio_store.recount(paths.dropna().tolist())
+    except Exception as e:
+        st.error(f"Audio reference count error: {str(e)}")
+sync_audio_references()
+
 def is_mobile():
     """Detect if user is on a mobile device"""
     try:
@@ -143,24 +157,18 @@ def mobile_adjusted_text_area(label, value="", height=100, key=None, placeholder
         return st.text_area(label, value, height=max(80, height//2), key=key, placeholder=placeholder)
     return st.text_area(label, value, height=height, key=key, placeholder=placeholder)
 
+@timer.timed("backup")
 def create_backup() -> bool:
-    """Create a backup of submissions with verification"""
+    """Take an incremental, deduplicated backup of the data files
+
+    Returns False when nothing changed since the last snapshot.
+    """
     try:
-        if not os.path.exists(SUBMISSIONS_FILE):
-            return False
-            
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"backup_{timestamp}.csv")
-        
-        shutil.copy2(SUBMISSIONS_FILE, backup_path)
-        os.chmod(backup_path, 0o666)
-        
-        # Verify backup was created
-        if not os.path.exists(backup_path):
-            raise Exception("Backup file not created")
-            
-        return True
+        writer.flush()
+        sources = store.data_files()
+        sources["users.json"] = USERS_FILE
+        sources["audio_manifest.json"] = audio_store.manifest_file
+        return backups.create_backup(sources) is not None
     except Exception as e:
         st.error(f"Backup failed: {str(e)}")
         return False
@@ -174,131 +182,146 @@ def load_lottiefile(filepath: str) -> Optional[dict]:
         st.error(f"Error loading Lottie file: {str(e)}")
         return None
 
+@timer.timed("save_submission")
 def save_submission(entry: dict) -> bool:
-    """Save submission with proper validation and error handling"""
+    """Queue a submission for writing; returns once it is safely journaled"""
     try:
         # Set a unique id if not already set
         if not entry.get('id'):
             entry['id'] = str(uuid.uuid4())
             
-        # Ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in entry:
-                entry[col] = None
-        
-        # Clean and validate data
-        entry = {k: (v.strip() if isinstance(v, str) else v) for k, v in entry.items()}
-        
-        # Load existing data
-        if os.path.exists(SUBMISSIONS_FILE) and os.path.getsize(SUBMISSIONS_FILE) > 0:
-            existing_df = pd.read_csv(SUBMISSIONS_FILE)
-            # Ensure all columns exist in the existing data
-            for col in EXPECTED_COLUMNS:
-                if col not in existing_df.columns:
-                    existing_df[col] = None
-        else:
-            existing_df = pd.DataFrame(columns=EXPECTED_COLUMNS)
-        
-        # Create new DataFrame with the entry
-        new_df = pd.DataFrame([entry])
-        
-        # Combine with existing data
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        
-        # Save to file
-        combined_df.to_csv(SUBMISSIONS_FILE, index=False)
-        os.chmod(SUBMISSIONS_FILE, 0o666)  # Ensure proper permissions
-        
+        # Referenced before it is queued, so the orphan sweep can never remove it in between
+        audio_store.acquire(entry.get('audio_file'))
+        try:
+            writer.submit(entry)
+        except Exception:
+            # The upload stays on disk so the visitor can submit again
+            audio_store.release(entry.get('audio_file'), remove=False)
+            raise
         return True
     except Exception as e:
         st.error(f"Error saving submission: {str(e)}")
         return False
 
-def load_submissions() -> pd.DataFrame:
-    """Load submissions with robust error handling"""
+@timer.timed("load_submissions")
+def load_submissions(columns: Optional[list] = None, date_range: Optional[tuple] = None) -> pd.DataFrame:
+    """Load submissions (only `columns`, and only within `date_range`, if given) with robust error handling"""
     try:
-        if not os.path.exists(SUBMISSIONS_FILE) or os.path.getsize(SUBMISSIONS_FILE) == 0:
-            return pd.DataFrame(columns=EXPECTED_COLUMNS)
-            
-        df = pd.read_csv(SUBMISSIONS_FILE)
-        
-        # Ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in df.columns:
-                df[col] = None
+        # Write queued submissions first so they show up
+        writer.flush()
+        df = store.load_submissions(columns, date_range=date_range)
                 
-        # Validate audio file paths
+        # Validate audio file paths against the audio manifest
         if 'audio_file' in df.columns:
-            df['audio_file'] = df['audio_file'].apply(
-                lambda x: x if isinstance(x, str) and os.path.exists(x) else None
-            )
+            df['audio_file'] = df['audio_file'].where(df['audio_file'].isin(audio_store.paths()), None)
             
         return df
     except Exception as e:
         st.error(f"Error loading submissions: {str(e)}")
-        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        return pd.DataFrame(columns=columns or EXPECTED_COLUMNS)
 
-def load_deleted_entries() -> pd.DataFrame:
-    """Load deleted entries with validation"""
+def load_deleted_entries(columns: Optional[list] = None) -> pd.DataFrame:
+    """Load deleted entries (only `columns` if given) with validation"""
     try:
-        if not os.path.exists(DELETED_ENTRIES_FILE) or os.path.getsize(DELETED_ENTRIES_FILE) == 0:
-            return pd.DataFrame(columns=EXPECTED_COLUMNS)
-            
-        df = pd.read_csv(DELETED_ENTRIES_FILE)
-        
-        # Ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in df.columns:
-                df[col] = None
-        
-        # Clean IDs by stripping whitespace
-        if 'id' in df.columns:
-            df['id'] = df['id'].astype(str).str.strip()
-                
-        return df
+        writer.flush()
+        return store.load_deleted_entries(columns)
     except Exception as e:
         st.error(f"Error loading deleted entries: {str(e)}")
-        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        return pd.DataFrame(columns=columns or EXPECTED_COLUMNS)
+
+def load_submission_page(columns: Optional[list] = None, deleted: bool = False, after: Optional[tuple] = None,
+                         limit: int = 10, date_range: Optional[tuple] = None, filters: Optional[dict] = None,
+                         with_comments: bool = False) -> Tuple[pd.DataFrame, Optional[tuple]]:
+    """One page of submissions (newest first) and the cursor of the next page"""
+    try:
+        writer.flush()
+        df, cursor = store.page_submissions(
+            columns, deleted=deleted, after=after, limit=limit,
+            date_range=date_range, filters=filters, with_comments=with_comments
+        )
+        if 'audio_file' in df.columns:
+            df['audio_file'] = df['audio_file'].where(df['audio_file'].isin(audio_store.paths()), None)
+        return df, cursor
+    except Exception as e:
+        st.error(f"Error loading submissions: {str(e)}")
+        return pd.DataFrame(columns=columns or EXPECTED_COLUMNS), None
+
+def count_submissions(deleted: bool = False, date_range: Optional[tuple] = None,
+                      filters: Optional[dict] = None, with_comments: bool = False) -> int:
+    """Number of submissions the matching pages hold"""
+    try:
+        writer.flush()
+        return store.count_submissions(deleted=deleted, date_range=date_range, filters=filters,
+                                       with_comments=with_comments)
+    except Exception as e:
+        st.error(f"Error counting submissions: {str(e)}")
+        return 0
+
+def load_matching_ids(deleted: bool = False, date_range: Optional[tuple] = None,
+                      filters: Optional[dict] = None, with_comments: bool = False) -> list:
+    """Ids of every submission the matching pages hold, for bulk actions beyond one page"""
+    try:
+        writer.flush()
+        return store.submission_ids(deleted=deleted, date_range=date_range, filters=filters,
+                                    with_comments=with_comments)
+    except Exception as e:
+        st.error(f"Error loading submission ids: {str(e)}")
+        return []
+
+def export_data(deleted: bool = False, fmt: str = "csv", compress: bool = False,
+                filters: Optional[dict] = None, date_range: Optional[tuple] = None) -> Optional[str]:
+    """Stream active (or deleted) submissions into a temporary export file and return its path
+
+    Filters are applied by the store while reading, so only matching rows
+    are serialized. Returns None when there is nothing to export.
+    Only writing the file is flat in memory: st.download_button reads the
+    whole file into memory to serve it, so large exports should be compressed.
+    """
+    try:
+        writer.flush()
+        name = "deleted_feedback" if deleted else "feedback"
+        chunks = store.iter_submissions(deleted=deleted, date_range=date_range, filters=filters)
+        return export_file(chunks, EXPORT_DIR, name, fmt=fmt, compress=compress)
+    except Exception as e:
+        st.error(f"Export failed: {str(e)}")
+        return None
+
+def load_rating_rollups() -> dict:
+    """Per-category rating counts, sums and histograms for the analytics section"""
+    try:
+        writer.flush()
+        return store.rating_rollups()
+    except Exception as e:
+        st.error(f"Error loading rating summary: {str(e)}")
+        return {"submissions": 0, "ratings": {}}
+
+def get_submission_by_id(row_id: str) -> Optional[dict]:
+    """Look up a single submission by id without loading the whole dataset"""
+    try:
+        writer.flush()
+        return store.get(row_id)
+    except Exception as e:
+        st.error(f"Error loading submission: {str(e)}")
+        return None
+
+def delete_audio_file(audio_file) -> None:
+    """Release a permanently removed submission's recording; the file goes with its last reference"""
+    if audio_file and isinstance(audio_file, str):
+        try:
+            audio_store.release(audio_file)
+        except Exception as e:
+            st.error(f"Error deleting audio file: {str(e)}")
 
 def delete_submission_by_id(row_id: str, permanent: bool = False) -> bool:
     """Delete a submission by its unique id"""
     try:
-        df = load_submissions()
-        match = df[df['id'] == row_id]
-        if match.empty:
+        row = store.purge(row_id) if permanent else store.delete(row_id)
+        if row is None:
             st.error("Row not found!")
             return False
             
-        idx = match.index[0]
-        row_to_delete = df.loc[idx].copy()
-        audio_file = row_to_delete['audio_file']
-        
         if permanent:
-            # Remove from deleted_entries if it exists there
-            deleted_df = load_deleted_entries()
-            match_deleted = deleted_df[deleted_df['id'] == row_id]
-            if not match_deleted.empty:
-                deleted_df = deleted_df.drop(match_deleted.index)
-                deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-                os.chmod(DELETED_ENTRIES_FILE, 0o666)
-                
-            # Delete audio file if it exists
-            if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
-                try:
-                    os.remove(audio_file)
-                except Exception as e:
-                    st.error(f"Error deleting audio file: {str(e)}")
-        else:
-            # Move to deleted entries
-            deleted_df = load_deleted_entries()
-            deleted_df = pd.concat([deleted_df, pd.DataFrame([row_to_delete])], ignore_index=True)
-            deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-            os.chmod(DELETED_ENTRIES_FILE, 0o666)
-            
-        # Remove from main submissions
-        df = df.drop(idx)
-        df.to_csv(SUBMISSIONS_FILE, index=False)
-        os.chmod(SUBMISSIONS_FILE, 0o666)
+            delete_audio_file(row.get('audio_file'))
         return True
     except Exception as e:
         st.error(f"Deletion failed: {str(e)}")
@@ -307,55 +330,59 @@ def delete_submission_by_id(row_id: str, permanent: bool = False) -> bool:
 def restore_deleted_entry_by_id(row_id: str) -> bool:
     """Restore a deleted entry by its unique id"""
     try:
-        deleted_df = load_deleted_entries()
-        match = deleted_df[deleted_df['id'] == row_id]
-        if match.empty:
+        if store.restore(row_id) is None:
             st.error("Row not found!")
             return False
-            
-        idx = match.index[0]
-        entry = deleted_df.loc[idx].copy().to_dict()
-        
-        # Save to main submissions
-        if save_submission(entry):
-            # Remove from deleted entries
-            deleted_df = deleted_df.drop(idx)
-            deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-            os.chmod(DELETED_ENTRIES_FILE, 0o666)
-            return True
+        return True
     except Exception as e:
         st.error(f"Error restoring entry: {str(e)}")
     return False
 
 def permanently_delete_deleted_entry_by_id(row_id: str) -> bool:
-    """Permanently delete an entry from the deleted entries file by id."""
+    """Permanently delete a soft-deleted entry by id."""
     try:
-        deleted_df = load_deleted_entries()
-        match = deleted_df[deleted_df['id'] == row_id]
-        if match.empty:
+        row = store.purge(row_id, deleted=True)
+        if row is None:
             st.error("Row not found!")
             return False
 
-        idx = match.index[0]
-        row_to_delete = deleted_df.loc[idx].copy()
-        audio_file = row_to_delete['audio_file']
-
-        # Remove from deleted_entries
-        deleted_df = deleted_df.drop(idx)
-        deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-        os.chmod(DELETED_ENTRIES_FILE, 0o666)
-
-        # Optionally, delete audio file
-        if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
-            try:
-                os.remove(audio_file)
-            except Exception as e:
-                st.error(f"Error deleting audio file: {str(e)}")
+        delete_audio_file(row.get('audio_file'))
         return True
     except Exception as e:
         st.error(f"Permanent deletion failed: {str(e)}")
     return False
 
+def delete_submissions_by_ids(row_ids: list, permanent: bool = False) -> int:
+    """Delete several submissions in a single write and return how many were removed"""
+    try:
+        rows = store.purge_many(row_ids) if permanent else store.delete_many(row_ids)
+        if permanent:
+            for row in rows:
+                delete_audio_file(row.get('audio_file'))
+        return len(rows)
+    except Exception as e:
+        st.error(f"Bulk deletion failed: {str(e)}")
+        return 0
+
+def restore_deleted_entries_by_ids(row_ids: list) -> int:
+    """Restore several deleted entries in a single write and return how many were restored"""
+    try:
+        return len(store.restore_many(row_ids))
+    except Exception as e:
+        st.error(f"Bulk restore failed: {str(e)}")
+        return 0
+
+def permanently_delete_deleted_entries_by_ids(row_ids: list) -> int:
+    """Permanently delete several soft-deleted entries in a single write"""
+    try:
+        rows = store.purge_many(row_ids, deleted=True)
+        for row in rows:
+            delete_audio_file(row.get('audio_file'))
+        return len(rows)
+    except Exception as e:
+        st.error(f"Bulk permanent deletion failed: {str(e)}")
+        return 0
+
 def generate_qr_code(data: str) -> Tuple[str, Image.Image]:
     """Generate QR code from data"""
     try:
@@ -435,6 +462,71 @@ def show_confirmation_dialog(action: str, count: int) -> bool:
                 return False
     return False
 
+def select_rows_table(display_df: pd.DataFrame, key: str) -> list:
+    """Show rows with a selection checkbox column and return the selected ids"""
+    select_all = st.checkbox("Select all", key=f"{key}_select_all")
+    editor_df = display_df.copy()
+    editor_df.insert(0, 'Select', select_all)
+    edited_df = st.data_editor(
+        editor_df,
+        hide_index=True,
+        use_container_width=True,
+        disabled=[col for col in editor_df.columns if col != 'Select'],
+        column_config={'id': None},
+        key=f"{key}_editor"
+    )
+    return edited_df.loc[edited_df['Select'], 'id'].tolist()
+
+def select_bulk_ids(display_df: pd.DataFrame, key: str, total: int, deleted: bool = False) -> list:
+    """Ids a bulk action applies to: the rows ticked on this page, or every matching entry"""
+    if st.checkbox(f"Select all {total} matching entries", key=f"{key}_all_matching"):
+        st.caption("The action applies to every matching entry, not only the rows of this page.")
+        return load_matching_ids(deleted=deleted)
+    return select_rows_table(display_df, key)
+
+def page_cursors(key: str, signature) -> list:
+    """Keyset cursors of the pages visited so far (None for the first page)
+
+    Paging starts over when `signature` (page size, filters) changes.
+    """
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+    return st.session_state[f"{key}_cursors"]
+
+def show_pager(key: str, next_cursor: Optional[tuple], total: int, page_size: int) -> None:
+    """Newer/Older buttons stepping through the cursors kept by page_cursors()"""
+    cursors = st.session_state[f"{key}_cursors"]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Newer", key=f"{key}_newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.markdown(f"Page {len(cursors)} of {max(1, -(-total // page_size))} ({total} entries)")
+    with col3:
+        if st.button("Older ➡️", key=f"{key}_older", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def confirm_bulk_action(action: str, selected_ids: list, key: str) -> bool:
+    """Two-step confirmation for a bulk action; True once confirmed"""
+    if st.button(f"{action} Selected ({len(selected_ids)})", key=f"{key}_btn", disabled=not selected_ids):
+        st.session_state[f"pending_{key}"] = True
+    if st.session_state.get(f"pending_{key}", False) and selected_ids:
+        st.warning(f"You are about to {action.lower()} {len(selected_ids)} feedback submission(s).")
+        col1, col2 = st.columns(2)
+        with col1:
+            confirm = st.button(f"✅ Confirm {action}", key=f"{key}_confirm")
+        with col2:
+            cancel = st.button("❌ Cancel", key=f"{key}_cancel")
+        if cancel:
+            st.session_state[f"pending_{key}"] = False
+        if confirm:
+            st.session_state[f"pending_{key}"] = False
+            return True
+    return False
+
 def play_audio(filename: str) -> None:
     """Fixed audio playback with absolute path handling"""
     if not filename or not isinstance(filename, str):
@@ -464,6 +556,7 @@ def play_audio(filename: str) -> None:
     except Exception as e:
         st.error(f"Playback error: {str(e)}")
 
+@timer.timed("authenticate")
 def authenticate() -> bool:
     """Handle user authentication"""
     if 'authenticated' not in st.session_state:
@@ -474,6 +567,7 @@ def authenticate() -> bool:
         st.session_state.username = None
 
     if not st.session_state.authenticated:
+        timer.section("login_page")
         try:
             moonkids_img = Image.open("play_africa_mag.jpg")
             paintingkids_img = Image.open("play2.jpg")
@@ -686,6 +780,7 @@ def show_home() -> None:
     qr_url = "https://play-africa-feedback-form.streamlit.app/"
     show_qr_code(qr_url)
 
+@timer.timed("feedback")
 def show_feedback() -> None:
     """Show feedback form"""
     # Restore audio_file from backup if needed
@@ -693,6 +788,7 @@ def show_feedback() -> None:
        ("last_audio_file" in st.session_state and st.session_state.last_audio_file):
         st.session_state.audio_file = st.session_state.last_audio_file
     colors = get_theme_colors()
+    timer.section("header")
     
     if is_mobile():
         st.markdown(f"<h2 style='color:{colors['text']}'>Play Africa Feedback</h2>", unsafe_allow_html=True)
@@ -708,6 +804,7 @@ def show_feedback() -> None:
         </div>
         """, unsafe_allow_html=True)
     
+    timer.section("audio_upload")
     st.markdown(f"<h3 style='color:{colors['text']}; font-size: {'18px' if is_mobile() else '20px'}'>Children's Voice</h3>", unsafe_allow_html=True)
     
     # Use the new audio recorder
@@ -720,6 +817,7 @@ def show_feedback() -> None:
         except Exception as e:
             st.error(f"Error playing recording: {str(e)}")
 
+    timer.section("form")
     with st.form("feedback_form", clear_on_submit=True):
         st.markdown(f"<h3 style='color:{colors['text']}; font-size: {'18px' if is_mobile() else '20px'}'>About Your Group</h3>", unsafe_allow_html=True)
         
@@ -882,7 +980,9 @@ def show_feedback() -> None:
                     "device_type": "mobile" if is_mobile() else "desktop"
                 }
                 
-                if save_submission(entry):
+                with timer.span("feedback/save"):
+                    saved = save_submission(entry)
+                if saved:
                     st.success("Thank you for your feedback!")
                     st.balloons()
                     
@@ -906,11 +1006,13 @@ def show_feedback() -> None:
                     </div>
                     """, unsafe_allow_html=True)
 
+@timer.timed("dashboard")
 def show_dashboard() -> None:
     """Show admin dashboard with UUID-based deletion/restoration"""
     colors = get_theme_colors()
     st.markdown(f"<h1 style='color:{colors['text']}'>Feedback Dashboard</h1>", unsafe_allow_html=True)
     
+    timer.section("backup")
     if create_backup():
         st.toast("Backup created successfully", icon="✅")
     
@@ -918,12 +1020,17 @@ def show_dashboard() -> None:
     
     tab1, tab2 = st.tabs(["Active Feedback", "Deleted Feedback"])
     
+    timer.section("active_tab")
     with tab1:
-        df = load_submissions()
-        if df.empty:
+        display_cols = ['timestamp', 'school', 'group_type', 'children_no', 'children_age', 'adults_present', 'id', 'audio_file']
+        total = count_submissions()
+        if total == 0:
             st.info("No feedback submitted yet. Please check back later!")
         else:
-            display_cols = ['timestamp', 'school', 'group_type', 'children_no', 'children_age', 'adults_present', 'id']
+            # Only the rows of the current page are loaded
+            page_size = st.selectbox('Rows per page', [5, 10, 20, 50], index=1, key='active_page_size')
+            cursors = page_cursors("active_page", page_size)
+            df, next_cursor = load_submission_page(display_cols, after=cursors[-1], limit=page_size)
             for col in display_cols:
                 if col not in df.columns:
                     df[col] = 'N/A'
@@ -945,24 +1052,34 @@ def show_dashboard() -> None:
                 except:
                     pass
             
-            page_size = st.selectbox('Rows per page', [5, 10, 20, 50], index=1, key='active_page_size')
-            page_number = st.number_input('Page', min_value=1, max_value=max(1, len(display_df)//page_size + 1), 
-                                        value=1, key='active_page')
-            start_idx = (page_number - 1) * page_size
-            end_idx = min(start_idx + page_size, len(display_df))
+            with st.expander("☑️ Bulk Actions", expanded=False):
+                selected_ids = select_bulk_ids(display_df.drop(columns=['audio_file']), "active_bulk", total)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if confirm_bulk_action("Delete", selected_ids, "bulk_delete"):
+                        count = delete_submissions_by_ids(selected_ids)
+                        if count:
+                            st.success(f"{count} entries deleted")
+                            st.rerun()
+                with col2:
+                    if confirm_bulk_action("Permanently Delete", selected_ids, "bulk_perm_delete"):
+                        count = delete_submissions_by_ids(selected_ids, permanent=True)
+                        if count:
+                            st.success(f"{count} entries permanently deleted")
+                            st.rerun()
             
-            table_data = display_df.iloc[start_idx:end_idx] if not display_df.empty else display_df
+            show_pager("active_page", next_cursor, total, page_size)
             
-            for idx, row in table_data.iterrows():
+            for idx, row in display_df.iterrows():
                 row_id = row['id']
                 with st.expander(f"{row['Date']} - {row['Submitted by']}"):
                     st.write(f"Group Type: {row['Group Type']}")
                     st.write(f"Children: {row['Children']} (ages {row['Ages']})")
                     st.write(f"Adults: {row['Adults']}")
                     
-                    # Find audio file from df using id:
-                    audio_file = df.loc[df['id'] == row_id, 'audio_file'].values[0] if 'audio_file' in df.columns else None
-                    if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
+                    # The page already carries the audio path, checked against the manifest
+                    audio_file = row['audio_file']
+                    if audio_store.has(audio_file):
                         st.markdown("**Children's Voice Recording:**")
                         play_audio(audio_file)
                     else:
@@ -1000,10 +1117,17 @@ def show_dashboard() -> None:
                                 if cancel_perm:
                                     st.session_state[f"pending_perm_delete_{row_id}"] = False
     
+    timer.section("deleted_tab")
     with tab2:
-        deleted_df = load_deleted_entries()
-        if not deleted_df.empty:
-            deleted_display = deleted_df[['timestamp', 'school', 'group_type', 'id']].copy()
+        deleted_total = count_submissions(deleted=True)
+        if deleted_total > 0:
+            deleted_page_size = st.selectbox('Rows per page', [5, 10], index=0, key='deleted_page_size')
+            deleted_cursors = page_cursors("deleted_page", deleted_page_size)
+            deleted_df, deleted_next_cursor = load_submission_page(
+                ['timestamp', 'school', 'group_type', 'id', 'audio_file'], deleted=True,
+                after=deleted_cursors[-1], limit=deleted_page_size
+            )
+            deleted_display = deleted_df[['timestamp', 'school', 'group_type', 'id', 'audio_file']].copy()
             deleted_display = deleted_display.rename(columns={
                 'timestamp': 'Date',
                 'school': 'Submitted by',
@@ -1017,22 +1141,32 @@ def show_dashboard() -> None:
                 except:
                     pass
             
-            deleted_page_size = st.selectbox('Rows per page', [5, 10], index=0, key='deleted_page_size')
-            deleted_page_number = st.number_input('Page', min_value=1, 
-                                                max_value=max(1, len(deleted_display)//deleted_page_size + 1), 
-                                                value=1, key='deleted_page')
-            deleted_start_idx = (deleted_page_number - 1) * deleted_page_size
-            deleted_end_idx = min(deleted_start_idx + deleted_page_size, len(deleted_display))
+            with st.expander("☑️ Bulk Actions", expanded=False):
+                selected_deleted_ids = select_bulk_ids(deleted_display.drop(columns=['audio_file']), "deleted_bulk",
+                                                       deleted_total, deleted=True)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if confirm_bulk_action("Restore", selected_deleted_ids, "bulk_restore"):
+                        count = restore_deleted_entries_by_ids(selected_deleted_ids)
+                        if count:
+                            st.success(f"{count} entries restored")
+                            st.rerun()
+                with col2:
+                    if confirm_bulk_action("Permanently Delete", selected_deleted_ids, "bulk_perm_delete_deleted"):
+                        count = permanently_delete_deleted_entries_by_ids(selected_deleted_ids)
+                        if count:
+                            st.success(f"{count} entries permanently deleted")
+                            st.rerun()
             
-            deleted_table_data = deleted_display.iloc[deleted_start_idx:deleted_end_idx]
+            show_pager("deleted_page", deleted_next_cursor, deleted_total, deleted_page_size)
             
-            for idx, row in deleted_table_data.iterrows():
+            for idx, row in deleted_display.iterrows():
                 row_id = row['id']
                 with st.expander(f"{row['Date']} - {row['Submitted by']}"):
                     st.write(f"Group Type: {row['Group Type']}")
                     
-                    audio_file = deleted_df.loc[deleted_df['id'] == row_id, 'audio_file'].values[0] if 'audio_file' in deleted_df.columns else None
-                    if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
+                    audio_file = row['audio_file']
+                    if audio_store.has(audio_file):
                         st.markdown("**Children's Voice Recording:**")
                         play_audio(audio_file)
                     else:
@@ -1072,18 +1206,13 @@ def show_dashboard() -> None:
         else:
             st.info("No deleted entries to display")
     
+    timer.section("analytics")
     st.markdown(f"<h2 style='color:{colors['text']}'>Feedback Analytics</h2>", unsafe_allow_html=True)
     
-    df = load_submissions()
-    if not df.empty:
-        rating_columns = ["engagement", "safety", "cleanliness", "fun", "learning", "planning", "safety_space"]
-        for col in rating_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            else:
-                df[col] = 0
-
-        total = len(df)
+    # Counts, sums and histograms kept up to date by the store
+    rollups = load_rating_rollups()
+    total = rollups["submissions"]
+    if total > 0:
         categories_labels = [
             ("Overall experience", "engagement"),
             ("Facilitator professionalism", "safety"),
@@ -1094,9 +1223,10 @@ def show_dashboard() -> None:
             ("Space comfort & safety", "safety_space")
         ]
 
+        # Unrated answers count as 0, as they always have on these cards
         averages = {}
         for label, col in categories_labels:
-            averages[label] = round(df[col].mean(), 2) if total > 0 else 0
+            averages[label] = round(rollups["ratings"][col]["sum"] / total, 2)
 
         st.markdown(f"<h3 style='color:{colors['text']}'>Key Metrics</h3>", unsafe_allow_html=True)
         
@@ -1224,6 +1354,7 @@ def show_dashboard() -> None:
             unsafe_allow_html=True
         )
 
+        timer.section("charts")
         chart_col1, chart_col2 = st.columns([2, 1])
         
         with chart_col1:
@@ -1257,8 +1388,14 @@ def show_dashboard() -> None:
         with chart_col2:
             st.markdown(f"<h4 style='color:{colors['text']}; text-align: center;'>Rating Distribution</h4>", unsafe_allow_html=True)
             
-            rating_values = np.concatenate([df[col].values for _, col in categories_labels])
-            rating_dist = pd.Series(rating_values).value_counts().sort_index()
+            rating_counts = {0: total * len(categories_labels)}
+            for _, col in categories_labels:
+                stats = rollups["ratings"][col]
+                rating_counts[0] -= stats["count"]
+                for rating, count in enumerate(stats["histogram"], start=1):
+                    rating_counts[rating] = rating_counts.get(rating, 0) + count
+            rating_dist = pd.Series(rating_counts)
+            rating_dist = rating_dist[rating_dist > 0]
             
             pie_data = pd.DataFrame({
                 'Rating': rating_dist.index,
@@ -1276,36 +1413,97 @@ def show_dashboard() -> None:
             
             st.altair_chart(pie_chart, use_container_width=True)
 
+    timer.section("export")
     st.markdown(f"<h2 style='color:{colors['text']}'>Data Export</h2>", unsafe_allow_html=True)
     
+    # Files are only generated when an export button is clicked
+    compress = st.checkbox("Compress exports (gzip)", value=False, key="export_gzip")
+    extension = "csv.gz" if compress else "csv"
+    mime = 'application/gzip' if compress else 'text/csv'
+    
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Export Current Feedback Data"):
-            df = load_submissions()
-            if not df.empty:
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"play_africa_feedback_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime='text/csv'
-                )
+            path = export_data(compress=compress)
+            if path:
+                with open(path, "rb") as f:
+                    st.download_button(
+                        label="Download CSV",
+                        data=f,
+                        file_name=f"play_africa_feedback_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                        mime=mime
+                    )
             else:
                 st.warning("No data to export")
     
     with col2:
-        deleted_df = load_deleted_entries()
-        if not deleted_df.empty:
-            if st.button("Export Deleted Feedback Data"):
-                csv = deleted_df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"play_africa_deleted_feedback_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime='text/csv'
-                )
-        else:
-            st.warning("No deleted data to export")
+        if st.button("Export Deleted Feedback Data"):
+            path = export_data(deleted=True, compress=compress)
+            if path:
+                with open(path, "rb") as f:
+                    st.download_button(
+                        label="Download CSV",
+                        data=f,
+                        file_name=f"play_africa_deleted_feedback_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                        mime=mime
+                    )
+            else:
+                st.warning("No deleted data to export")
+
+def performance_stats() -> dict:
+    """Storage counters shown next to the timings and included in the JSON download"""
+    return {
+        "frame_cache": dict(CACHE_STATS),
+        "store_lock": lock_stats(),
+        "write_queue": {**writer.stats, "pending": writer.pending(), "last_error": writer.last_error},
+    }
+
+def show_performance() -> None:
+    """Show rolling section timings of this server process (admin only)"""
+    colors = get_theme_colors()
+    st.markdown(f"<h1 style='color:{colors['text']}'>Performance</h1>", unsafe_allow_html=True)
+    st.caption(
+        f"Render times of the app's sections across all sessions since "
+        f"{timer.started_at.strftime('%Y-%m-%d %H:%M:%S')}; percentiles cover the last {timer.window} samples of each."
+    )
+
+    rows = timer.summary()
+    if rows:
+        timings_df = pd.DataFrame(rows)
+        for col in ['p50', 'p95', 'max', 'last']:
+            timings_df[col] = (timings_df[col] * 1000).round(1)
+        timings_df = timings_df.rename(columns={
+            'span': 'Section', 'count': 'Calls', 'window': 'Samples',
+            'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'max': 'Max (ms)', 'last': 'Last (ms)'
+        })
+        st.dataframe(timings_df, hide_index=True, use_container_width=True)
+    else:
+        st.info("No timings recorded yet. Open the other pages to collect some.")
+
+    stats = performance_stats()
+    st.markdown(f"<h3 style='color:{colors['text']}'>Storage</h3>", unsafe_allow_html=True)
+    cache = stats["frame_cache"]
+    lookups = cache["hits"] + cache["misses"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Frame cache hit rate", f"{cache['hits'] / lookups:.0%}" if lookups else "n/a")
+    col2.metric("Store lock waits", stats["store_lock"]["contended"],
+                help=f"Longest wait {stats['store_lock']['max_wait_seconds']:.3f}s, "
+                     f"{stats['store_lock']['timeouts']} timeouts")
+    col3.metric("Queued submissions", stats["write_queue"]["pending"])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="Download as JSON",
+            data=timer.to_json(stats),
+            file_name=f"performance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with col2:
+        if st.button("Reset timings", use_container_width=True):
+            timer.reset()
+            st.rerun()
 
 def get_rating_stars(rating: float) -> str:
     """Generate star rating display"""
@@ -1323,8 +1521,10 @@ def get_rating_stars(rating: float) -> str:
     
     return " ".join(stars)
 
+@timer.timed("main")
 def main() -> None:
     """Main application function"""
+    timer.section("setup")
     st.set_page_config(
         page_title="Play Africa Feedback",
         page_icon=":children_crossing:",
@@ -1340,6 +1540,11 @@ def main() -> None:
     # Initialize session state for mobile detection
     if 'is_mobile' not in st.session_state:
         st.session_state.is_mobile = is_mobile()
+
+    # Count this session as active in the metrics
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    metrics.touch_session(st.session_state.session_id)
     
     # Custom CSS styling
     st.markdown(f"""
@@ -1424,10 +1629,12 @@ def main() -> None:
     """, unsafe_allow_html=True)
 
     # Handle authentication
+    timer.section("authenticate")
     if not authenticate():
         return
 
     # Sidebar navigation
+    timer.section("sidebar")
     with st.sidebar:
         try:
             st.image("play_logo.jpeg", width=200)  # Replaced Lottie animation with play logo
@@ -1459,7 +1666,7 @@ def main() -> None:
         if st.session_state.role == "admin":
             menu = st.radio(
                 "Navigation",
-                ["Home", "Visitor Feedback", "Review Feedback"],
+                ["Home", "Visitor Feedback", "Review Feedback", "Performance"],
                 label_visibility="collapsed"
             )
         else:
@@ -1500,12 +1707,15 @@ def main() -> None:
         )
 
     # Main content routing
+    timer.section("page")
     if menu == "Home":
         show_home()
     elif menu == "Visitor Feedback":
         show_feedback()
     elif menu == "Review Feedback" and st.session_state.role == "admin":
         show_dashboard()
+    elif menu == "Performance" and st.session_state.role == "admin":
+        show_performance()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
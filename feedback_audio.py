@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import wave
+from collections import Counter
+from typing import Optional
+
+from feedback_store import file_identity, file_lock
+
+# Rescan the audio directory at least this often (seconds) even if it looks unchanged
+SCAN_INTERVAL = 300
+
+# Unreferenced recordings (uploaded but never submitted) are removed after this many seconds
+ORPHAN_AGE = 24 * 3600
+
+# File types the recorders and uploaders produce
+AUDIO_EXTENSIONS = {"wav", "m4a", "mp3", "ogg", "webm"}
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _duration(path: str, fmt: str) -> Optional[float]:
+    """Length in seconds; only WAV headers can be read without a decoder"""
+    if fmt != "wav":
+        return None
+    try:
+        with wave.open(path, "rb") as w:
+            return round(w.getnframes() / float(w.getframerate()), 2)
+    except (wave.Error, EOFError, OSError, ZeroDivisionError):
+        return None
+
+
+def _is_audio(name: str) -> bool:
+    return os.path.splitext(name)[1].lstrip(".").lower() in AUDIO_EXTENSIONS
+
+
+class AudioStore:
+    """Content-addressed audio recordings with a manifest and reference counts
+
+    A recording is stored once as `<sha[:2]>/<sha256>.<ext>` under the audio
+    directory, so re-uploading the same clip reuses the file and no
+    directory grows past a bounded size. The manifest (a JSON file) records
+    id, path, size, duration, format, checksum and how many submissions
+    reference each file; checking whether a submission's audio exists is a
+    set lookup instead of a stat call per row. Files from the older flat
+    layout are indexed the same way.
+
+    The directory is rescanned only when its mtime changes or every
+    SCAN_INTERVAL seconds, hashing only new or changed files; writes made
+    through this class update the manifest directly.
+    """
+
+    def __init__(self, audio_dir: str, manifest_file: str, scan_interval: float = SCAN_INTERVAL):
+        self.audio_dir = audio_dir
+        self.manifest_file = manifest_file
+        self.lock_file = f"{manifest_file}.lock"
+        self.scan_interval = scan_interval
+        self._guard = threading.RLock()
+        self._entries = {}
+        self._paths = frozenset()
+        self._identity = None
+        self._dir_mtime = None
+        self._scanned_at = 0.0
+        self._refs_counted = False
+
+    def _load(self) -> None:
+        """Pick up the manifest file if another process rewrote it"""
+        identity = file_identity(self.manifest_file)
+        if identity is not None and identity == self._identity:
+            return
+        try:
+            with open(self.manifest_file, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        self._entries = state.get("files", {})
+        self._dir_mtime = state.get("dir_mtime_ns")
+        self._scanned_at = state.get("scanned_at", 0.0)
+        self._refs_counted = state.get("refs_counted", False)
+        self._identity = identity
+        self._index_paths()
+
+    def _save(self) -> None:
+        state = {
+            "dir_mtime_ns": self._dir_mtime,
+            "scanned_at": self._scanned_at,
+            "refs_counted": self._refs_counted,
+            "files": self._entries
+        }
+        tmp_path = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.manifest_file)
+        self._identity = file_identity(self.manifest_file)
+        self._index_paths()
+
+    def _index_paths(self) -> None:
+        # Submissions store either the relative or the absolute path of a file
+        paths = set()
+        for entry in self._entries.values():
+            paths.add(entry["path"])
+            paths.add(os.path.abspath(entry["path"]))
+        self._paths = frozenset(paths)
+
+    def _key(self, path) -> Optional[str]:
+        """Manifest key (path relative to the audio directory) of a file inside it"""
+        if not isinstance(path, str) or not path:
+            return None
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.audio_dir))
+        return None if rel.startswith("..") else rel
+
+    def _describe(self, key: str, stat: os.stat_result) -> dict:
+        previous = self._entries.get(key)
+        if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            return previous
+        path = os.path.join(self.audio_dir, key)
+        fmt = os.path.splitext(key)[1].lstrip(".").lower()
+        return {
+            "id": os.path.splitext(os.path.basename(key))[0],
+            "path": path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "duration": _duration(path, fmt),
+            "format": fmt,
+            "sha256": _sha256_file(path),
+            "refs": previous.get("refs", 0) if previous else 0
+        }
+
+    def _dir_state(self) -> Optional[int]:
+        try:
+            return os.stat(self.audio_dir).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _walk(self):
+        """(key, stat) of every audio file: flat legacy files and the hash shards"""
+        with os.scandir(self.audio_dir) as top:
+            for item in top:
+                if item.is_file() and _is_audio(item.name):
+                    yield item.name, item.stat()
+                elif item.is_dir() and len(item.name) == 2:
+                    with os.scandir(item.path) as shard:
+                        for sub in shard:
+                            if sub.is_file() and _is_audio(sub.name):
+                                yield os.path.join(item.name, sub.name), sub.stat()
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(os.path.join(self.audio_dir, key))
+        except FileNotFoundError:
+            pass
+        self._entries.pop(key, None)
+
+    def scan(self) -> None:
+        """Re-read the audio directory, hashing only new or changed files
+
+        Once reference counts are known, stored files no submission
+        references that are older than ORPHAN_AGE are removed. Files of the
+        old flat layout are never removed this way.
+        """
+        with self._guard, file_lock(self.lock_file):
+            self._load()
+            dir_mtime = self._dir_state()
+            entries = {}
+            if dir_mtime is not None:
+                for key, stat in self._walk():
+                    entries[key] = self._describe(key, stat)
+            self._entries = entries
+            if self._refs_counted:
+                cutoff = time.time_ns() - int(ORPHAN_AGE * 1e9)
+                for key, entry in list(entries.items()):
+                    if os.sep in key and entry.get("refs", 0) <= 0 and entry["mtime_ns"] < cutoff:
+                        self._remove_file(key)
+            self._dir_mtime = self._dir_state()
+            self._scanned_at = time.time()
+            self._save()
+
+    def refresh(self) -> None:
+        """Rescan when the directory changed or the scan interval has passed"""
+        with self._guard:
+            self._load()
+            if self._dir_state() != self._dir_mtime or time.time() - self._scanned_at >= self.scan_interval:
+                self.scan()
+
+    def _add(self, key: str) -> Optional[dict]:
+        try:
+            self._entries[key] = self._describe(key, os.stat(os.path.join(self.audio_dir, key)))
+        except FileNotFoundError:
+            return None
+        return self._entries[key]
+
+    def save(self, data: bytes, ext: str) -> str:
+        """Store a recording by content hash and return its path
+
+        Identical data is stored once; saving it again returns the same path.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        key = os.path.join(digest[:2], f"{digest}.{ext.lower().lstrip('.')}")
+        path = os.path.join(self.audio_dir, key)
+        with self._guard, file_lock(self.lock_file):
+            self._load()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, 0o666)
+                os.replace(tmp_path, path)
+            self._add(key)
+            self._save()
+        return path
+
+    def add(self, path: str) -> Optional[dict]:
+        """Record a file written outside save() and return its entry"""
+        key = self._key(path)
+        if key is None:
+            return None
+        with self._guard, file_lock(self.lock_file):
+            self._load()
+            entry = self._add(key)
+            self._save()
+            return entry
+
+    def acquire(self, path) -> None:
+        """Count one more submission referencing `path`"""
+        key = self._key(path)
+        if key is None:
+            return
+        with self._guard, file_lock(self.lock_file):
+            self._load()
+            entry = self._entries.get(key) or self._add(key)
+            if entry is not None:
+                entry["refs"] = entry.get("refs", 0) + 1
+                self._save()
+
+    def release(self, path, remove: bool = True) -> bool:
+        """Drop one reference to `path`, deleting the file with its last reference
+
+        With `remove=False` an unreferenced file is kept and left to the
+        orphan sweep instead. Returns True when the file was removed.
+        """
+        key = self._key(path)
+        if key is None:
+            return False
+        with self._guard, file_lock(self.lock_file):
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry["refs"] = entry.get("refs", 0) - 1
+            removed = remove and entry["refs"] <= 0
+            if removed:
+                self._remove_file(key)
+            self._save()
+            return removed
+
+    def needs_recount(self) -> bool:
+        """True until reference counts have been taken from the stored submissions"""
+        with self._guard:
+            self._load()
+            return not self._refs_counted
+
+    def recount(self, paths: list) -> None:
+        """Set every file's reference count from the audio paths of all stored submissions"""
+        self.refresh()
+        with self._guard, file_lock(self.lock_file):
+            self._load()
+            counts = Counter(key for key in map(self._key, paths) if key is not None)
+            for key, entry in self._entries.items():
+                entry["refs"] = counts.get(key, 0)
+            self._refs_counted = True
+            self._save()
+
+    def paths(self) -> frozenset:
+        """Paths (relative and absolute) of every audio file that exists"""
+        self.refresh()
+        return self._paths
+
+    def has(self, path) -> bool:
+        return isinstance(path, str) and path in self.paths()
+
+    def get(self, path: str) -> Optional[dict]:
+        """Manifest entry of an audio file, or None when it does not exist"""
+        if not self.has(path):
+            return None
+        return self._entries.get(self._key(path))
+
+
+_AUDIO_STORES = {}
+_AUDIO_STORES_LOCK = threading.Lock()
+
+
+def open_audio_store(audio_dir: str, manifest_file: str) -> AudioStore:
+    """Return the process-wide audio store for a directory"""
+    key = os.path.abspath(manifest_file)
+    with _AUDIO_STORES_LOCK:
+        if key not in _AUDIO_STORES:
+            _AUDIO_STORES[key] = AudioStore(audio_dir, manifest_file)
+        return _AUDIO_STORES[key]
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from feedback_store import StoreLockTimeout, file_lock
+
+# Files are split into fixed-size chunks; an appended file only adds new chunks
+CHUNK_SIZE = 1024 * 1024
+
+# How many snapshots to keep per period (newest snapshot of each bucket wins)
+RETENTION = {"hourly": 24, "daily": 7, "weekly": 4}
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BackupEngine:
+    """Deduplicated, compressed, incremental backups of the data files
+
+    Each file is split into chunks stored once under `objects/` by content
+    hash (gzip-compressed). A snapshot is a small JSON manifest listing the
+    chunks of every file, so unchanged data costs nothing and an append-only
+    CSV only adds its last chunk. Retention removes old manifests and the
+    chunks no manifest references any more.
+    """
+
+    def __init__(self, backup_dir: str, retention: Optional[dict] = None):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, "objects")
+        self.snapshots_dir = os.path.join(backup_dir, "snapshots")
+        self.lock_file = os.path.join(backup_dir, "backup.lock")
+        self.retention = retention or RETENTION
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.gz")
+
+    def list_snapshots(self) -> list:
+        """Snapshot ids, oldest first"""
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def load_snapshot(self, snapshot_id: str) -> dict:
+        with open(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"), "r") as f:
+            return json.load(f)
+
+    def latest_snapshot(self) -> Optional[dict]:
+        snapshots = self.list_snapshots()
+        return self.load_snapshot(snapshots[-1]) if snapshots else None
+
+    def _store_file(self, path: str, previous: Optional[dict]) -> dict:
+        st = os.stat(path)
+        if previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+            # Same size and mtime as last time: reuse the entry without reading the file
+            return previous
+        chunks = []
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                file_hash.update(data)
+                digest = _sha256(data)
+                object_path = self._object_path(digest)
+                if not os.path.exists(object_path):
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    tmp_path = f"{object_path}.{os.getpid()}.tmp"
+                    compressed = gzip.compress(data)
+                    # Verify the new object round-trips before publishing it
+                    if _sha256(gzip.decompress(compressed)) != digest:
+                        raise ValueError(f"Backup chunk of {path} failed verification")
+                    with open(tmp_path, "wb") as out:
+                        out.write(compressed)
+                    os.replace(tmp_path, object_path)
+                chunks.append(digest)
+        return {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": file_hash.hexdigest(),
+            "chunks": chunks
+        }
+
+    def create_backup(self, sources: dict) -> Optional[str]:
+        """Back up `sources` (name -> path) and return the new snapshot id
+
+        Returns None when nothing changed since the last snapshot, or when
+        another process is already taking a backup.
+        """
+        try:
+            # A try-lock: skipping because another process is backing up is not store contention
+            with file_lock(self.lock_file, timeout=0, record_stats=False):
+                previous = self.latest_snapshot()
+                previous_files = previous["files"] if previous else {}
+                files = {}
+                for name, path in sources.items():
+                    if path and os.path.exists(path):
+                        files[name] = self._store_file(path, previous_files.get(name))
+
+                unchanged = {
+                    name: entry["sha256"] for name, entry in files.items()
+                } == {
+                    name: entry["sha256"] for name, entry in previous_files.items()
+                }
+                if previous and unchanged:
+                    return None
+
+                snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                snapshot = {
+                    "id": snapshot_id,
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "files": files
+                }
+                snapshot_path = os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+                with open(f"{snapshot_path}.tmp", "w") as f:
+                    json.dump(snapshot, f, indent=2)
+                os.replace(f"{snapshot_path}.tmp", snapshot_path)
+                self.apply_retention()
+                return snapshot_id
+        except StoreLockTimeout:
+            return None
+
+    def apply_retention(self) -> list:
+        """Delete snapshots outside the hourly/daily/weekly windows; return removed ids"""
+        snapshots = self.list_snapshots()
+        keep = set(snapshots[-1:])
+        bucket_formats = {"hourly": "%Y%m%d%H", "daily": "%Y%m%d", "weekly": "%G%V"}
+        for period, count in self.retention.items():
+            buckets = []
+            for snapshot_id in reversed(snapshots):
+                created = datetime.strptime(snapshot_id, "%Y%m%d_%H%M%S_%f")
+                bucket = created.strftime(bucket_formats[period])
+                if bucket not in buckets:
+                    if len(buckets) == count:
+                        break
+                    buckets.append(bucket)
+                    keep.add(snapshot_id)
+
+        removed = [snapshot_id for snapshot_id in snapshots if snapshot_id not in keep]
+        for snapshot_id in removed:
+            os.remove(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"))
+        if removed:
+            self._collect_garbage()
+        return removed
+
+    def _collect_garbage(self) -> None:
+        referenced = set()
+        for snapshot_id in self.list_snapshots():
+            for entry in self.load_snapshot(snapshot_id)["files"].values():
+                referenced.update(entry["chunks"])
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.endswith(".gz") and name[:-3] not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+
+    def _read_file(self, entry: dict) -> bytes:
+        chunks = []
+        for digest in entry["chunks"]:
+            with open(self._object_path(digest), "rb") as f:
+                chunk = gzip.decompress(f.read())
+            if _sha256(chunk) != digest:
+                raise ValueError(f"Chunk {digest} is corrupt")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def verify(self, snapshot_id: Optional[str] = None) -> list:
+        """Check chunk and file checksums; return a list of problems (empty when healthy)"""
+        problems = []
+        snapshot_ids = [snapshot_id] if snapshot_id else self.list_snapshots()
+        for sid in snapshot_ids:
+            for name, entry in self.load_snapshot(sid)["files"].items():
+                try:
+                    if _sha256(self._read_file(entry)) != entry["sha256"]:
+                        problems.append(f"{sid}/{name}: checksum mismatch")
+                except (OSError, ValueError) as e:
+                    problems.append(f"{sid}/{name}: {str(e)}")
+        return problems
+
+    def restore(self, snapshot_id: str, target_dir: str) -> list:
+        """Write the files of a snapshot into `target_dir` and return their paths"""
+        os.makedirs(target_dir, exist_ok=True)
+        restored = []
+        for name, entry in self.load_snapshot(snapshot_id)["files"].items():
+            data = self._read_file(entry)
+            if _sha256(data) != entry["sha256"]:
+                raise ValueError(f"{name}: checksum mismatch")
+            path = os.path.join(target_dir, name)
+            # Partitioned stores name files by subdirectory (submissions/2025-03.csv)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            restored.append(path)
+        return restored
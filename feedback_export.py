@@ -0,0 +1,154 @@
+import gzip
+import os
+import tempfile
+import time
+from typing import Optional
+
+import pandas as pd
+
+from feedback_store import COLUMN_DTYPES, DATE_FORMATS, to_storage_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Arrow IPC exports need pyarrow
+    pa = None
+
+# Export files older than this many seconds are removed when the next export is written
+EXPORT_MAX_AGE = 3600
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "jsonl": ("jsonl", "application/x-ndjson"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Formats that compress internally (zstd), so gzip is not applied on top
+COLUMNAR_FORMATS = {"parquet", "arrow"}
+
+
+def available_formats() -> list:
+    """Export formats usable here; the columnar ones only when pyarrow is installed"""
+    return [fmt for fmt in EXPORT_FORMATS if pa is not None or fmt not in COLUMNAR_FORMATS]
+
+
+def file_suffix(fmt: str, compress: bool = False) -> str:
+    extension = EXPORT_FORMATS[fmt][0]
+    return f"{extension}.gz" if compress and fmt not in COLUMNAR_FORMATS else extension
+
+
+def remove_stale_exports(export_dir: str, max_age: float = EXPORT_MAX_AGE) -> None:
+    cutoff = time.time() - max_age
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass  # Removed by another session
+
+
+def _open_text(path: str, compress: bool):
+    opener = gzip.open if compress else open
+    return opener(path, "wt", encoding="utf-8", newline="")
+
+
+def _write_csv(chunks, path: str, compress: bool) -> int:
+    rows = 0
+    with _open_text(path, compress) as f:
+        for chunk in chunks:
+            to_storage_frame(chunk).to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+    return rows
+
+
+def _write_jsonl(chunks, path: str, compress: bool) -> int:
+    rows = 0
+    with _open_text(path, compress) as f:
+        for chunk in chunks:
+            lines = to_storage_frame(chunk).to_json(orient="records", lines=True, force_ascii=False)
+            f.write(lines.rstrip("\n") + "\n")
+            rows += len(chunk)
+    return rows
+
+
+def arrow_schema(columns: list):
+    """Arrow schema of the given submission columns, following COLUMN_DTYPES"""
+    integer_types = {'Int8': pa.int8(), 'Int32': pa.int32()}
+    fields = []
+    for col in columns:
+        if col in DATE_FORMATS:
+            fields.append(pa.field(col, pa.timestamp('us')))
+        else:
+            # Categoricals are written as plain strings: the IPC file format
+            # cannot change a dictionary between batches
+            fields.append(pa.field(col, integer_types.get(COLUMN_DTYPES.get(col), pa.string())))
+    return pa.schema(fields)
+
+
+def _arrow_table(df: pd.DataFrame, schema):
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _write_columnar(chunks, path: str, fmt: str) -> int:
+    if pa is None:
+        raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+    rows = 0
+    writer = None
+    sink = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                # The schema comes from the first chunk's columns, every chunk has the same ones
+                schema = arrow_schema(list(chunk.columns))
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(path, schema, compression="zstd")
+                else:
+                    sink = pa.OSFile(path, "wb")
+                    options = pa.ipc.IpcWriteOptions(compression="zstd")
+                    writer = pa.ipc.new_file(sink, schema, options=options)
+            writer.write_table(_arrow_table(chunk, schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+    return rows
+
+
+def export_file(chunks, export_dir: str, name: str, fmt: str = "csv", compress: bool = False) -> Optional[str]:
+    """Write DataFrame chunks to an export file in `export_dir` and return its path
+
+    `fmt` is one of EXPORT_FORMATS; `compress` gzips the text formats.
+    Chunks are written one at a time, so writing the file does not use
+    more memory as the number of rows grows; serving the file is up to
+    the caller. Returns None when there were no rows to export.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    os.makedirs(export_dir, exist_ok=True)
+    remove_stale_exports(export_dir)
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{name}_", suffix=f".{file_suffix(fmt, compress)}.tmp", dir=export_dir)
+    os.close(fd)
+    try:
+        if fmt in COLUMNAR_FORMATS:
+            rows = _write_columnar(chunks, tmp_path, fmt)
+        elif fmt == "jsonl":
+            rows = _write_jsonl(chunks, tmp_path, compress)
+        else:
+            rows = _write_csv(chunks, tmp_path, compress)
+        if rows == 0:
+            return None
+        path = tmp_path[:-len(".tmp")]
+        os.replace(tmp_path, path)
+        return path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,263 @@
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from feedback_store import CACHE_STATS, SubmissionStore, lock_stats
+from feedback_timing import SpanTimer
+
+# A session counts as active for this many seconds after its last page run
+ACTIVE_SESSION_WINDOW = 300
+
+# Seconds between rewrites of the metrics file
+METRICS_INTERVAL = float(os.environ.get("FEEDBACK_METRICS_INTERVAL", "15"))
+
+# Seconds the data directory sizes are reused before walking it again
+SIZE_INTERVAL = 60
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Optional[dict]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _path_size(path: str) -> int:
+    """Bytes of a file, or of every file below a directory"""
+    try:
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        total = 0
+        with os.scandir(path) as items:
+            for item in items:
+                if item.is_dir(follow_symlinks=False):
+                    total += _path_size(item.path)
+                elif item.is_file(follow_symlinks=False):
+                    total += item.stat().st_size
+        return total
+    except FileNotFoundError:
+        return 0
+
+
+class MetricsExporter:
+    """Storage, latency and queue statistics of this process in Prometheus text format
+
+    Everything is read from counters the app keeps anyway: the row counts
+    the store last recorded, the span timer's latency histograms, the
+    write-behind queue and the lock and cache counters. A scrape never takes
+    the store lock, loads submissions or takes a snapshot, so it stays cheap
+    and cannot hold up people filling in the form.
+    The text is served on a local port by serve() and/or rewritten to a
+    file (for node_exporter's textfile collector) by write_periodically().
+    """
+
+    def __init__(self, store: SubmissionStore, timer: SpanTimer, data_dir: str, queue=None,
+                 session_window: float = ACTIVE_SESSION_WINDOW):
+        self.store = store
+        self.timer = timer
+        self.data_dir = data_dir
+        self.queue = queue
+        self.session_window = session_window
+        self.server = None
+        self._sessions = {}
+        self._sizes = ({}, 0.0)
+        self._guard = threading.Lock()
+        self._writer = None
+
+    def touch_session(self, session_id: str) -> None:
+        with self._guard:
+            self._sessions[session_id] = time.time()
+
+    def active_sessions(self) -> int:
+        cutoff = time.time() - self.session_window
+        with self._guard:
+            for session_id in [s for s, seen in self._sessions.items() if seen < cutoff]:
+                del self._sessions[session_id]
+            return len(self._sessions)
+
+    def data_sizes(self) -> dict:
+        """Bytes per top-level entry of the data directory, walked at most every SIZE_INTERVAL seconds"""
+        sizes, measured_at = self._sizes
+        if time.time() - measured_at >= SIZE_INTERVAL:
+            try:
+                names = sorted(os.listdir(self.data_dir))
+            except FileNotFoundError:
+                names = []
+            sizes = {name: _path_size(os.path.join(self.data_dir, name)) for name in names}
+            self._sizes = (sizes, time.time())
+        return sizes
+
+    def render(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+        counts = self.store.recorded_counts()
+        metric("feedback_submissions", "gauge", "Stored submissions by state, as last recorded by the store", [
+            ("", {"state": state}, count) for state, count in counts.items() if count is not None
+        ])
+        metric("feedback_data_bytes", "gauge", "Size on disk of each entry of the data directory", [
+            ("", {"path": name}, size) for name, size in self.data_sizes().items()
+        ])
+
+        histograms = self.timer.histograms()
+        if histograms:
+            samples = []
+            for span, histogram in histograms.items():
+                bounds = list(self.timer.buckets) + [float("inf")]
+                for bound, count in zip(bounds, histogram["buckets"]):
+                    samples.append(("_bucket", {"span": span, "le": _number(float(bound))}, count))
+                samples.append(("_sum", {"span": span}, histogram["sum"]))
+                samples.append(("_count", {"span": span}, histogram["count"]))
+            metric("feedback_span_seconds", "histogram",
+                   "Duration of timed sections of the app (save_submission, load_submissions, backup, pages)",
+                   samples)
+
+        metric("feedback_active_sessions", "gauge",
+               f"Sessions that ran a page in the last {int(self.session_window)} seconds",
+               [("", None, self.active_sessions())])
+
+        if self.queue is not None:
+            stats = dict(self.queue.stats)
+            for key, help_text in [
+                ("submitted", "Submissions accepted by the write-behind queue"),
+                ("written", "Queued submissions written to the store"),
+                ("batches", "Batches written to the store"),
+                ("errors", "Failed batch writes"),
+                ("recovered", "Submissions replayed from journals of a crashed process"),
+                ("write_seconds", "Seconds spent writing batches to the store"),
+            ]:
+                metric(f"feedback_queue_{key}_total", "counter", help_text, [("", None, stats.get(key, 0))])
+            metric("feedback_queue_pending", "gauge", "Submissions waiting to be written",
+                   [("", None, self.queue.pending())])
+
+        locks = lock_stats()
+        metric("feedback_store_lock_acquired_total", "counter", "Store lock acquisitions",
+               [("", None, locks["acquired"])])
+        metric("feedback_store_lock_contended_total", "counter", "Store lock acquisitions that had to wait",
+               [("", None, locks["contended"])])
+        metric("feedback_store_lock_timeouts_total", "counter", "Store lock waits that timed out",
+               [("", None, locks["timeouts"])])
+        metric("feedback_store_lock_wait_seconds_total", "counter", "Seconds spent waiting for the store lock",
+               [("", None, locks["wait_seconds"])])
+        metric("feedback_frame_cache_lookups_total", "counter", "Parsed data file cache lookups by result", [
+            ("", {"result": "hit"}, CACHE_STATS["hits"]),
+            ("", {"result": "miss"}, CACHE_STATS["misses"]),
+        ])
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str) -> None:
+        """Write the metrics to `path` atomically, so a collector never reads half a file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def write_periodically(self, path: str, interval: float = METRICS_INTERVAL) -> None:
+        """Rewrite the metrics file every `interval` seconds from a daemon thread"""
+        def run():
+            while True:
+                try:
+                    self.write_file(path)
+                except Exception:
+                    # A full disk or a store error must not end the loop; try again next time
+                    pass
+                time.sleep(interval)
+
+        if self._writer is None:
+            self._writer = threading.Thread(target=run, name="feedback-metrics-file", daemon=True)
+            self._writer.start()
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> bool:
+        """Serve /metrics on host:port from a daemon thread
+
+        Returns False when the port cannot be bound, e.g. because another
+        app process already serves it.
+        """
+        if self.server is not None:
+            return True
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = exporter.render().encode("utf-8")
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((host, port), Handler)
+        except OSError:
+            return False
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="feedback-metrics-http", daemon=True).start()
+        return True
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+_EXPORTERS = {}
+_EXPORTERS_LOCK = threading.Lock()
+
+
+def open_metrics(store: SubmissionStore, timer: SpanTimer, data_dir: str, queue=None) -> MetricsExporter:
+    """Return the process-wide metrics exporter for a data directory
+
+    The first call starts serving on FEEDBACK_METRICS_PORT (bound to
+    FEEDBACK_METRICS_HOST, localhost by default) and rewriting
+    FEEDBACK_METRICS_FILE, for whichever of them is set.
+    """
+    key = os.path.abspath(data_dir)
+    with _EXPORTERS_LOCK:
+        if key not in _EXPORTERS:
+            exporter = MetricsExporter(store, timer, data_dir, queue)
+            port = os.environ.get("FEEDBACK_METRICS_PORT")
+            if port:
+                exporter.serve(int(port), os.environ.get("FEEDBACK_METRICS_HOST", "127.0.0.1"))
+            path = os.environ.get("FEEDBACK_METRICS_FILE")
+            if path:
+                exporter.write_periodically(path)
+            _EXPORTERS[key] = exporter
+        return _EXPORTERS[key]
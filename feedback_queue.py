@@ -0,0 +1,185 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+from feedback_store import SubmissionStore
+
+# Most submissions handed to the store in one write
+BATCH_SIZE = 100
+
+# Seconds the writer waits for more submissions before writing a partial batch
+FLUSH_INTERVAL = float(os.environ.get("FEEDBACK_FLUSH_INTERVAL", "0.5"))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _read_journal(path: str) -> list:
+    """Entries of a journal file; a torn last line (crash mid-write) is skipped"""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+class WriteBehindQueue:
+    """Acknowledge submissions once journaled and write them to the store in the background
+
+    submit() appends the entry to this process's journal (one fsync'd line)
+    and returns; a daemon thread hands queued entries to `store.save_many`
+    in batches. The journal is emptied whenever the queue drains. Journals
+    left behind by a process that died are replayed on start; save_many
+    skips ids that are already stored, so a replay never duplicates rows.
+    """
+
+    def __init__(self, store: SubmissionStore, journal_dir: str,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.store = store
+        self.journal_dir = journal_dir
+        self.journal_file = os.path.join(journal_dir, f"{os.getpid()}.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.last_error = None
+        self.stats = {"submitted": 0, "written": 0, "batches": 0, "errors": 0, "recovered": 0, "write_seconds": 0.0}
+        self._pending = []
+        self._cond = threading.Condition()
+        # Serializes batch writes between the writer thread and flush()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        os.makedirs(journal_dir, exist_ok=True)
+        self._recover()
+
+    def _recover(self) -> None:
+        for name in sorted(os.listdir(self.journal_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext != ".jsonl" or not stem.isdigit():
+                continue
+            pid = int(stem)
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            path = os.path.join(self.journal_dir, name)
+            try:
+                entries = _read_journal(path)
+            except FileNotFoundError:
+                continue  # Another process replayed it first
+            for start in range(0, len(entries), self.batch_size):
+                self.store.save_many(entries[start:start + self.batch_size])
+            self.stats["recovered"] += len(entries)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, entry: dict) -> str:
+        """Journal a submission, queue it for the store and return its id"""
+        entry = dict(entry)
+        if not entry.get('id'):
+            entry['id'] = str(uuid.uuid4())
+        line = json.dumps(entry, default=str) + "\n"
+        with self._cond:
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.append(entry)
+            self.stats["submitted"] += 1
+            self._cond.notify()
+        self._ensure_thread()
+        return entry['id']
+
+    def pending(self) -> int:
+        """Number of submissions not yet written to the store"""
+        with self._cond:
+            return len(self._pending)
+
+    def _write_batch(self) -> int:
+        with self._write_lock:
+            with self._cond:
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                self.store.save_many(batch)
+            except Exception as e:
+                with self._cond:
+                    self.stats["errors"] += 1
+                self.last_error = str(e)
+                raise
+            with self._cond:
+                # submit() only appends, so the batch is still the head of the queue
+                del self._pending[:len(batch)]
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["write_seconds"] += time.perf_counter() - started
+                if not self._pending:
+                    open(self.journal_file, "w").close()
+            self.last_error = None
+            return len(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                if len(self._pending) < self.batch_size:
+                    # Give concurrent submissions a moment to join the batch
+                    self._cond.wait(self.flush_interval)
+            try:
+                self._write_batch()
+            except Exception:
+                # Entries stay queued and journaled; retry after a pause
+                with self._cond:
+                    self._cond.wait(self.flush_interval)
+
+    def flush(self) -> int:
+        """Write every queued submission now and return how many were written
+
+        Called before reads so a session sees its own submissions. Raises the
+        store's error if a batch cannot be written.
+        """
+        written = 0
+        while True:
+            count = self._write_batch()
+            if not count:
+                return written
+            written += count
+
+
+_QUEUES = {}
+_QUEUES_LOCK = threading.Lock()
+
+
+def open_queue(store: SubmissionStore, journal_dir: str, flush_interval: Optional[float] = None) -> WriteBehindQueue:
+    """Return the process-wide write-behind queue for a journal directory"""
+    key = os.path.abspath(journal_dir)
+    with _QUEUES_LOCK:
+        if key not in _QUEUES:
+            queue = WriteBehindQueue(
+                store, journal_dir,
+                flush_interval=FLUSH_INTERVAL if flush_interval is None else flush_interval
+            )
+            # Drain the queue on a clean shutdown; a crash is covered by the journal
+            atexit.register(queue.flush)
+            _QUEUES[key] = queue
+        return _QUEUES[key]
@@ -0,0 +1,2362 @@
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+# Free-text answers of the feedback form, one column each
+COMMENT_FIELDS = [
+    'enjoyed', 'curiosity', 'support_goals', 'improve', 'recommend',
+    'future_topics', 'collaboration'
+]
+
+# Define expected columns for submissions, including 'id' as first column
+EXPECTED_COLUMNS = [
+    'id', 'timestamp', 'school', 'group_type', 'children_no', 'children_age',
+    'adults_present', 'visit_date', 'programme', 'engagement', 'safety',
+    'cleanliness', 'fun', 'learning', 'planning', 'safety_space',
+    *COMMENT_FIELDS, 'audio_file', 'device_type'
+]
+
+INTEGER_COLUMNS = [
+    'children_no', 'adults_present', 'engagement', 'safety', 'cleanliness',
+    'fun', 'learning', 'planning', 'safety_space'
+]
+
+RATING_COLUMNS = ['engagement', 'safety', 'cleanliness', 'fun', 'learning', 'planning', 'safety_space']
+
+# Declared in-memory dtypes; columns not listed here stay text. Ratings are
+# 1-5 so a nullable Int8 holds them, and the few group/device values repeat
+# on every row, which is what categoricals are for.
+COLUMN_DTYPES = {
+    'children_no': 'Int32',
+    'adults_present': 'Int32',
+    **{col: 'Int8' for col in RATING_COLUMNS},
+    'group_type': 'category',
+    'device_type': 'category',
+}
+
+# Date columns are parsed to datetimes on load and written back in these formats
+DATE_FORMATS = {'timestamp': '%Y-%m-%dT%H:%M:%S', 'visit_date': '%Y-%m-%d'}
+
+# dtypes handed to read_csv: the declared ones, plain text for everything else
+READ_DTYPES = {
+    col: COLUMN_DTYPES.get(col, str) for col in EXPECTED_COLUMNS if col not in DATE_FORMATS
+}
+
+# Columns of the soft-delete log; the last record per id wins
+TOMBSTONE_COLUMNS = ['id', 'deleted', 'changed_at']
+
+# Current storage schema version; see the backends' MIGRATIONS lists
+SCHEMA_VERSION = 7
+
+# Length of a submissions partition of the CSV backend: "month", "quarter" or "year"
+PARTITION_PERIOD = os.environ.get("FEEDBACK_PARTITION_PERIOD", "month")
+
+# Matched terms in search snippets are wrapped in these control characters,
+# which cannot occur in form text; see highlight_snippet()
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+# FTS5 tokenizer for comment search: case- and accent-insensitive words
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Rows per DataFrame when submissions are streamed in chunks (exports)
+CHUNK_ROWS = 5000
+
+# Backend used when FEEDBACK_STORE_BACKEND is not set
+DEFAULT_BACKEND = "csv"
+
+# Longest time (seconds) a writer waits for the store lock before giving up
+LOCK_TIMEOUT = float(os.environ.get("FEEDBACK_LOCK_TIMEOUT", "10"))
+
+
+class StoreLockTimeout(TimeoutError):
+    """Raised when the store lock could not be acquired in time"""
+
+
+# Lock contention counters for this process
+LOCK_STATS = {
+    "acquired": 0,
+    "contended": 0,
+    "timeouts": 0,
+    "wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+}
+_LOCK_STATS_GUARD = threading.Lock()
+
+
+def lock_stats() -> dict:
+    """Snapshot of the lock contention counters"""
+    with _LOCK_STATS_GUARD:
+        return dict(LOCK_STATS)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(lock_path: str, timeout: float = None, record_stats: bool = True):
+    """Hold an exclusive advisory lock on `lock_path`, waiting at most `timeout` seconds
+
+    The lock is taken on a fresh file descriptor, so it excludes other threads
+    of this process as well as other processes sharing the data directory.
+    `record_stats=False` keeps the lock out of LOCK_STATS, for try-locks whose
+    failure is expected rather than a sign of contention.
+    """
+    timeout = LOCK_TIMEOUT if timeout is None else timeout
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        start = time.monotonic()
+        contended = False
+        delay = 0.005
+        while not _try_lock(fd):
+            contended = True
+            if time.monotonic() - start >= timeout:
+                if record_stats:
+                    with _LOCK_STATS_GUARD:
+                        LOCK_STATS["timeouts"] += 1
+                raise StoreLockTimeout(f"Timed out after {timeout:.1f}s waiting for {lock_path}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        waited = time.monotonic() - start
+        if record_stats:
+            with _LOCK_STATS_GUARD:
+                LOCK_STATS["acquired"] += 1
+                LOCK_STATS["contended"] += int(contended)
+                LOCK_STATS["wait_seconds"] += waited
+                LOCK_STATS["max_wait_seconds"] = max(LOCK_STATS["max_wait_seconds"], waited)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: str) -> None:
+    if fcntl is None:
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_csv(df: pd.DataFrame, path: str) -> None:
+    """Write a DataFrame to a temporary file and rename it over `path`
+
+    Readers see either the old or the new file, never a partial one.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o666)
+        os.replace(tmp_path, path)
+        _fsync_dir(path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Parsed DataFrames shared by every session in this process, keyed by path
+_FRAME_CACHE = {}
+_FRAME_CACHE_LOCK = threading.Lock()
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def file_identity(path: str) -> Optional[tuple]:
+    """(inode, mtime, size) of a file, or None when it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def cached_frame(path: str, parse, columns: Optional[list] = None) -> pd.DataFrame:
+    """Return `parse(path)`, re-parsing only when the file identity changed
+
+    With `columns`, `parse(path, columns)` reads just those columns and is
+    cached separately; a cached full frame is projected instead of re-read.
+    Callers get a copy, so they are free to modify the returned frame.
+    """
+    identity = file_identity(path)
+    key = (path, tuple(columns) if columns is not None else None)
+    with _FRAME_CACHE_LOCK:
+        hit = _FRAME_CACHE.get(key)
+        if hit is not None and hit[0] == identity:
+            CACHE_STATS["hits"] += 1
+            return hit[1].copy()
+        full = _FRAME_CACHE.get((path, None))
+        if columns is not None and full is not None and full[0] == identity:
+            CACHE_STATS["hits"] += 1
+            return full[1][[col for col in columns if col in full[1].columns]].copy()
+        CACHE_STATS["misses"] += 1
+    df = parse(path) if columns is None else parse(path, columns)
+    with _FRAME_CACHE_LOCK:
+        _FRAME_CACHE[key] = (identity, df)
+    return df.copy()
+
+
+def invalidate_cache(*paths: str) -> None:
+    """Drop cached frames for the given paths (all paths when none given)"""
+    with _FRAME_CACHE_LOCK:
+        if not paths:
+            _FRAME_CACHE.clear()
+        for key in [key for key in _FRAME_CACHE if key[0] in paths]:
+            del _FRAME_CACHE[key]
+
+
+def _format_value(value) -> str:
+    """Format a value the way pandas writes it to CSV"""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def read_header(path: str) -> Optional[list]:
+    """Read only the header row of a CSV file"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
+
+
+def encode_rows(rows: list, columns: list) -> bytes:
+    """Encode rows (dicts) as CSV records in the given column order"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_format_value(row.get(col)) for col in columns])
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_records(rows: list, columns: list) -> list:
+    """Encode rows (dicts) as one CSV record (bytes) each, sharing a single writer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    records = []
+    for row in rows:
+        writer.writerow([_format_value(row.get(col)) for col in columns])
+        records.append(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    return records
+
+
+def append_rows(path: str, rows: list, columns: list) -> list:
+    """Append rows to a CSV file as one fsync'd write
+
+    Only the header is read, so the cost of an append does not depend on how
+    many rows the file already holds. A file whose header is missing some of
+    the expected columns is rewritten once with the full column set.
+    Callers sharing the file across processes must hold the store lock.
+
+    Returns the (offset, length) in bytes of every appended record.
+    """
+    header = read_header(path)
+    if header is not None and any(col not in header for col in columns):
+        existing_df = pd.read_csv(path)
+        for col in columns:
+            if col not in existing_df.columns:
+                existing_df[col] = None
+        atomic_write_csv(existing_df, path)
+        header = list(existing_df.columns)
+
+    records = encode_records(rows, header or columns)
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        prefix = b""
+        if size == 0:
+            prefix = encode_rows([{col: col for col in columns}], columns)
+        else:
+            # Guard against a file that was left without a trailing newline
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                prefix = b"\n"
+        f.write(prefix + b"".join(records))
+        f.flush()
+        os.fsync(f.fileno())
+
+    locations = []
+    offset = size + len(prefix)
+    for record in records:
+        locations.append((offset, len(record)))
+        offset += len(record)
+    return locations
+
+
+def append_submission(path: str, entry: dict, columns: list) -> list:
+    """Append a single submission record to the submissions file"""
+    return append_rows(path, [entry], columns)
+
+
+def iter_records(path: str, start: int = 0):
+    """Yield (offset, raw bytes) for each complete CSV record from `start`
+
+    A record ends at a newline outside quotes, so quoted fields spanning
+    several lines stay together. A trailing partial record is not yielded.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        pending = b""
+        quotes = 0
+        for line in f:
+            pending += line
+            quotes += line.count(b'"')
+            if quotes % 2 == 0 and pending.endswith(b"\n"):
+                yield offset, pending
+                offset += len(pending)
+                pending = b""
+                quotes = 0
+
+
+def decode_record(raw: bytes) -> list:
+    """Split one raw CSV record into its field values"""
+    return next(csv.reader(io.StringIO(raw.decode("utf-8"))), [])
+
+
+def trim_partial_record(path: str, start: int = 0) -> bool:
+    """Cut a trailing partial record (left by a crash mid-append) off a CSV file
+
+    Only the bytes from `start`, which must be a record boundary, are read.
+    Returns True when anything was removed.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return False
+    end = min(start, size)
+    for offset, raw in iter_records(path, end):
+        end = offset + len(raw)
+    if end >= size:
+        return False
+    with open(path, "r+b") as f:
+        f.truncate(end)
+        f.flush()
+        os.fsync(f.fileno())
+    invalidate_cache(path)
+    return True
+
+
+class RecordIndex:
+    """Persistent id -> (offset, length) index for a CSV file
+
+    Stored next to the data as `<name>.idx`: a first line holding the data
+    file's inode followed by one `id<TAB>offset<TAB>length` line per record.
+    Appends add one line; a data file rewritten in place (new inode) gets a
+    full rebuild and records appended behind the index's back are picked up
+    by scanning only the uncovered tail.
+    """
+
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.index_file = f"{os.path.splitext(data_file)[0]}.idx"
+        self._guard = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._locations = {}
+        self._inode = None
+        self._header = None
+        self._index_pos = 0
+        self._index_ino = None
+        self._covered = 0
+
+    def _record(self, row_id: str, offset: int, length: int) -> None:
+        self._locations[row_id] = (offset, length)
+        self._covered = max(self._covered, offset + length)
+
+    def _write_lines(self, entries: list) -> None:
+        with open(self.index_file, "a", encoding="utf-8") as f:
+            f.writelines(f"{row_id}\t{offset}\t{length}\n" for row_id, offset, length in entries)
+
+    def rebuild(self) -> None:
+        """Re-index the whole data file"""
+        with self._guard:
+            self._reset()
+            try:
+                st = os.stat(self.data_file)
+            except FileNotFoundError:
+                return
+            entries = list(self._scan(0))
+            tmp_path = f"{self.index_file}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(f"{st.st_ino}\n")
+                f.writelines(f"{row_id}\t{offset}\t{length}\n" for row_id, offset, length in entries)
+            os.replace(tmp_path, self.index_file)
+            self._inode = st.st_ino
+            self._index_ino = os.stat(self.index_file).st_ino
+            self._index_pos = os.path.getsize(self.index_file)
+            for entry in entries:
+                self._record(*entry)
+
+    def _scan(self, start: int):
+        """Yield (id, offset, length) for records from `start` (0 = whole file)"""
+        for offset, raw in iter_records(self.data_file, start):
+            values = decode_record(raw)
+            if offset == 0:
+                self._header = values
+                continue
+            if self._header is None:
+                self._header = read_header(self.data_file) or []
+            id_pos = self._header.index('id') if 'id' in self._header else 0
+            if id_pos < len(values):
+                yield values[id_pos].strip(), offset, len(raw)
+
+    def refresh(self) -> None:
+        """Bring the in-memory index up to date with the files on disk"""
+        with self._guard:
+            try:
+                st = os.stat(self.data_file)
+            except FileNotFoundError:
+                self._reset()
+                return
+            try:
+                index_st = os.stat(self.index_file)
+            except FileNotFoundError:
+                index_st = None
+
+            if index_st is None or index_st.st_ino != self._index_ino or index_st.st_size < self._index_pos:
+                # Index file replaced or never read by this process
+                self._reset()
+                if index_st is None:
+                    self.rebuild()
+                    return
+                self._index_ino = index_st.st_ino
+
+            if index_st.st_size > self._index_pos:
+                with open(self.index_file, "rb") as f:
+                    f.seek(self._index_pos)
+                    if self._index_pos == 0:
+                        first = f.readline()
+                        self._inode = int(first) if first.strip().isdigit() else None
+                        self._index_pos = f.tell()
+                    while True:
+                        line = f.readline()
+                        if not line.endswith(b"\n"):
+                            break  # EOF or a line still being written
+                        parts = line.decode("utf-8").rstrip("\n").split("\t")
+                        if len(parts) == 3:
+                            self._record(parts[0], int(parts[1]), int(parts[2]))
+                        self._index_pos += len(line)
+
+            if self._header is None:
+                self._header = read_header(self.data_file) or []
+
+            if self._inode != st.st_ino or self._covered > st.st_size:
+                self.rebuild()
+            elif self._covered < st.st_size:
+                start = self._covered or self._header_end()
+                tail = list(self._scan(start))
+                if tail:
+                    self._write_lines(tail)
+                    for entry in tail:
+                        self._record(*entry)
+
+    def _header_end(self) -> int:
+        for offset, raw in iter_records(self.data_file, 0):
+            self._header = decode_record(raw)
+            return offset + len(raw)
+        return 0
+
+    def add(self, row_ids: list, locations: list) -> None:
+        """Record freshly appended rows (ids and append_rows() locations)"""
+        with self._guard:
+            self.refresh()
+            entries = [
+                (row_id, offset, length) for row_id, (offset, length) in zip(row_ids, locations)
+                if self._locations.get(row_id) != (offset, length)
+            ]
+            if entries:
+                self._write_lines(entries)
+                for entry in entries:
+                    self._record(*entry)
+
+    def _read_at(self, location: tuple) -> dict:
+        offset, length = location
+        with open(self.data_file, "rb") as f:
+            f.seek(offset)
+            values = decode_record(f.read(length))
+        return {
+            col: (values[i] if i < len(values) and values[i] != "" else None)
+            for i, col in enumerate(self._header)
+        }
+
+    def read(self, row_id: str) -> Optional[dict]:
+        """Read one row by id with a single seek, or None when unknown"""
+        with self._guard:
+            self.refresh()
+            location = self._locations.get(row_id)
+            if location is None:
+                return None
+            row = self._read_at(location)
+            if (row.get('id') or "").strip() != row_id:
+                # Stale location (file changed underneath us); rebuild and retry once
+                self.rebuild()
+                location = self._locations.get(row_id)
+                if location is None:
+                    return None
+                row = self._read_at(location)
+        row['id'] = row_id
+        return row
+
+    def __contains__(self, row_id: str) -> bool:
+        with self._guard:
+            self.refresh()
+            return row_id in self._locations
+
+    def known(self, row_ids) -> set:
+        """The ids among `row_ids` that are in the file (one refresh for all of them)"""
+        with self._guard:
+            self.refresh()
+            return {row_id for row_id in row_ids if row_id in self._locations}
+
+
+def search_query(text: str) -> Optional[str]:
+    """FTS5 query matching every word of `text` as a prefix, or None when there are no words
+
+    Words are quoted, so operators and punctuation typed into the search
+    box cannot produce a query syntax error.
+    """
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def highlight_snippet(snippet: str) -> str:
+    """HTML for a search snippet: text escaped, matched terms in <mark>"""
+    escaped = snippet.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    return escaped.replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+class CommentSearchIndex:
+    """SQLite FTS5 index over the comment fields of the CSV submission files
+
+    Lives in its own database next to the data. Like RecordIndex it follows
+    the files it indexes: records appended since the last sync are indexed
+    from the stored byte offset, and a file that was rewritten (new inode)
+    or removed has its entries replaced. Soft deletes are not indexed;
+    callers filter results against the tombstones.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Transactions are opened explicitly (BEGIN IMMEDIATE in sync)
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS comments USING fts5("
+                f"id UNINDEXED, source UNINDEXED, {', '.join(COMMENT_FIELDS)}, "
+                f"tokenize='{SEARCH_TOKENIZER}')"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, inode INTEGER, indexed_upto INTEGER)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def sync(self, sources: dict) -> int:
+        """Index what changed in `sources` (name -> CSV path); return the number of rows added"""
+        conn = self._connect()
+        added = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT * FROM sources")}
+            for name in set(known) - set(sources):
+                conn.execute("DELETE FROM comments WHERE source = ?", (name,))
+                conn.execute("DELETE FROM sources WHERE name = ?", (name,))
+            for name, path in sources.items():
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                inode, upto = known.get(name, (None, 0))
+                if inode is not None and (inode != st.st_ino or upto > st.st_size):
+                    conn.execute("DELETE FROM comments WHERE source = ?", (name,))
+                    upto = 0
+                if upto < st.st_size:
+                    header = read_header(path) or []
+                    rows = []
+                    for offset, raw in iter_records(path, upto):
+                        upto = offset + len(raw)
+                        if offset == 0:
+                            continue
+                        values = decode_record(raw)
+                        row = dict(zip(header, values))
+                        answers = [row.get(field, "") or None for field in COMMENT_FIELDS]
+                        if any(answers):
+                            rows.append((row.get('id', "").strip(), name, *answers))
+                    placeholders = ", ".join("?" for _ in range(len(COMMENT_FIELDS) + 2))
+                    conn.executemany(
+                        f"INSERT INTO comments (id, source, {', '.join(COMMENT_FIELDS)}) VALUES ({placeholders})",
+                        rows
+                    )
+                    added += len(rows)
+                conn.execute(
+                    "INSERT OR REPLACE INTO sources (name, inode, indexed_upto) VALUES (?, ?, ?)",
+                    (name, st.st_ino, upto)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def search(self, query: str, limit: int) -> list:
+        """(id, snippet, score) of the best matches, best first (lower score is better)"""
+        match = search_query(query)
+        if match is None:
+            return []
+        return self._connect().execute(
+            "SELECT id, snippet(comments, -1, ?, ?, '…', 16), bm25(comments) AS score "
+            "FROM comments WHERE comments MATCH ? ORDER BY score LIMIT ?",
+            (MATCH_START, MATCH_END, match, limit)
+        ).fetchall()
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    # Timestamps may or may not carry fractional seconds; pandas 2 needs to be told
+    if int(pd.__version__.split(".")[0]) >= 2:
+        return pd.to_datetime(values, errors='coerce', format='ISO8601')
+    return pd.to_datetime(values, errors='coerce')
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast submission columns to their declared dtypes
+
+    Values that do not fit (text in a rating, an unparseable date) become
+    missing instead of failing the whole load.
+    """
+    for col, dtype in COLUMN_DTYPES.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+        else:
+            values = pd.to_numeric(df[col], errors='coerce').round()
+            limit = np.iinfo(dtype.lower()).max
+            df[col] = values.where(values.abs() <= limit).astype(dtype)
+    for col in DATE_FORMATS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = _parse_dates(df[col])
+    if 'id' in df.columns:
+        df['id'] = df['id'].astype(str).str.strip()
+    return df
+
+
+def read_submissions_csv(path: str, columns: Optional[list] = None) -> pd.DataFrame:
+    """Parse a submissions CSV with the declared schema, reading only `columns` if given"""
+    wanted = EXPECTED_COLUMNS if columns is None else columns
+    usecols = None if columns is None else (lambda col: col in columns)
+    try:
+        df = pd.read_csv(path, usecols=usecols, dtype=READ_DTYPES)
+    except (ValueError, TypeError, OverflowError):
+        # Bad values in a typed column: read as text and coerce column by column
+        df = pd.read_csv(path, usecols=usecols, dtype=str)
+    for col in wanted:
+        if col not in df.columns:
+            df[col] = None
+    return apply_schema(df)
+
+
+def iter_submissions_csv(path: str, columns: Optional[list] = None, chunk_size: int = CHUNK_ROWS):
+    """Parse a submissions CSV in typed chunks of `chunk_size` rows"""
+    wanted = EXPECTED_COLUMNS if columns is None else columns
+    usecols = None if columns is None else (lambda col: col in columns)
+    # Read as text and cast per chunk: a bad value in one chunk cannot fail the whole read
+    for df in pd.read_csv(path, usecols=usecols, dtype=str, chunksize=chunk_size):
+        for col in wanted:
+            if col not in df.columns:
+                df[col] = None
+        yield apply_schema(df)
+
+
+def check_filters(filters: Optional[dict]) -> dict:
+    """Validate column filters ({column: values to keep}); values become lists"""
+    filters = dict(filters or {})
+    for col in filters:
+        if col not in EXPECTED_COLUMNS:
+            raise ValueError(f"Cannot filter on unknown column: {col}")
+    return {col: list(values) for col, values in filters.items()}
+
+
+def has_comments(df: pd.DataFrame) -> pd.Series:
+    """Mask of the rows with at least one non-empty comment field"""
+    return df[COMMENT_FIELDS].fillna('').ne('').any(axis=1)
+
+
+def _after_cursor(df: pd.DataFrame, after: tuple) -> pd.Series:
+    """Mask of the rows that come after keyset cursor `after` in newest-first order"""
+    timestamp, row_id = after
+    if timestamp is None:
+        return df['timestamp'].isna() & (df['id'] < row_id)
+    timestamp = pd.Timestamp(timestamp)
+    return (
+        df['timestamp'].isna() | (df['timestamp'] < timestamp)
+        | ((df['timestamp'] == timestamp) & (df['id'] < row_id))
+    )
+
+
+def to_storage(value, column: str):
+    """Convert a loaded value back to the form it is stored in"""
+    if column in DATE_FORMATS and isinstance(value, datetime):
+        return None if pd.isna(value) else value.strftime(DATE_FORMATS[column])
+    return value
+
+
+def to_storage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of a loaded frame with dates formatted the way they are stored"""
+    df = df.copy()
+    for col, fmt in DATE_FORMATS.items():
+        if col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime(fmt)
+    return df
+
+
+def explode_comments(entry: dict) -> dict:
+    """Return a copy of an entry with a legacy `comments` JSON blob moved into COMMENT_FIELDS
+
+    Answers already present as columns win over the blob. Text that is not
+    a JSON object is kept as the first answer rather than dropped.
+    """
+    entry = dict(entry)
+    raw = entry.pop('comments', None)
+    if not isinstance(raw, str) or not raw.strip():
+        return entry
+    try:
+        answers = json.loads(raw)
+    except ValueError:
+        answers = None
+    if not isinstance(answers, dict):
+        answers = {COMMENT_FIELDS[0]: raw}
+    for field in COMMENT_FIELDS:
+        if _format_value(entry.get(field)) == "" and answers.get(field):
+            entry[field] = str(answers[field])
+    return entry
+
+
+def prepare_entry(entry: dict) -> dict:
+    """Return a copy of an entry with an id, every expected column and trimmed text"""
+    entry = explode_comments(entry)
+    if not entry.get('id') or _format_value(entry.get('id')) == "":
+        entry['id'] = str(uuid.uuid4())
+    for col in EXPECTED_COLUMNS:
+        if col not in entry:
+            entry[col] = None
+    entry = {k: to_storage(v, k) for k, v in entry.items()}
+    return {k: (v.strip() if isinstance(v, str) else v) for k, v in entry.items()}
+
+
+def empty_frame(columns: Optional[list] = None) -> pd.DataFrame:
+    """Empty submissions DataFrame with the expected (or given) columns and dtypes"""
+    return apply_schema(pd.DataFrame(columns=EXPECTED_COLUMNS if columns is None else columns))
+
+
+@lru_cache(maxsize=4096)
+def _parse_day(text: str) -> Optional[datetime]:
+    # Cached: a batch of submissions covers few distinct days
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def partition_key(timestamp, period: str = None) -> str:
+    """Name of the partition a submission timestamp belongs to
+
+    "2025-03" by month, "2025-Q1" by quarter, "2025" by year; entries
+    without a readable timestamp go to "undated".
+    """
+    day = _parse_day(_format_value(timestamp)[:10])
+    if day is None:
+        return "undated"
+    period = period or PARTITION_PERIOD
+    if period == "year":
+        return f"{day.year}"
+    if period == "quarter":
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    return f"{day.year}-{day.month:02d}"
+
+
+def partition_bounds(name: str) -> Optional[tuple]:
+    """(start, end) datetimes covered by a partition, end exclusive; None when not dated"""
+    if re.fullmatch(r"\d{4}", name):
+        year = int(name)
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    match = re.fullmatch(r"(\d{4})-Q([1-4])", name)
+    if match:
+        year, quarter = int(match.group(1)), int(match.group(2))
+        start = datetime(year, 3 * quarter - 2, 1)
+        return start, (datetime(year + 1, 1, 1) if quarter == 4 else datetime(year, 3 * quarter + 1, 1))
+    match = re.fullmatch(r"(\d{4})-(\d{2})", name)
+    if match and 1 <= int(match.group(2)) <= 12:
+        year, month = int(match.group(1)), int(match.group(2))
+        return datetime(year, month, 1), (datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1))
+    return None
+
+
+def date_bounds(date_range: Optional[tuple]) -> tuple:
+    """(start, end) datetimes of an inclusive (first day, last day) range, end exclusive
+
+    Either day may be None for an open end.
+    """
+    start, end = date_range or (None, None)
+    start = None if start is None else pd.Timestamp(start).normalize().to_pydatetime()
+    end = None if end is None else (pd.Timestamp(end).normalize() + timedelta(days=1)).to_pydatetime()
+    return start, end
+
+
+def rating_value(value) -> Optional[int]:
+    """A rating as an int from 1 to 5, or None when missing or out of range"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number in (1, 2, 3, 4, 5) else None
+
+
+def empty_rollups() -> dict:
+    """Rollups with no submissions: per rating column a count, a sum and a 1-5 histogram"""
+    return {
+        "submissions": 0,
+        "ratings": {col: {"count": 0, "sum": 0, "histogram": [0] * 5} for col in RATING_COLUMNS}
+    }
+
+
+def add_to_rollups(rollups: dict, rows: list, sign: int = 1) -> dict:
+    """Add (sign=1) or remove (sign=-1) active rows (dicts) from rollups in place"""
+    for row in rows:
+        rollups["submissions"] += sign
+        for col in RATING_COLUMNS:
+            rating = rating_value(row.get(col))
+            if rating is not None:
+                stats = rollups["ratings"][col]
+                stats["count"] += sign
+                stats["sum"] += sign * rating
+                stats["histogram"][rating - 1] += sign
+    return rollups
+
+
+def rollups_from_frame(df: pd.DataFrame) -> dict:
+    """Compute rollups from a frame of active submissions"""
+    rollups = empty_rollups()
+    rollups["submissions"] = len(df)
+    for col in RATING_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce') if col in df.columns else pd.Series(dtype=float)
+        counts = values[values.isin([1, 2, 3, 4, 5])].astype(int).value_counts()
+        histogram = [int(counts.get(rating, 0)) for rating in range(1, 6)]
+        rollups["ratings"][col] = {
+            "count": sum(histogram),
+            "sum": sum(rating * n for rating, n in zip(range(1, 6), histogram)),
+            "histogram": histogram
+        }
+    return rollups
+
+
+class MutationJournal:
+    """Write-ahead record of the store mutation in progress
+
+    Before a mutation touches any data file, its intent (operation,
+    arguments, and the inode and size of every file it appends to) is
+    written and fsync'd; once the mutation is complete the journal is
+    emptied again. Mutations run one at a time under the store lock, so a
+    journal that is not empty when the lock is taken belongs to a mutation
+    that was interrupted. A torn intent means the mutation never started
+    and is dropped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def begin(self, op: str, args: dict, files: dict) -> None:
+        line = json.dumps({"op": op, "args": args, "files": files}, default=str) + "\n"
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def active(self) -> bool:
+        """True when a mutation was begun and not committed (a single stat)"""
+        try:
+            return os.path.getsize(self.path) > 0
+        except FileNotFoundError:
+            return False
+
+    def pending(self) -> Optional[dict]:
+        """The recorded intent, or None when there is none or it is torn"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def commit(self) -> None:
+        with open(self.path, "w") as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class SubmissionStore:
+    """Interface shared by the submission storage backends
+
+    Soft-deleted entries stay in storage with a deletion marker and are
+    filtered out of the active view. Mutators return the affected row as a
+    dict, or None when the id is not found in the expected state.
+    """
+
+    def save(self, entry: dict) -> str:
+        """Persist a new submission and return its id"""
+        raise NotImplementedError
+
+    def save_many(self, entries: list) -> list:
+        """Persist several submissions in one write and return their ids
+
+        Entries whose id is already stored are skipped, so replaying a batch
+        that was partly written before never duplicates rows.
+        """
+        raise NotImplementedError
+
+    def get(self, row_id: str) -> Optional[dict]:
+        """Return one submission (active or deleted) by id, or None"""
+        raise NotImplementedError
+
+    def load_submissions(self, columns: Optional[list] = None, date_range: Optional[tuple] = None) -> pd.DataFrame:
+        """Return active submissions, typed per COLUMN_DTYPES, limited to `columns` if given
+
+        `date_range` is an inclusive (first day, last day) pair; only
+        submissions whose timestamp falls in it are returned.
+        """
+        raise NotImplementedError
+
+    def load_deleted_entries(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """Return all soft-deleted entries (limited to `columns` if given) with their `deleted_at` time"""
+        raise NotImplementedError
+
+    def iter_submissions(self, columns: Optional[list] = None, deleted: bool = False,
+                         date_range: Optional[tuple] = None, filters: Optional[dict] = None,
+                         chunk_size: int = CHUNK_ROWS):
+        """Yield active submissions (or deleted entries with `deleted_at`) in chunks of at most `chunk_size` rows
+
+        `filters` maps a column to the values to keep ({'school': [...]});
+        like `date_range` it is applied while reading, before rows reach
+        the caller. Unlike the load methods this never holds more than one
+        chunk in memory, so it is what exports use.
+        """
+        raise NotImplementedError
+
+    def page_submissions(self, columns: Optional[list] = None, deleted: bool = False,
+                         after: Optional[tuple] = None, limit: int = 20, date_range: Optional[tuple] = None,
+                         filters: Optional[dict] = None, with_comments: bool = False) -> tuple:
+        """One page of submissions, newest first, and the cursor of the next page
+
+        Rows are ordered by (timestamp, id) descending, entries without a
+        timestamp last. `after` is the cursor returned with the previous
+        page (None for the first page); the returned cursor is None on the
+        last page. Only the rows of the page are read in full.
+        `with_comments` keeps only entries with at least one comment.
+        """
+        raise NotImplementedError
+
+    def count_submissions(self, deleted: bool = False, date_range: Optional[tuple] = None,
+                          filters: Optional[dict] = None, with_comments: bool = False) -> int:
+        """Number of rows page_submissions() pages through with the same arguments"""
+        raise NotImplementedError
+
+    def submission_ids(self, deleted: bool = False, date_range: Optional[tuple] = None,
+                       filters: Optional[dict] = None, with_comments: bool = False) -> list:
+        """Ids of every row page_submissions() pages through with the same arguments, in page order
+
+        Only ids are read, so a bulk action can cover every matching row
+        instead of one page.
+        """
+        raise NotImplementedError
+
+    def delete_many(self, row_ids: list) -> list:
+        """Mark active submissions as deleted in one write; return the affected rows"""
+        raise NotImplementedError
+
+    def restore_many(self, row_ids: list) -> list:
+        """Clear the deletion marker of deleted entries in one write"""
+        raise NotImplementedError
+
+    def purge_many(self, row_ids: list, deleted: bool = False) -> list:
+        """Permanently remove active submissions (or deleted entries when `deleted`) in one write"""
+        raise NotImplementedError
+
+    def delete(self, row_id: str) -> Optional[dict]:
+        """Mark an active submission as deleted"""
+        rows = self.delete_many([row_id])
+        return rows[0] if rows else None
+
+    def restore(self, row_id: str) -> Optional[dict]:
+        """Clear the deletion marker of a deleted entry"""
+        rows = self.restore_many([row_id])
+        return rows[0] if rows else None
+
+    def purge(self, row_id: str, deleted: bool = False) -> Optional[dict]:
+        """Permanently remove an active submission (or a deleted entry when `deleted`)"""
+        rows = self.purge_many([row_id], deleted=deleted)
+        return rows[0] if rows else None
+
+    def data_files(self) -> dict:
+        """Files (name -> path) holding the store's data, for backups"""
+        raise NotImplementedError
+
+    def recorded_counts(self) -> dict:
+        """Active and deleted counts as last recorded, for monitoring
+
+        Never takes the store lock or reads the data, so it cannot hold up
+        writers; a count not recorded yet is None.
+        """
+        raise NotImplementedError
+
+    def data_version(self) -> tuple:
+        """Cheap token (a few stat calls) that changes whenever the stored data changes
+
+        Callers cache views derived from the data under it.
+        """
+        raise NotImplementedError
+
+    def stored_records(self) -> tuple:
+        """(active, deleted) rows as dicts, deleted ones with `deleted_at`, for copying into another store"""
+        active = self.load_submissions().to_dict("records")
+        deleted = self.load_deleted_entries().to_dict("records")
+        return active, deleted
+
+    def recover(self) -> Optional[str]:
+        """Finish a mutation a crashed process left half done
+
+        Returns the name of the recovered operation, or None when storage
+        was consistent. Only the interrupted mutation is looked at, so this
+        is cheap enough to call on every start.
+        """
+        raise NotImplementedError
+
+    def search_comments(self, query: str, limit: int = 50) -> list:
+        """Active submissions whose comments match every word of `query`, best match first
+
+        Each result is the stored row plus `snippet` (the best matching
+        passage, terms marked as in highlight_snippet) and `score`.
+        """
+        raise NotImplementedError
+
+    def rating_rollups(self) -> dict:
+        """Per rating column count, sum and 1-5 histogram over active submissions
+
+        Maintained on every save, delete, restore and purge, so reading it
+        does not depend on the number of submissions.
+        """
+        raise NotImplementedError
+
+    # (version, description, method name) in the order they must be applied
+    MIGRATIONS = []
+
+    def schema_version(self) -> int:
+        """Schema version recorded in storage"""
+        raise NotImplementedError
+
+    def _set_schema_version(self, version: int, description: str) -> None:
+        raise NotImplementedError
+
+    def _migration_lock(self):
+        raise NotImplementedError
+
+    def migrate(self) -> list:
+        """Apply pending schema migrations once and return their descriptions
+
+        After the first successful run in a process this is a no-op, and a
+        fresh process only reads the recorded version before returning.
+        """
+        if getattr(self, "_migrated", False):
+            return []
+        applied = []
+        if self.schema_version() < SCHEMA_VERSION:
+            with self._migration_lock():
+                # Another process may have migrated while we waited for the lock
+                current = self.schema_version()
+                for version, description, method in self.MIGRATIONS:
+                    if version > current:
+                        getattr(self, method)()
+                        self._set_schema_version(version, description)
+                        applied.append(description)
+        self._migrated = True
+        return applied
+
+
+class CsvSubmissionStore(SubmissionStore):
+    """Backend keeping submissions in time-partitioned CSV files with a tombstone log
+
+    Submissions are split by timestamp into one file per PARTITION_PERIOD
+    under `submissions/` (2025-03.csv, ...), each with its own id index, so a
+    date-range load only parses the partitions overlapping the range. The
+    single submissions.csv of older versions is read as one more partition
+    until migration 6 splits it up.
+
+    Soft deletes and restores append one record to tombstones.csv; the last
+    record for an id decides whether it is deleted, so both the active and
+    the "deleted" views are filters over the same submission files.
+
+    Every mutation runs under one advisory lock file next to the data and
+    rewrites go through a temporary file plus rename, so several app
+    processes can share the same data directory. Each mutation is also
+    recorded in store.journal before it starts; a crash mid-way is
+    recovered by trimming partial appends and replaying it.
+    """
+
+    def __init__(self, submissions_file: str, deleted_file: str, lock_timeout: float = None,
+                 partition_period: str = None):
+        # Single-file layout of older versions, split into partitions by migration 6
+        self.submissions_file = submissions_file
+        # Legacy file holding moved-out rows, folded into tombstones by migration 3
+        self.deleted_file = deleted_file
+        data_dir = os.path.dirname(os.path.abspath(submissions_file))
+        self.partition_dir = os.path.join(data_dir, "submissions")
+        self.partition_period = partition_period or PARTITION_PERIOD
+        self.tombstone_file = os.path.join(data_dir, "tombstones.csv")
+        self._indexes = {}
+        self.search_index = CommentSearchIndex(os.path.join(data_dir, "comments_fts.db"))
+        self.lock_file = os.path.join(data_dir, "store.lock")
+        self.version_file = os.path.join(data_dir, "schema_version.json")
+        self.rollup_file = os.path.join(data_dir, "rollups.json")
+        self.lock_timeout = lock_timeout
+        self.journal = MutationJournal(os.path.join(data_dir, "store.journal"))
+
+    def _lock(self):
+        return file_lock(self.lock_file, self.lock_timeout)
+
+    def _journal_files(self, op: str, args: dict) -> dict:
+        """Inode and size (None when missing) of every file the mutation appends to"""
+        if op == "save":
+            paths = {
+                self._partition_path(partition_key(entry.get('timestamp'), self.partition_period))
+                for entry in args["entries"]
+            }
+        elif op in ("delete", "restore"):
+            paths = {self.tombstone_file}
+        else:
+            # Purges only replace whole files by rename
+            paths = set()
+        files = {}
+        for path in paths:
+            identity = file_identity(path)
+            files[path] = None if identity is None else [identity[0], identity[2]]
+        return files
+
+    def _mutate(self, op: str, **args) -> list:
+        """Run `_apply_<op>` under the store lock, journaled so a crash can be recovered"""
+        with self._lock():
+            self._recover()
+            self.journal.begin(op, args, self._journal_files(op, args))
+            rows = getattr(self, f"_apply_{op}")(**args)
+            self.journal.commit()
+            return rows
+
+    def _recover(self) -> Optional[str]:
+        if not self.journal.active():
+            return None
+        intent = self.journal.pending()
+        if intent is None:
+            # Torn intent: the mutation never started
+            self.journal.commit()
+            return None
+        for path, state in intent["files"].items():
+            identity = file_identity(path)
+            if identity is None:
+                continue
+            # Records before the recorded size were complete; a replaced file is checked whole
+            start = state[1] if state is not None and state[0] == identity[0] else 0
+            trim_partial_record(path, start)
+        # Every mutation is idempotent, so replaying it only does what had not been done
+        getattr(self, f"_apply_{intent['op']}")(**intent["args"])
+        # Part of the mutation was done before the crash, so the rollups could not follow it
+        state = self._read_rollups()
+        if state is not None and state["files"] != self._file_state():
+            self._build_rollups()
+        self.journal.commit()
+        return intent["op"]
+
+    def recover(self) -> Optional[str]:
+        if not self.journal.active():
+            return None
+        with self._lock():
+            return self._recover()
+
+    MIGRATIONS = [
+        (1, "Backfill missing submission ids", "_migrate_backfill_ids"),
+        (2, "Add missing expected columns", "_migrate_expected_columns"),
+        (3, "Fold deleted entries into tombstones", "_migrate_tombstones"),
+        (4, "Split comments JSON into columns", "_migrate_comment_columns"),
+        (5, "Build rating rollups", "_migrate_rollups"),
+        (6, "Partition submissions by period", "_migrate_partitions"),
+        (7, "Build comment search index", "_migrate_search_index"),
+    ]
+
+    def schema_version(self) -> int:
+        try:
+            with open(self.version_file, "r") as f:
+                return int(json.load(f).get("version", 0))
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _set_schema_version(self, version: int, description: str) -> None:
+        try:
+            with open(self.version_file, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {"version": 0, "history": []}
+        state["version"] = version
+        state.setdefault("history", []).append({
+            "version": version,
+            "description": description,
+            "applied_at": datetime.now().isoformat(timespec="seconds")
+        })
+        tmp_path = f"{self.version_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.version_file)
+
+    def _migration_lock(self):
+        return self._lock()
+
+    def _data_files(self) -> list:
+        return [
+            path for path in (self.submissions_file, self.deleted_file)
+            if os.path.exists(path) and os.path.getsize(path) > 0
+        ]
+
+    def _migrate_backfill_ids(self) -> None:
+        for path in self._data_files():
+            df = pd.read_csv(path)
+            if 'id' in df.columns:
+                ids = df['id'].astype(str).str.strip()
+                missing = df['id'].isna() | ids.isin(["", "nan"])
+                if not missing.any():
+                    continue
+                df.loc[missing, 'id'] = [str(uuid.uuid4()) for _ in range(int(missing.sum()))]
+            else:
+                # If id column is missing, add new UUIDs as the first column
+                df.insert(0, 'id', [str(uuid.uuid4()) for _ in range(len(df))])
+            self._write(df, path)
+
+    def _migrate_expected_columns(self) -> None:
+        for path in self._data_files():
+            header = read_header(path) or []
+            if all(col in header for col in EXPECTED_COLUMNS):
+                continue
+            df = pd.read_csv(path)
+            for col in EXPECTED_COLUMNS:
+                if col not in df.columns:
+                    df[col] = None
+            self._write(df, path)
+
+    def _migrate_tombstones(self) -> None:
+        if not os.path.exists(self.deleted_file):
+            return
+        if os.path.getsize(self.deleted_file) > 0:
+            # Read as text so the rows are appended exactly as they were stored
+            deleted_df = pd.read_csv(self.deleted_file, dtype=str)
+            deleted_df['id'] = deleted_df['id'].str.strip()
+            # Tombstones first: if we stop halfway, a rerun only appends what is missing
+            self._append_tombstones(deleted_df['id'].tolist(), deleted=True)
+            present = set(self._parse(self.submissions_file, ['id'])['id'])
+            missing = deleted_df[~deleted_df['id'].isin(present)]
+            if not missing.empty:
+                records = [explode_comments(row) for row in missing.to_dict("records")]
+                append_rows(self.submissions_file, records, EXPECTED_COLUMNS)
+                invalidate_cache(self.submissions_file)
+        os.replace(self.deleted_file, f"{self.deleted_file}.migrated")
+
+    def _migrate_comment_columns(self) -> None:
+        if 'comments' not in (read_header(self.submissions_file) or []):
+            return
+        df = pd.read_csv(self.submissions_file, dtype=str, keep_default_na=False)
+        rows = [explode_comments(row) for row in df.to_dict("records")]
+        extra = [col for col in df.columns if col not in EXPECTED_COLUMNS and col != 'comments']
+        self._write(pd.DataFrame(rows, columns=EXPECTED_COLUMNS + extra), self.submissions_file)
+
+    def _migrate_rollups(self) -> None:
+        self._build_rollups()
+
+    def _migrate_partitions(self) -> None:
+        """Move the rows of submissions.csv into their partition files
+
+        Records keep their stored values; rows a partition already holds
+        (from an interrupted earlier run) are not appended twice.
+        """
+        header = read_header(self.submissions_file) if os.path.exists(self.submissions_file) else None
+        if header:
+            columns = EXPECTED_COLUMNS + [col for col in header if col not in EXPECTED_COLUMNS]
+            groups = {}
+            for offset, raw in iter_records(self.submissions_file):
+                if offset == 0:
+                    continue
+                values = decode_record(raw)
+                row = {col: (values[i] if i < len(values) else "") for i, col in enumerate(header)}
+                row['id'] = row.get('id', "").strip()
+                groups.setdefault(partition_key(row.get('timestamp'), self.partition_period), []).append(row)
+            for key, rows in groups.items():
+                path = self._partition_path(key)
+                present = self._index(path).known(row['id'] for row in rows)
+                rows = [row for row in rows if row['id'] not in present]
+                if rows:
+                    self._append(path, rows, columns)
+        for path in (self.submissions_file, f"{os.path.splitext(self.submissions_file)[0]}.idx"):
+            if os.path.exists(path):
+                os.remove(path)
+        invalidate_cache(self.submissions_file)
+        self._indexes.pop(self.submissions_file, None)
+        self._build_rollups()
+
+    def _migrate_search_index(self) -> None:
+        self.search_index.sync(self._search_sources())
+
+    def _search_sources(self) -> dict:
+        return {os.path.relpath(path, os.path.dirname(self.partition_dir)): path for path in self._partition_files()}
+
+    def _partition_path(self, key: str) -> str:
+        return os.path.join(self.partition_dir, f"{key}.csv")
+
+    def _partition_files(self) -> list:
+        """Every file holding submissions, oldest partition first"""
+        files = [self.submissions_file] if os.path.exists(self.submissions_file) else []
+        try:
+            names = sorted(name for name in os.listdir(self.partition_dir) if name.endswith(".csv"))
+        except FileNotFoundError:
+            names = []
+        return files + [os.path.join(self.partition_dir, name) for name in names]
+
+    def _files_for(self, date_range: Optional[tuple]) -> list:
+        """Partition files that can hold submissions in `date_range` (all of them when None)"""
+        files = self._partition_files()
+        start, end = date_bounds(date_range)
+        if start is None and end is None:
+            return files
+        selected = []
+        for path in files:
+            bounds = partition_bounds(os.path.splitext(os.path.basename(path))[0])
+            # The legacy file and "undated" are not bounded and always read
+            if path == self.submissions_file or bounds is None:
+                selected.append(path)
+            elif (end is None or bounds[0] < end) and (start is None or bounds[1] > start):
+                selected.append(path)
+        return selected
+
+    def _index(self, path: str) -> RecordIndex:
+        if path not in self._indexes:
+            self._indexes[path] = RecordIndex(path)
+        return self._indexes[path]
+
+    def _append(self, path: str, rows: list, columns: list = EXPECTED_COLUMNS) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        locations = append_rows(path, rows, columns)
+        self._index(path).add([row['id'] for row in rows], locations)
+        invalidate_cache(path)
+        os.chmod(path, 0o666)  # Ensure proper permissions
+
+    def _file_state(self) -> list:
+        """Identities of the files the rollups are derived from"""
+        return [
+            [os.path.basename(path), *(list(identity) if identity else [])]
+            for path, identity in (
+                (path, file_identity(path)) for path in [*self._partition_files(), self.tombstone_file]
+            )
+        ]
+
+    def data_version(self) -> tuple:
+        return tuple(tuple(state) for state in self._file_state())
+
+    def recorded_counts(self) -> dict:
+        # As of the last rollup write; may trail a change made outside the app until the next rebuild
+        state = self._read_rollups()
+        if state is None:
+            return {"active": None, "deleted": None}
+        return {"active": state["rollups"]["submissions"], "deleted": state.get("deleted")}
+
+    def _read_rollups(self) -> Optional[dict]:
+        try:
+            with open(self.rollup_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_rollups(self, rollups: dict) -> None:
+        tmp_path = f"{self.rollup_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            # The deleted count rides along for recorded_counts()
+            json.dump({"files": self._file_state(), "rollups": rollups, "deleted": len(self._deleted_ids())}, f)
+        os.replace(tmp_path, self.rollup_file)
+
+    def _build_rollups(self) -> dict:
+        rollups = rollups_from_frame(self.load_submissions(RATING_COLUMNS))
+        self._write_rollups(rollups)
+        return rollups
+
+    def _update_rollups(self, before: list, rows: list, sign: int) -> None:
+        """Apply a mutation's rows to the rollups, if they matched the data before it
+
+        Rollups that were already stale are left alone; the next read
+        notices the file identities differ and rebuilds them.
+        """
+        state = self._read_rollups()
+        if state is None or state["files"] != before:
+            return
+        self._write_rollups(add_to_rollups(state["rollups"], rows, sign))
+
+    @staticmethod
+    def _parse(path: str, columns: Optional[list] = None) -> pd.DataFrame:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return empty_frame(columns)
+        return read_submissions_csv(path, columns)
+
+    @staticmethod
+    def _parse_tombstones(path: str) -> pd.DataFrame:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return pd.DataFrame(columns=TOMBSTONE_COLUMNS)
+        return pd.read_csv(path, dtype={'id': str})
+
+    def _deleted_ids(self) -> pd.Series:
+        """Deletion time of every currently deleted id, indexed by id"""
+        tombstones = cached_frame(self.tombstone_file, self._parse_tombstones)
+        latest = tombstones.drop_duplicates('id', keep='last')
+        latest = latest[latest['deleted'].astype(int) == 1]
+        return pd.Series(latest['changed_at'].values, index=latest['id'].values, dtype=object)
+
+    def _append_tombstones(self, row_ids: list, deleted: bool) -> None:
+        changed_at = datetime.now().isoformat(timespec="seconds")
+        records = [{'id': row_id, 'deleted': int(deleted), 'changed_at': changed_at} for row_id in row_ids]
+        append_rows(self.tombstone_file, records, TOMBSTONE_COLUMNS)
+        invalidate_cache(self.tombstone_file)
+
+    def _find(self, row_ids: list, deleted: bool) -> list:
+        """Rows among `row_ids` that are currently in the requested state
+
+        Rows are read through the id index, so no DataFrame is parsed.
+        """
+        deleted_ids = set(self._deleted_ids().index)
+        rows = []
+        for row_id in dict.fromkeys(row_ids):
+            if (row_id in deleted_ids) != deleted:
+                continue
+            row = self.get(row_id)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def _write(self, df: pd.DataFrame, path: str) -> None:
+        atomic_write_csv(df, path)
+        invalidate_cache(path)
+        if path not in (self.tombstone_file, self.deleted_file):
+            self._index(path).rebuild()
+
+    def _rewrite_without(self, row_ids: set) -> None:
+        """Rewrite the partitions holding any of the given ids without them"""
+        for path in self._partition_files():
+            if self._index(path).known(row_ids):
+                self._rewrite_file_without(path, row_ids)
+
+    def _rewrite_file_without(self, path: str, row_ids: set) -> None:
+        """Rewrite one submissions file without the given ids
+
+        Records are copied byte for byte, so the remaining rows keep exactly
+        the values (and formats) they were written with.
+        """
+        header = read_header(path)
+        id_pos = header.index('id')
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                for offset, raw in iter_records(path):
+                    if offset > 0:
+                        fields = decode_record(raw)
+                        if len(fields) > id_pos and fields[id_pos].strip() in row_ids:
+                            continue
+                    out.write(raw)
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(tmp_path, 0o666)
+            os.replace(tmp_path, path)
+            _fsync_dir(path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        invalidate_cache(path)
+        self._index(path).rebuild()
+
+    def save(self, entry: dict) -> str:
+        return self.save_many([entry])[0]
+
+    def save_many(self, entries: list) -> list:
+        entries = [prepare_entry(entry) for entry in entries]
+        if self._mutate("save", entries=entries):
+            # Outside the store lock: the index has its own transaction and
+            # reads only what was appended since its stored offsets
+            try:
+                self.search_index.sync(self._search_sources())
+            except sqlite3.Error:
+                pass  # The next search catches up from the stored offsets
+        return [entry['id'] for entry in entries]
+
+    def _apply_save(self, entries: list) -> list:
+        before = self._file_state()
+        stored = set()
+        for path in self._partition_files():
+            stored |= self._index(path).known(entry['id'] for entry in entries)
+        new = {}
+        for entry in entries:
+            if entry['id'] not in new and entry['id'] not in stored:
+                new[entry['id']] = entry
+        partitions = {}
+        for entry in new.values():
+            key = partition_key(entry.get('timestamp'), self.partition_period)
+            partitions.setdefault(key, []).append(entry)
+        for key, rows in partitions.items():
+            self._append(self._partition_path(key), rows)
+        if new:
+            self._update_rollups(before, list(new.values()), 1)
+        return list(new.values())
+
+    def get(self, row_id: str) -> Optional[dict]:
+        # Newest partitions first: recent submissions are the ones looked up most
+        for path in reversed(self._partition_files()):
+            row = self._index(path).read(row_id)
+            if row is not None:
+                return row
+        return None
+
+    def stored_records(self) -> tuple:
+        """Rows as stored, read without running migrations or writing any file
+
+        Works on every layout this backend has had: the single
+        submissions.csv (ids missing, comments as a JSON blob), the
+        moved-out deleted_entries.csv, and partitions with tombstones.
+        """
+        active = []
+        for path in self._partition_files():
+            if os.path.getsize(path) > 0:
+                df = pd.read_csv(path, dtype=str, keep_default_na=False)
+                active.extend(explode_comments(row) for row in df.to_dict("records"))
+        deleted_at = self._deleted_ids()
+        deleted = [dict(row, deleted_at=deleted_at[row['id'].strip()]) for row in active
+                   if row.get('id', '').strip() in deleted_at.index]
+        active = [row for row in active if row.get('id', '').strip() not in deleted_at.index]
+        if os.path.exists(self.deleted_file) and os.path.getsize(self.deleted_file) > 0:
+            # Not migrated yet: these rows were moved out of submissions.csv when deleted
+            moved_at = datetime.now().isoformat(timespec="seconds")
+            df = pd.read_csv(self.deleted_file, dtype=str, keep_default_na=False)
+            deleted.extend(
+                dict(explode_comments(row), deleted_at=row.get('deleted_at') or moved_at)
+                for row in df.to_dict("records")
+            )
+        return active, deleted
+
+    def data_files(self) -> dict:
+        # The id and search indexes are derived data and are rebuilt on demand, so they are left out
+        files = dict(self._search_sources())
+        for path in (self.tombstone_file, self.version_file, self.deleted_file):
+            if os.path.exists(path):
+                files[os.path.basename(path)] = path
+        return files
+
+    def _load(self, columns: Optional[list], date_range: Optional[tuple] = None) -> pd.DataFrame:
+        # The id column is always read since the tombstone filter needs it
+        read_columns = None if columns is None else list(dict.fromkeys(['id', *columns]))
+        if date_range is not None and read_columns is not None:
+            read_columns = list(dict.fromkeys([*read_columns, 'timestamp']))
+        frames = [cached_frame(path, self._parse, read_columns) for path in self._files_for(date_range)]
+        frames = [df for df in frames if not df.empty] or frames[:1]
+        if not frames:
+            return empty_frame(read_columns)
+        # Categoricals of different partitions concatenate to object; apply_schema recasts them
+        df = frames[0] if len(frames) == 1 else apply_schema(pd.concat(frames, ignore_index=True))
+        if date_range is not None:
+            start, end = date_bounds(date_range)
+            mask = df['timestamp'].notna()
+            if start is not None:
+                mask &= df['timestamp'] >= start
+            if end is not None:
+                mask &= df['timestamp'] < end
+            df = df[mask].reset_index(drop=True)
+        return df
+
+    def load_submissions(self, columns: Optional[list] = None, date_range: Optional[tuple] = None) -> pd.DataFrame:
+        df = self._load(columns, date_range)
+        deleted = self._deleted_ids()
+        if not deleted.empty:
+            df = df[~df['id'].isin(deleted.index)].reset_index(drop=True)
+        return df if columns is None else df[list(columns)]
+
+    def load_deleted_entries(self, columns: Optional[list] = None) -> pd.DataFrame:
+        deleted = self._deleted_ids()
+        df = self._load(columns)
+        df = df[df['id'].isin(deleted.index)].reset_index(drop=True)
+        df['deleted_at'] = df['id'].map(deleted)
+        return df if columns is None else df[[*columns, 'deleted_at']]
+
+    def iter_submissions(self, columns: Optional[list] = None, deleted: bool = False,
+                         date_range: Optional[tuple] = None, filters: Optional[dict] = None,
+                         chunk_size: int = CHUNK_ROWS):
+        filters = check_filters(filters)
+        deleted_ids = self._deleted_ids()
+        columns = EXPECTED_COLUMNS if columns is None else list(columns)
+        read_columns = list(dict.fromkeys(['id', 'timestamp', *columns, *filters]))
+        start, end = date_bounds(date_range)
+        for path in self._files_for(date_range):
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                continue
+            for df in iter_submissions_csv(path, read_columns, chunk_size):
+                mask = df['id'].isin(deleted_ids.index)
+                if not deleted:
+                    mask = ~mask
+                if start is not None:
+                    mask &= df['timestamp'] >= start
+                if end is not None:
+                    mask &= df['timestamp'] < end
+                for col, values in filters.items():
+                    mask &= df[col].isin(values)
+                df = df[mask].reset_index(drop=True)
+                if df.empty:
+                    continue
+                if deleted:
+                    df['deleted_at'] = df['id'].map(deleted_ids)
+                    yield df[[*columns, 'deleted_at']]
+                else:
+                    yield df[columns]
+
+    def _key_frame(self, path: str, deleted_ids: pd.Series, deleted: bool, date_range: Optional[tuple],
+                   filters: dict, with_comments: bool) -> pd.DataFrame:
+        """(id, timestamp) of the rows of one file matching the paging arguments"""
+        columns = ['id', 'timestamp', *filters, *(COMMENT_FIELDS if with_comments else [])]
+        df = cached_frame(path, self._parse, list(dict.fromkeys(columns)))
+        mask = df['id'].isin(deleted_ids.index)
+        if not deleted:
+            mask = ~mask
+        start, end = date_bounds(date_range)
+        if start is not None:
+            mask &= df['timestamp'] >= start
+        if end is not None:
+            mask &= df['timestamp'] < end
+        for col, values in filters.items():
+            mask &= df[col].isin(values)
+        if with_comments:
+            mask &= has_comments(df)
+        return df.loc[mask, ['id', 'timestamp']]
+
+    def page_submissions(self, columns: Optional[list] = None, deleted: bool = False,
+                         after: Optional[tuple] = None, limit: int = 20, date_range: Optional[tuple] = None,
+                         filters: Optional[dict] = None, with_comments: bool = False) -> tuple:
+        filters = check_filters(filters)
+        columns = EXPECTED_COLUMNS if columns is None else list(columns)
+        deleted_ids = self._deleted_ids()
+        after_time = None if after is None or after[0] is None else pd.Timestamp(after[0])
+        dated, unbounded = [], []
+        for path in self._files_for(date_range):
+            bounds = partition_bounds(os.path.splitext(os.path.basename(path))[0])
+            if path == self.submissions_file or bounds is None:
+                unbounded.append(path)
+            else:
+                dated.append((bounds, path))
+
+        # Only (id, timestamp) is read to find the page; dated partitions by
+        # newest end first, stopping once the page is full of rows newer than
+        # anything the rest can hold. Partitions of different periods (left
+        # by changing partition_period) may overlap, so the end decides.
+        candidates = []
+        timestamps = []
+        for bounds, path in sorted(dated, key=lambda item: item[0][1], reverse=True):
+            if sum(len(t) for t in timestamps) > limit:
+                newest = pd.concat(timestamps).nlargest(limit + 1)
+                if bounds[1] <= newest.iloc[-1]:
+                    break  # This and every remaining partition only hold older rows
+            if after is not None and (after_time is None or bounds[0] > after_time):
+                continue  # Every row of this partition comes before the cursor
+            keys = self._key_frame(path, deleted_ids, deleted, date_range, filters, with_comments)
+            if after is not None:
+                keys = keys[_after_cursor(keys, after)]
+            candidates.append(keys.assign(path=path))
+            timestamps.append(keys['timestamp'].dropna())
+        for path in unbounded:
+            keys = self._key_frame(path, deleted_ids, deleted, date_range, filters, with_comments)
+            if after is not None:
+                keys = keys[_after_cursor(keys, after)]
+            candidates.append(keys.assign(path=path))
+
+        candidates = [keys for keys in candidates if not keys.empty]
+        if not candidates:
+            return empty_frame(columns + (['deleted_at'] if deleted else [])), None
+        keys = pd.concat(candidates, ignore_index=True).sort_values(
+            ['timestamp', 'id'], ascending=False, na_position='last'
+        ).head(limit + 1)
+        cursor = None
+        if len(keys) > limit:
+            last = keys.iloc[limit - 1]
+            cursor = (None if pd.isna(last['timestamp']) else last['timestamp'].isoformat(), last['id'])
+        page = keys.head(limit)
+
+        # Full rows are read through the id indexes, one seek each
+        rows = [self._index(path).read(row_id) for row_id, path in zip(page['id'], page['path'])]
+        df = pd.DataFrame([row for row in rows if row is not None])
+        for col in ['id', *columns]:
+            if col not in df.columns:
+                df[col] = None
+        if deleted:
+            df['deleted_at'] = df['id'].map(deleted_ids)
+        return apply_schema(df[columns + (['deleted_at'] if deleted else [])].copy()), cursor
+
+    def count_submissions(self, deleted: bool = False, date_range: Optional[tuple] = None,
+                          filters: Optional[dict] = None, with_comments: bool = False) -> int:
+        deleted_ids = self._deleted_ids()
+        if date_range is None and not filters and not with_comments:
+            # Known from the tombstone log and the rollups without reading a data file
+            return len(deleted_ids) if deleted else self.rating_rollups()["submissions"]
+        filters = check_filters(filters)
+        return sum(
+            len(self._key_frame(path, deleted_ids, deleted, date_range, filters, with_comments))
+            for path in self._files_for(date_range)
+        )
+
+    def submission_ids(self, deleted: bool = False, date_range: Optional[tuple] = None,
+                       filters: Optional[dict] = None, with_comments: bool = False) -> list:
+        filters = check_filters(filters)
+        deleted_ids = self._deleted_ids()
+        keys = [
+            self._key_frame(path, deleted_ids, deleted, date_range, filters, with_comments)
+            for path in self._files_for(date_range)
+        ]
+        keys = [frame for frame in keys if not frame.empty]
+        if not keys:
+            return []
+        return pd.concat(keys, ignore_index=True).sort_values(
+            ['timestamp', 'id'], ascending=False, na_position='last'
+        )['id'].tolist()
+
+    def delete_many(self, row_ids: list) -> list:
+        return self._mutate("delete", row_ids=list(row_ids))
+
+    def _apply_delete(self, row_ids: list) -> list:
+        before = self._file_state()
+        rows = self._find(row_ids, deleted=False)
+        if rows:
+            self._append_tombstones([row['id'] for row in rows], deleted=True)
+            self._update_rollups(before, rows, -1)
+        return rows
+
+    def restore_many(self, row_ids: list) -> list:
+        return self._mutate("restore", row_ids=list(row_ids))
+
+    def _apply_restore(self, row_ids: list) -> list:
+        before = self._file_state()
+        rows = self._find(row_ids, deleted=True)
+        if rows:
+            self._append_tombstones([row['id'] for row in rows], deleted=False)
+            self._update_rollups(before, rows, 1)
+        return rows
+
+    def purge_many(self, row_ids: list, deleted: bool = False) -> list:
+        return self._mutate("purge", row_ids=list(row_ids), deleted=deleted)
+
+    def _apply_purge(self, row_ids: list, deleted: bool) -> list:
+        before = self._file_state()
+        rows = self._find(row_ids, deleted=deleted)
+        if rows:
+            self._rewrite_without({row['id'] for row in rows})
+        # Compact the tombstone log while we are rewriting anyway. Every given id
+        # that is no longer stored goes, so a replay after a crash between the
+        # rewrite and this step still drops the tombstones of rows it cannot find.
+        stored = set()
+        for path in self._partition_files():
+            stored |= self._index(path).known(row_ids)
+        gone = set(row_ids) - stored
+        tombstones = cached_frame(self.tombstone_file, self._parse_tombstones)
+        if tombstones['id'].isin(gone).any():
+            self._write(tombstones[~tombstones['id'].isin(gone)], self.tombstone_file)
+        if not rows:
+            return []
+        if deleted:
+            # Deleted entries were never counted; only the file identities move on
+            self._update_rollups(before, [], 1)
+        else:
+            self._update_rollups(before, rows, -1)
+        return rows
+
+    def search_comments(self, query: str, limit: int = 50) -> list:
+        self.search_index.sync(self._search_sources())
+        deleted = set(self._deleted_ids().index)
+        results = []
+        # Deleted entries stay indexed, so ask for enough matches to skip them
+        for row_id, snippet, score in self.search_index.search(query, limit + len(deleted)):
+            if row_id in deleted:
+                continue
+            row = self.get(row_id)
+            if row is not None:
+                results.append({**row, 'snippet': snippet, 'score': score})
+            if len(results) == limit:
+                break
+        return results
+
+    def rating_rollups(self) -> dict:
+        state = self._read_rollups()
+        if state is not None and state["files"] == self._file_state():
+            return state["rollups"]
+        with self._lock():
+            return self._build_rollups()
+
+
+class SqliteSubmissionStore(SubmissionStore):
+    """Embedded SQLite backend running in WAL mode
+
+    Each thread (Streamlit session) gets its own connection; WAL lets readers
+    proceed while another session writes. Soft-deleted rows stay in the
+    submissions table with `deleted_at` set.
+    """
+
+    def __init__(self, db_file: str, import_from: Optional[SubmissionStore] = None):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._create_schema()
+        if import_from is not None:
+            self._import_store(import_from)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Lets the rollup triggers see rows that INSERT OR REPLACE removes
+            conn.execute("PRAGMA recursive_triggers=ON")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._connect()
+        column_defs = []
+        for col in EXPECTED_COLUMNS:
+            if col == 'id':
+                column_defs.append("id TEXT PRIMARY KEY")
+            elif col in INTEGER_COLUMNS:
+                column_defs.append(f"{col} INTEGER")
+            else:
+                column_defs.append(f"{col} TEXT")
+        column_defs.append("deleted_at TEXT")
+        with conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS submissions ({', '.join(column_defs)})")
+            for col in ('timestamp', 'school', 'visit_date'):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_submissions_{col} ON submissions ({col})")
+            # Serves the newest-first keyset paging of page_submissions()
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_submissions_timestamp_id ON submissions (timestamp, id)")
+            # One-off facts about the database, such as whether the first-start import ran
+            conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    MIGRATIONS = [
+        (1, "Backfill missing submission ids", "_migrate_noop"),
+        (2, "Add missing expected columns", "_migrate_expected_columns"),
+        (3, "Fold deleted entries into tombstones", "_migrate_tombstones"),
+        (4, "Split comments JSON into columns", "_migrate_comment_columns"),
+        (5, "Build rating rollups", "_migrate_rollups"),
+        (6, "Ensure the timestamp index for date-range loads", "_migrate_timestamp_index"),
+        (7, "Build comment search index", "_migrate_search_index"),
+    ]
+
+    def schema_version(self) -> int:
+        return self._connect().execute("PRAGMA user_version").fetchone()[0]
+
+    def _set_schema_version(self, version: int, description: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+
+    def _migration_lock(self):
+        return file_lock(f"{self.db_file}.lock")
+
+    def recover(self) -> Optional[str]:
+        # Every mutation is one transaction; SQLite rolls back an interrupted one itself
+        return None
+
+    def _tables(self, conn: sqlite3.Connection) -> set:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    def _migrate_noop(self) -> None:
+        """Ids are the primary key, so rows can never be stored without one"""
+
+    def _migrate_timestamp_index(self) -> None:
+        """Databases created before the index was part of the schema get it here
+
+        Version 6 partitions the CSV files; SQLite answers the same date-range
+        loads from this index, so only the version number is shared.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_submissions_timestamp ON submissions (timestamp)")
+
+    def _migrate_expected_columns(self) -> None:
+        conn = self._connect()
+        with conn:
+            for table in {"submissions", "deleted_entries"} & self._tables(conn):
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for col in EXPECTED_COLUMNS:
+                    if col not in existing:
+                        col_type = "INTEGER" if col in INTEGER_COLUMNS else "TEXT"
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}")
+
+    def _migrate_tombstones(self) -> None:
+        conn = self._connect()
+        with conn:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}
+            if "deleted_at" not in existing:
+                conn.execute("ALTER TABLE submissions ADD COLUMN deleted_at TEXT")
+            if "deleted_entries" in self._tables(conn):
+                # Copy every column both tables have, including a legacy comments blob
+                legacy = [row[1] for row in conn.execute("PRAGMA table_info(deleted_entries)")]
+                columns = ", ".join(col for col in legacy if col in existing and col != "deleted_at")
+                conn.execute(
+                    f"INSERT OR REPLACE INTO submissions ({columns}, deleted_at) "
+                    f"SELECT {columns}, ? FROM deleted_entries",
+                    (datetime.now().isoformat(timespec="seconds"),)
+                )
+                conn.execute("DROP TABLE deleted_entries")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_submissions_deleted_at ON submissions (deleted_at)")
+
+    def _migrate_comment_columns(self) -> None:
+        conn = self._connect()
+        with conn:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}
+            if 'comments' not in existing:
+                return
+            for field in COMMENT_FIELDS:
+                if field not in existing:
+                    conn.execute(f"ALTER TABLE submissions ADD COLUMN {field} TEXT")
+            rows = conn.execute(
+                f"SELECT id, comments, {', '.join(COMMENT_FIELDS)} FROM submissions WHERE comments IS NOT NULL"
+            ).fetchall()
+            assignments = ", ".join(f"{field} = ?" for field in COMMENT_FIELDS)
+            updates = []
+            for row in rows:
+                entry = explode_comments(dict(row))
+                updates.append(tuple(entry.get(field) for field in COMMENT_FIELDS) + (row['id'],))
+            conn.executemany(f"UPDATE submissions SET {assignments}, comments = NULL WHERE id = ?", updates)
+
+    def _migrate_rollups(self) -> None:
+        """Create the rollup table, the triggers keeping it current, and fill it"""
+        conn = self._connect()
+        histogram = ", ".join(f"r{rating} INTEGER NOT NULL DEFAULT 0" for rating in range(1, 6))
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rating_rollups (category TEXT PRIMARY KEY, "
+                f"count INTEGER NOT NULL DEFAULT 0, sum INTEGER NOT NULL DEFAULT 0, {histogram})"
+            )
+            rating_cols = ", ".join(RATING_COLUMNS)
+            triggers = {
+                "rollups_insert": ("AFTER INSERT", "NEW.deleted_at IS NULL", "NEW", "+"),
+                "rollups_delete": ("AFTER DELETE", "OLD.deleted_at IS NULL", "OLD", "-"),
+                "rollups_update_old": (f"AFTER UPDATE OF deleted_at, {rating_cols}", "OLD.deleted_at IS NULL", "OLD", "-"),
+                "rollups_update_new": (f"AFTER UPDATE OF deleted_at, {rating_cols}", "NEW.deleted_at IS NULL", "NEW", "+"),
+            }
+            for name, (event, condition, ref, sign) in triggers.items():
+                body = "; ".join(_rollup_updates(ref, sign))
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON submissions "
+                    f"WHEN {condition} BEGIN {body}; END"
+                )
+            # Recount inside the same write transaction, so no concurrent save is missed
+            conn.execute("DELETE FROM rating_rollups")
+            totals = []
+            for col in RATING_COLUMNS:
+                valid = f"{col} IN (1, 2, 3, 4, 5)"
+                totals.append(f"IFNULL(SUM({valid}), 0)")
+                totals.append(f"IFNULL(SUM(CASE WHEN {valid} THEN CAST({col} AS INTEGER) ELSE 0 END), 0)")
+                totals.extend(f"IFNULL(SUM({col} = {rating}), 0)" for rating in range(1, 6))
+            row = conn.execute(
+                f"SELECT COUNT(*), {', '.join(totals)} FROM submissions WHERE deleted_at IS NULL"
+            ).fetchone()
+            conn.execute("INSERT INTO rating_rollups (category, count) VALUES ('*', ?)", (row[0],))
+            for i, col in enumerate(RATING_COLUMNS):
+                values = row[1 + i * 7:1 + (i + 1) * 7]
+                conn.execute(
+                    "INSERT INTO rating_rollups (category, count, sum, r1, r2, r3, r4, r5) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (col, *values)
+                )
+
+    def _migrate_search_index(self) -> None:
+        """Create an FTS5 index over the comment fields, kept current by triggers, and fill it"""
+        conn = self._connect()
+        fields = ", ".join(COMMENT_FIELDS)
+        new_values = ", ".join(f"NEW.{field}" for field in COMMENT_FIELDS)
+        old_values = ", ".join(f"OLD.{field}" for field in COMMENT_FIELDS)
+        with conn:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5({fields}, "
+                f"content='submissions', content_rowid='rowid', tokenize='{SEARCH_TOKENIZER}')"
+            )
+            add = f"INSERT INTO comments_fts (rowid, {fields}) VALUES (NEW.rowid, {new_values})"
+            remove = (
+                f"INSERT INTO comments_fts (comments_fts, rowid, {fields}) "
+                f"VALUES ('delete', OLD.rowid, {old_values})"
+            )
+            triggers = {
+                "comments_fts_insert": ("AFTER INSERT", [add]),
+                "comments_fts_delete": ("AFTER DELETE", [remove]),
+                "comments_fts_update": (f"AFTER UPDATE OF {fields}", [remove, add]),
+            }
+            for name, (event, statements) in triggers.items():
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON submissions "
+                    f"BEGIN {'; '.join(statements)}; END"
+                )
+            conn.execute("INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')")
+
+    def search_comments(self, query: str, limit: int = 50) -> list:
+        match = search_query(query)
+        conn = self._connect()
+        if match is None or "comments_fts" not in self._tables(conn):
+            return []
+        rows = conn.execute(
+            f"SELECT {', '.join(f's.{col}' for col in EXPECTED_COLUMNS)}, "
+            "snippet(comments_fts, -1, ?, ?, '…', 16) AS snippet, bm25(comments_fts) AS score "
+            "FROM comments_fts JOIN submissions s ON s.rowid = comments_fts.rowid "
+            "WHERE comments_fts MATCH ? AND s.deleted_at IS NULL ORDER BY score LIMIT ?",
+            (MATCH_START, MATCH_END, match, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def rating_rollups(self) -> dict:
+        conn = self._connect()
+        if "rating_rollups" not in self._tables(conn):
+            return rollups_from_frame(self.load_submissions(RATING_COLUMNS))
+        rollups = empty_rollups()
+        for row in conn.execute("SELECT * FROM rating_rollups"):
+            if row['category'] == '*':
+                rollups["submissions"] = row['count']
+            elif row['category'] in rollups["ratings"]:
+                rollups["ratings"][row['category']] = {
+                    "count": row['count'],
+                    "sum": row['sum'],
+                    "histogram": [row[f"r{rating}"] for rating in range(1, 6)]
+                }
+        return rollups
+
+    def _import_store(self, source: SubmissionStore) -> None:
+        """Copy existing data from another store on the first start on SQLite, and never again
+
+        The import and its marker in store_meta are one transaction, so a
+        database emptied later by purges is not filled from the old files
+        again. Databases that already hold rows from before the marker
+        existed are only marked.
+        """
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM store_meta WHERE key = 'imported_at'").fetchone():
+            return
+        imported_at = datetime.now().isoformat(timespec="seconds")
+        if conn.execute("SELECT 1 FROM submissions LIMIT 1").fetchone():
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO store_meta VALUES ('imported_at', ?)", (imported_at,))
+            return
+        # Read only: the source's files are left as they are, whatever version they are at
+        active, deleted = source.stored_records()
+        with conn:
+            self._insert_rows(conn, [prepare_entry(r) for r in active])
+            if deleted:
+                self._insert_rows(conn, [prepare_entry(r) for r in deleted], with_deleted_at=True)
+            conn.execute("INSERT OR IGNORE INTO store_meta VALUES ('imported_at', ?)", (imported_at,))
+
+    def _insert_rows(self, conn: sqlite3.Connection, entries: list, with_deleted_at: bool = False,
+                     conflict: str = "REPLACE") -> None:
+        """Insert entries inside the caller's transaction"""
+        columns = EXPECTED_COLUMNS + (['deleted_at'] if with_deleted_at else [])
+        placeholders = ", ".join("?" for _ in columns)
+        rows = [
+            tuple(None if _format_value(e.get(col)) == "" else _to_sql(e.get(col)) for col in columns)
+            for e in entries
+        ]
+        conn.executemany(
+            f"INSERT OR {conflict} INTO submissions ({', '.join(columns)}) VALUES ({placeholders})",
+            rows
+        )
+
+    def _insert(self, conn: sqlite3.Connection, entries: list, with_deleted_at: bool = False,
+                conflict: str = "REPLACE") -> None:
+        with conn:
+            self._insert_rows(conn, entries, with_deleted_at, conflict)
+
+    def _fetch(self, conn: sqlite3.Connection, row_ids: list, deleted: bool) -> list:
+        state = "IS NOT NULL" if deleted else "IS NULL"
+        rows = []
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(row_ids), 500):
+            chunk = list(row_ids[start:start + 500])
+            placeholders = ", ".join("?" for _ in chunk)
+            rows.extend(dict(row) for row in conn.execute(
+                f"SELECT {', '.join(EXPECTED_COLUMNS)} FROM submissions "
+                f"WHERE id IN ({placeholders}) AND deleted_at {state}",
+                chunk
+            ))
+        return rows
+
+    def _set_deleted(self, row_ids: list, deleted: bool) -> list:
+        conn = self._connect()
+        with conn:
+            rows = self._fetch(conn, row_ids, deleted=not deleted)
+            deleted_at = datetime.now().isoformat(timespec="seconds") if deleted else None
+            conn.executemany(
+                "UPDATE submissions SET deleted_at = ? WHERE id = ?",
+                [(deleted_at, row['id']) for row in rows]
+            )
+        return rows
+
+    def save(self, entry: dict) -> str:
+        return self.save_many([entry])[0]
+
+    def save_many(self, entries: list) -> list:
+        entries = [prepare_entry(entry) for entry in entries]
+        # IGNORE rather than REPLACE: a replayed row must not undo a later delete
+        self._insert(self._connect(), entries, conflict="IGNORE")
+        return [entry['id'] for entry in entries]
+
+    def recorded_counts(self) -> dict:
+        # WAL readers never block writers, so these are simply queried
+        conn = self._connect()
+        active = None
+        if "rating_rollups" in self._tables(conn):
+            row = conn.execute("SELECT count FROM rating_rollups WHERE category = '*'").fetchone()
+            active = row[0] if row else 0
+        deleted = conn.execute("SELECT COUNT(*) FROM submissions WHERE deleted_at IS NOT NULL").fetchone()[0]
+        return {"active": active, "deleted": deleted}
+
+    def data_version(self) -> tuple:
+        # Every commit appends to the WAL or, after a checkpoint, writes the database file
+        return (file_identity(self.db_file), file_identity(f"{self.db_file}-wal"))
+
+    def data_files(self) -> dict:
+        # Copy through the backup API so the snapshot is consistent while WAL writers run
+        snapshot_file = f"{self.db_file}.snapshot"
+        changed = max(
+            os.path.getmtime(path) for path in (self.db_file, f"{self.db_file}-wal") if os.path.exists(path)
+        )
+        if os.path.exists(snapshot_file) and os.path.getmtime(snapshot_file) >= changed:
+            return {os.path.basename(self.db_file): snapshot_file}
+        target = sqlite3.connect(snapshot_file)
+        try:
+            self._connect().backup(target)
+        finally:
+            target.close()
+        return {os.path.basename(self.db_file): snapshot_file}
+
+    def get(self, row_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(EXPECTED_COLUMNS)} FROM submissions WHERE id = ?", (row_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    def _range_conditions(date_range: Optional[tuple]) -> tuple:
+        """WHERE conditions and parameters selecting timestamps in `date_range`"""
+        # Timestamps are ISO text starting with the day, so comparing against
+        # bare days is a range scan on the timestamp index
+        conditions, params = [], []
+        start, end = date_bounds(date_range)
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start.strftime(DATE_FORMATS['visit_date']))
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(end.strftime(DATE_FORMATS['visit_date']))
+        return conditions, params
+
+    def load_submissions(self, columns: Optional[list] = None, date_range: Optional[tuple] = None) -> pd.DataFrame:
+        columns = EXPECTED_COLUMNS if columns is None else columns
+        conditions, params = self._range_conditions(date_range)
+        return apply_schema(pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM submissions "
+            f"WHERE {' AND '.join(['deleted_at IS NULL', *conditions])} ORDER BY rowid",
+            self._connect(), params=params
+        ))
+
+    def iter_submissions(self, columns: Optional[list] = None, deleted: bool = False,
+                         date_range: Optional[tuple] = None, filters: Optional[dict] = None,
+                         chunk_size: int = CHUNK_ROWS):
+        columns = list(EXPECTED_COLUMNS if columns is None else columns)
+        conditions, params = self._conditions(deleted, date_range, filters)
+        selected = columns + (['deleted_at'] if deleted else [])
+        for df in pd.read_sql_query(
+            f"SELECT {', '.join(selected)} FROM submissions "
+            f"WHERE {' AND '.join(conditions)} ORDER BY rowid",
+            self._connect(), params=params, chunksize=chunk_size
+        ):
+            yield apply_schema(df)
+
+    def _conditions(self, deleted: bool, date_range: Optional[tuple], filters: Optional[dict],
+                    with_comments: bool = False) -> tuple:
+        """WHERE conditions and parameters for the state, date range, filters and comment check"""
+        conditions, params = self._range_conditions(date_range)
+        conditions.insert(0, "deleted_at IS NOT NULL" if deleted else "deleted_at IS NULL")
+        for col, values in check_filters(filters).items():
+            conditions.append(f"{col} IN ({', '.join('?' for _ in values)})" if values else "0")
+            params.extend(_to_sql(value) for value in values)
+        if with_comments:
+            answered = [f"IFNULL({field}, '') != ''" for field in COMMENT_FIELDS]
+            conditions.append(f"({' OR '.join(answered)})")
+        return conditions, params
+
+    def page_submissions(self, columns: Optional[list] = None, deleted: bool = False,
+                         after: Optional[tuple] = None, limit: int = 20, date_range: Optional[tuple] = None,
+                         filters: Optional[dict] = None, with_comments: bool = False) -> tuple:
+        columns = list(EXPECTED_COLUMNS if columns is None else columns)
+        conditions, params = self._conditions(deleted, date_range, filters, with_comments)
+        if after is not None:
+            timestamp, row_id = after
+            # NULL timestamps sort last in descending order
+            if timestamp is None:
+                conditions.append("timestamp IS NULL AND id < ?")
+                params.append(row_id)
+            else:
+                conditions.append("(timestamp < ? OR (timestamp = ? AND id < ?) OR timestamp IS NULL)")
+                params.extend([timestamp, timestamp, row_id])
+        selected = list(dict.fromkeys([*columns, 'id', 'timestamp'])) + (['deleted_at'] if deleted else [])
+        rows = self._connect().execute(
+            f"SELECT {', '.join(selected)} FROM submissions WHERE {' AND '.join(conditions)} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        # The cursor keeps the stored text, so the next page compares like for like
+        cursor = (rows[limit - 1]['timestamp'], rows[limit - 1]['id']) if len(rows) > limit else None
+        df = apply_schema(pd.DataFrame([dict(row) for row in rows[:limit]], columns=selected))
+        return df[columns + (['deleted_at'] if deleted else [])], cursor
+
+    def count_submissions(self, deleted: bool = False, date_range: Optional[tuple] = None,
+                          filters: Optional[dict] = None, with_comments: bool = False) -> int:
+        conditions, params = self._conditions(deleted, date_range, filters, with_comments)
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM submissions WHERE {' AND '.join(conditions)}", params
+        ).fetchone()[0]
+
+    def submission_ids(self, deleted: bool = False, date_range: Optional[tuple] = None,
+                       filters: Optional[dict] = None, with_comments: bool = False) -> list:
+        conditions, params = self._conditions(deleted, date_range, filters, with_comments)
+        return [row[0] for row in self._connect().execute(
+            f"SELECT id FROM submissions WHERE {' AND '.join(conditions)} ORDER BY timestamp DESC, id DESC", params
+        )]
+
+    def load_deleted_entries(self, columns: Optional[list] = None) -> pd.DataFrame:
+        columns = EXPECTED_COLUMNS if columns is None else columns
+        return apply_schema(pd.read_sql_query(
+            f"SELECT {', '.join(columns)}, deleted_at FROM submissions "
+            "WHERE deleted_at IS NOT NULL ORDER BY rowid",
+            self._connect()
+        ))
+
+    def delete_many(self, row_ids: list) -> list:
+        return self._set_deleted(row_ids, deleted=True)
+
+    def restore_many(self, row_ids: list) -> list:
+        return self._set_deleted(row_ids, deleted=False)
+
+    def purge_many(self, row_ids: list, deleted: bool = False) -> list:
+        conn = self._connect()
+        with conn:
+            rows = self._fetch(conn, row_ids, deleted=deleted)
+            conn.executemany("DELETE FROM submissions WHERE id = ?", [(row['id'],) for row in rows])
+        return rows
+
+
+def _rollup_updates(ref: str, sign: str) -> list:
+    """Trigger statements adding (sign "+") or removing ("-") row `ref` from rating_rollups"""
+    statements = [f"UPDATE rating_rollups SET count = count {sign} 1 WHERE category = '*'"]
+    for col in RATING_COLUMNS:
+        value = f"{ref}.{col}"
+        valid = f"IFNULL({value} IN (1, 2, 3, 4, 5), 0)"
+        histogram = ", ".join(
+            f"r{rating} = r{rating} {sign} IFNULL({value} = {rating}, 0)" for rating in range(1, 6)
+        )
+        statements.append(
+            f"UPDATE rating_rollups SET count = count {sign} {valid}, "
+            f"sum = sum {sign} (CASE WHEN {valid} THEN CAST({value} AS INTEGER) ELSE 0 END), "
+            f"{histogram} WHERE category = '{col}'"
+        )
+    return statements
+
+
+def _to_sql(value):
+    """Convert numpy/pandas scalars to plain Python values for sqlite3"""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_store(data_dir: str, backend: Optional[str] = None) -> SubmissionStore:
+    """Return the process-wide store for a data directory
+
+    The backend is taken from the FEEDBACK_STORE_BACKEND environment variable
+    ("csv" or "sqlite") unless given explicitly.
+    """
+    backend = (backend or os.environ.get("FEEDBACK_STORE_BACKEND") or DEFAULT_BACKEND).lower()
+    key = (os.path.abspath(data_dir), backend)
+    with _STORES_LOCK:
+        if key not in _STORES:
+            submissions_file = os.path.join(data_dir, "submissions.csv")
+            deleted_file = os.path.join(data_dir, "deleted_entries.csv")
+            if backend == "csv":
+                _STORES[key] = CsvSubmissionStore(submissions_file, deleted_file)
+            elif backend == "sqlite":
+                _STORES[key] = SqliteSubmissionStore(
+                    os.path.join(data_dir, "submissions.db"),
+                    import_from=CsvSubmissionStore(submissions_file, deleted_file)
+                )
+            else:
+                raise ValueError(f"Unknown storage backend: {backend}")
+        return _STORES[key]
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Optional
+
+import numpy as np
+
+# Most recent samples kept per span; percentiles are taken over this window
+WINDOW = 500
+
+# Upper bounds (seconds) of the latency buckets counted per span since start, for metrics export
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class SpanTimer:
+    """Rolling timings of named sections of code, shared by every session in the process
+
+    `span(name)` times a block and `timed(name)` a whole function. Inside a
+    timed function `section(name)` ends the running section and starts the
+    next one, recorded as "<function>/<section>", so a long function is
+    split into sections with one line at each boundary. Only the last
+    `window` samples of each span are kept, so memory stays bounded and
+    the percentiles follow recent behaviour. Every sample is also counted
+    into fixed latency buckets, which histograms() reports for scraping;
+    those counts only ever grow, reset() leaves them alone.
+    """
+
+    def __init__(self, window: int = WINDOW, buckets: tuple = LATENCY_BUCKETS):
+        self.window = window
+        self.buckets = tuple(buckets)
+        self.started_at = datetime.now()
+        self._samples = {}
+        self._counts = {}
+        self._bucket_counts = {}
+        self._sums = {}
+        self._guard = threading.Lock()
+        # Open timed functions of the current thread (one Streamlit session each)
+        self._local = threading.local()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._guard:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            if name not in self._bucket_counts:
+                # One slot per bucket plus one for samples above the last bound
+                self._bucket_counts[name] = [0] * (len(self.buckets) + 1)
+                self._sums[name] = 0.0
+            self._samples[name].append(seconds)
+            self._counts[name] += 1
+            self._bucket_counts[name][bisect_left(self.buckets, seconds)] += 1
+            self._sums[name] += seconds
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def _frames(self) -> list:
+        if not hasattr(self._local, "frames"):
+            self._local.frames = []
+        return self._local.frames
+
+    def _close_section(self, frame: dict, now: float) -> None:
+        if frame["section"] is not None:
+            self.record(f"{frame['name']}/{frame['section']}", now - frame["started"])
+            frame["section"] = None
+
+    def timed(self, name: str):
+        """Decorator recording each call of a function as span `name`
+
+        Calls that end in an exception (including Streamlit's rerun and
+        stop) are recorded too.
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                frames = self._frames()
+                frame = {"name": name, "section": None, "started": 0.0}
+                frames.append(frame)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    now = time.perf_counter()
+                    self._close_section(frame, now)
+                    frames.remove(frame)
+                    self.record(name, now - start)
+            return wrapper
+        return decorator
+
+    def section(self, name: str) -> None:
+        """End the running section of the innermost timed function and start `name`"""
+        frames = self._frames()
+        if not frames:
+            return
+        now = time.perf_counter()
+        self._close_section(frames[-1], now)
+        frames[-1]["section"] = name
+        frames[-1]["started"] = now
+
+    def summary(self) -> list:
+        """Per span: total calls and p50/p95/max/last of the recent window, in seconds"""
+        with self._guard:
+            snapshot = {name: (list(samples), self._counts[name]) for name, samples in self._samples.items()}
+        rows = []
+        for name, (samples, count) in sorted(snapshot.items()):
+            values = np.asarray(samples)
+            rows.append({
+                "span": name,
+                "count": count,
+                "window": len(values),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(values.max()),
+                "last": float(values[-1]),
+            })
+        return rows
+
+    def histograms(self) -> dict:
+        """Per span since start: cumulative count per bucket bound (the last is +Inf), sum and count"""
+        with self._guard:
+            snapshot = {name: (list(counts), self._sums[name]) for name, counts in self._bucket_counts.items()}
+        histograms = {}
+        for name, (counts, total) in sorted(snapshot.items()):
+            cumulative, running = [], 0
+            for n in counts:
+                running += n
+                cumulative.append(running)
+            histograms[name] = {"buckets": cumulative, "sum": total, "count": running}
+        return histograms
+
+    def to_json(self, extra: Optional[dict] = None) -> str:
+        """The summary as JSON, with any `extra` sections added"""
+        return json.dumps({
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "since": self.started_at.isoformat(timespec="seconds"),
+            "window": self.window,
+            "spans": self.summary(),
+            **(extra or {})
+        }, indent=2, default=str)
+
+    def reset(self) -> None:
+        """Start a new window for summary(); the histograms keep counting"""
+        with self._guard:
+            self._samples.clear()
+            self._counts.clear()
+            self.started_at = datetime.now()
+
+
+_TIMERS = {}
+_TIMERS_LOCK = threading.Lock()
+
+
+def open_timer(name: str = "app") -> SpanTimer:
+    """Return the process-wide timer with this name"""
+    with _TIMERS_LOCK:
+        if name not in _TIMERS:
+            _TIMERS[name] = SpanTimer()
+        return _TIMERS[name]
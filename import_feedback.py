@@ -0,0 +1,326 @@
+import argparse
+import os
+import re
+import sys
+import time
+import uuid
+from itertools import islice
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from feedback_store import (
+    DATE_FORMATS, EXPECTED_COLUMNS, RATING_COLUMNS, open_store
+)
+
+try:
+    import openpyxl
+except ImportError:  # Only .xlsx files need openpyxl
+    openpyxl = None
+
+# Rows validated at a time; whole-column checks pay off on large chunks
+IMPORT_CHUNK_ROWS = 50000
+
+# Rows written per save_many call, so no single write holds the store lock
+# (or journals its batch) for the whole import
+IMPORT_SAVE_ROWS = 5000
+
+# Columns a row must have to be imported; paper forms often lack the rest
+REQUIRED_COLUMNS = ['school', 'visit_date']
+
+# Whole-number counts that may not be negative
+COUNT_COLUMNS = ['children_no', 'adults_present']
+
+# Header labels of the feedback form and common spreadsheet spellings -> column
+COLUMN_ALIASES = {
+    "School/Organization/Group": "school",
+    "School name": "school",
+    "Organisation": "school",
+    "Organization": "school",
+    "Type of Group": "group_type",
+    "Group": "group_type",
+    "Children": "children_no",
+    "Children Participating": "children_no",
+    "Number of children": "children_no",
+    "Ages": "children_age",
+    "Children Age(s)": "children_age",
+    "Adults": "adults_present",
+    "Visit Date": "visit_date",
+    "Date of Visit": "visit_date",
+    "Date": "visit_date",
+    "Type of Experience": "programme",
+    "Experience Type": "programme",
+    "Program": "programme",
+    "Overall experience for children": "engagement",
+    "Friendliness and professionalism of facilitators": "safety",
+    "Level of engagement for children": "cleanliness",
+    "Inclusiveness and welcoming atmosphere": "fun",
+    "Relevance of activities to children's learning": "learning",
+    "Planning and communication before the visit": "planning",
+    "Physical safety and comfort of the space": "safety_space",
+    "What did children enjoy most?": "enjoyed",
+    "Moments of curiosity/learning?": "curiosity",
+    "How did this support your teaching?": "support_goals",
+    "Suggestions for improvement": "improve",
+    "Would you recommend us? Why?": "recommend",
+    "Topics you'd like us to explore?": "future_topics",
+    "Interested in future collaboration?": "collaboration",
+    "Submitted": "timestamp",
+}
+
+# Rows without an id get one derived from their content, so importing the same file twice adds nothing
+IMPORT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_OID, "play-africa-feedback-import")
+
+
+def normalize_header(name) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(name).lower()).strip("_")
+
+
+def map_columns(header: list, overrides: Optional[dict] = None) -> tuple:
+    """Match file columns to submission columns
+
+    Returns ({file column: submission column}, [unmatched file columns]).
+    `overrides` ({file column: submission column}) win over the aliases;
+    when two file columns map to the same submission column the first wins.
+    """
+    known = {normalize_header(col): col for col in [*EXPECTED_COLUMNS, 'comments']}
+    for label, col in COLUMN_ALIASES.items():
+        known.setdefault(normalize_header(label), col)
+    for label, col in (overrides or {}).items():
+        if col not in known.values():
+            raise ValueError(f"Cannot map {label!r} to unknown column {col!r}")
+        known[normalize_header(label)] = col
+    mapping, unmatched = {}, []
+    for name in header:
+        col = known.get(normalize_header(name))
+        if col is None or col in mapping.values():
+            unmatched.append(name)
+        else:
+            mapping[name] = col
+    return mapping, unmatched
+
+
+def iter_csv(path: str, chunk_size: int):
+    # utf-8-sig drops the byte order mark Excel puts in front of exported CSVs
+    yield from pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig", chunksize=chunk_size)
+
+
+def iter_xlsx(path: str, chunk_size: int, sheet: Optional[str] = None):
+    if openpyxl is None:
+        raise RuntimeError("Reading .xlsx files needs openpyxl (pip install openpyxl)")
+    # Read-only mode streams rows instead of loading the whole workbook
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = (workbook[sheet] if sheet else workbook.active).iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [f"column_{i}" if name is None else str(name) for i, name in enumerate(header)]
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                return
+            yield pd.DataFrame(batch, columns=header, dtype=object).astype("string")
+    finally:
+        workbook.close()
+
+
+def iter_file(path: str, chunk_size: int = IMPORT_CHUNK_ROWS, sheet: Optional[str] = None):
+    """DataFrame chunks of a CSV or XLSX file, every value as text"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return iter_xlsx(path, chunk_size, sheet)
+    if ext == ".csv":
+        return iter_csv(path, chunk_size)
+    raise ValueError(f"Unsupported file type: {ext} (expected .csv or .xlsx)")
+
+
+def parse_dates(values: pd.Series, dayfirst: bool = False) -> pd.Series:
+    """Parse dates in whatever format each value has; ISO dates are never read day first"""
+    if int(pd.__version__.split(".")[0]) < 2:
+        return pd.to_datetime(values, errors='coerce', dayfirst=dayfirst)
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    rest = values.notna() & dates.isna()
+    if rest.any():
+        dates[rest] = pd.to_datetime(values[rest], errors='coerce', format='mixed', dayfirst=dayfirst)
+    return dates
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """Nullable integers as text ("4", not "4.0"), missing values as None"""
+    return values.astype("string").astype(object).where(values.notna(), None)
+
+
+def validate(df: pd.DataFrame, required: list = REQUIRED_COLUMNS, dayfirst: bool = False) -> tuple:
+    """Clean a chunk of mapped rows and split it into (valid, rejected)
+
+    Text is trimmed and blanks become missing; ratings must be 1-5 and
+    counts whole non-negative numbers when given; dates must parse. Rows
+    without a timestamp are dated at their visit. Each rejected row keeps
+    its original values plus a `reason`. Every check works on whole
+    columns, so the cost per row is small.
+    """
+    original = df
+    df = df.copy()
+    for col in [*EXPECTED_COLUMNS, 'comments']:
+        if col not in df.columns:
+            df[col] = pd.Series(pd.NA, index=df.index, dtype="string")
+    for col in df.columns:
+        values = df[col].astype("string").str.strip()
+        df[col] = values.mask(values == "")
+
+    checks = [(df[col].isna(), f"missing {col}") for col in required]
+    for col in RATING_COLUMNS:
+        numbers = pd.to_numeric(df[col], errors='coerce')
+        checks.append((df[col].notna() & ~numbers.isin([1, 2, 3, 4, 5]), f"{col} is not a rating from 1 to 5"))
+        df[col] = _as_text(numbers.where(numbers.isin([1, 2, 3, 4, 5])).astype('Int8'))
+    for col in COUNT_COLUMNS:
+        numbers = pd.to_numeric(df[col], errors='coerce')
+        valid = (numbers >= 0) & (numbers == numbers.round())
+        checks.append((df[col].notna() & ~valid, f"{col} is not a whole number"))
+        df[col] = _as_text(numbers.where(valid).astype('Int32'))
+    for col, fmt in DATE_FORMATS.items():
+        dates = parse_dates(df[col], dayfirst=dayfirst)
+        checks.append((df[col].notna() & dates.isna(), f"{col} is not a date"))
+        df[col] = dates
+    df['timestamp'] = df['timestamp'].fillna(df['visit_date'])
+    for col, fmt in DATE_FORMATS.items():
+        df[col] = df[col].dt.strftime(fmt).astype(object).where(df[col].notna(), None)
+
+    # The first failing check names the reason
+    reasons = pd.Series(
+        np.select([mask.fillna(False).to_numpy(bool) for mask, _ in checks], [reason for _, reason in checks], ""),
+        index=df.index
+    )
+    rejected = original[reasons != ""].assign(reason=reasons[reasons != ""])
+    return df[reasons == ""], rejected
+
+
+def assign_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill missing ids with UUIDs derived from each row's content"""
+    missing = df['id'].isna()
+    if missing.any():
+        content = [col for col in df.columns if col != 'id']
+        hashes = pd.util.hash_pandas_object(df.loc[missing, content].astype(str), index=False)
+        df.loc[missing, 'id'] = [str(uuid.uuid5(IMPORT_NAMESPACE, f"{h:016x}")) for h in hashes]
+    return df
+
+
+def read_rows(paths: list, overrides: Optional[dict] = None, required: list = REQUIRED_COLUMNS,
+              dayfirst: bool = False, chunk_size: int = IMPORT_CHUNK_ROWS, sheet: Optional[str] = None) -> tuple:
+    """Read, map, validate and deduplicate the rows of every file
+
+    Returns (valid rows, rejected rows, stats).
+    """
+    stats = {"read": 0, "rejected": 0, "duplicates": 0, "unmatched": {}}
+    valid, rejected = [], []
+    for path in paths:
+        for chunk in iter_file(path, chunk_size, sheet):
+            mapping, unmatched = map_columns(list(chunk.columns), overrides)
+            if unmatched:
+                stats["unmatched"][path] = unmatched
+            good, bad = validate(chunk[list(mapping)].rename(columns=mapping), required, dayfirst)
+            stats["read"] += len(chunk)
+            stats["rejected"] += len(bad)
+            valid.append(assign_ids(good))
+            rejected.append(bad.assign(file=path))
+    columns = [*EXPECTED_COLUMNS, 'comments']
+    valid = pd.concat(valid, ignore_index=True) if valid else pd.DataFrame(columns=columns)
+    rejected = pd.concat(rejected, ignore_index=True) if rejected else pd.DataFrame()
+    # Identical rows (and rows repeating an id) across all files are imported once
+    duplicate = valid['id'].duplicated()
+    stats["duplicates"] = int(duplicate.sum())
+    return valid.loc[~duplicate, columns], rejected, stats
+
+
+def import_rows(store, rows: pd.DataFrame, batch_size: int = IMPORT_SAVE_ROWS) -> int:
+    """Write rows to the store in batches of `batch_size`; returns how many were new
+
+    Ids already stored (active or deleted) are skipped by the store.
+    Other writers (the running app) get the lock between batches.
+    """
+    if rows.empty:
+        return 0
+    before = store.count_submissions() + store.count_submissions(deleted=True)
+    for start in range(0, len(rows), batch_size):
+        batch = rows.iloc[start:start + batch_size].astype(object)
+        store.save_many(batch.where(batch.notna(), None).to_dict('records'))
+    return store.count_submissions() + store.count_submissions(deleted=True) - before
+
+
+def parse_mapping(values: list) -> dict:
+    mapping = {}
+    for value in values or []:
+        label, sep, col = value.rpartition("=")
+        if not sep or not label or not col:
+            raise ValueError(f"Expected FILE_COLUMN=COLUMN, got {value!r}")
+        mapping[label] = col.strip()
+    return mapping
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import historical feedback from CSV or XLSX files")
+    parser.add_argument("files", nargs="+", help="CSV or XLSX files with a header row")
+    parser.add_argument("--data-dir", default="data", help="Data directory of the app (default: data)")
+    parser.add_argument("--backend", help="Storage backend, csv or sqlite (default: FEEDBACK_STORE_BACKEND or csv)")
+    parser.add_argument("--map", action="append", metavar="FILE_COLUMN=COLUMN",
+                        help="Map a file column onto a submission column; may be repeated")
+    parser.add_argument("--require", default=",".join(REQUIRED_COLUMNS),
+                        help=f"Comma-separated columns every row needs (default: {','.join(REQUIRED_COLUMNS)})")
+    parser.add_argument("--dayfirst", action="store_true", help="Read ambiguous dates as day/month/year")
+    parser.add_argument("--sheet", help="Worksheet of XLSX files (default: the active one)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_ROWS, help="Rows read at a time")
+    parser.add_argument("--rejects", help="Write rejected rows with their reason to this CSV file")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing to the store")
+    args = parser.parse_args(argv)
+
+    required = [col.strip() for col in args.require.split(",") if col.strip()]
+    unknown = [col for col in required if col not in EXPECTED_COLUMNS]
+    if unknown:
+        parser.error(f"Unknown required columns: {', '.join(unknown)}")
+    try:
+        overrides = parse_mapping(args.map)
+        map_columns([], overrides)
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    try:
+        rows, rejected, stats = read_rows(
+            args.files, overrides, required, args.dayfirst, args.chunk_size, args.sheet
+        )
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error reading input: {str(e)}", file=sys.stderr)
+        return 1
+
+    for path, columns in stats["unmatched"].items():
+        print(f"{path}: ignored unmatched columns: {', '.join(map(str, columns))}")
+    print(f"Read {stats['read']} rows: {len(rows)} valid, {stats['rejected']} rejected, "
+          f"{stats['duplicates']} duplicated within the input")
+    if len(rejected):
+        for reason, count in rejected['reason'].value_counts().items():
+            print(f"  {count} {reason}")
+        if args.rejects:
+            rejected.to_csv(args.rejects, index=False)
+            print(f"Rejected rows written to {args.rejects}")
+    if args.dry_run:
+        print(f"Dry run: nothing written ({time.perf_counter() - started:.1f}s)")
+        return 0
+    try:
+        # A fresh data directory is created, as the app does on first start
+        os.makedirs(args.data_dir, exist_ok=True)
+        store = open_store(args.data_dir, args.backend)
+        store.recover()
+        store.migrate()
+        written = import_rows(store, rows)
+    except Exception as e:
+        print(f"Error writing submissions: {str(e)}", file=sys.stderr)
+        return 1
+    print(f"Imported {written} new submissions, {len(rows) - written} already stored "
+          f"({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
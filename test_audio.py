@@ -1,21 +1,26 @@
 import streamlit as st
 import pandas as pd
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 from streamlit_lottie import st_lottie
 import altair as alt
-import numpy as np
 from PIL import Image
 import qrcode
 import base64
 from io import BytesIO
 import hashlib
-import shutil
 from typing import Optional, Tuple
 from streamlit.components.v1 import html
 import platform
 import uuid
+from feedback_store import CACHE_STATS, COMMENT_FIELDS, EXPECTED_COLUMNS, highlight_snippet, lock_stats, open_store
+from feedback_backup import BackupEngine
+from feedback_queue import open_queue
+from feedback_audio import open_audio_store
+from feedback_export import COLUMNAR_FORMATS, EXPORT_FORMATS, available_formats, export_file, file_suffix
+from feedback_timing import open_timer
+from feedback_metrics import open_metrics
 
 # COMPLETELY REMOVE GITHUB ICON (CSS + JavaScript)
 st.markdown("""
@@ -36,38 +41,19 @@ Please check back later. Thank you for your patience!
 
 # Constants - using absolute paths for reliability
 DATA_DIR = os.path.abspath("data")
-SUBMISSIONS_FILE = os.path.join(DATA_DIR, "submissions.csv")
 AUDIO_DIR = os.path.join(DATA_DIR, "audio")
 BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+EXPORT_DIR = os.path.join(DATA_DIR, "exports")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
-DELETED_ENTRIES_FILE = os.path.join(DATA_DIR, "deleted_entries.csv")
 
 # Ensure directories exist with proper permissions
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-# Define expected columns for submissions, including 'id' as first column
-EXPECTED_COLUMNS = [
-    'id', 'timestamp', 'school', 'group_type', 'children_no', 'children_age',
-    'adults_present', 'visit_date', 'programme', 'engagement', 'safety',
-    'cleanliness', 'fun', 'learning', 'planning', 'safety_space', 'comments',
-    'audio_file', 'device_type'
-]
-
 def initialize_data_files():
     """Initialize data files with proper structure and permissions"""
     try:
-        # Initialize submissions file (unchanged)
-        if not os.path.exists(SUBMISSIONS_FILE) or os.path.getsize(SUBMISSIONS_FILE) == 0:
-            pd.DataFrame(columns=EXPECTED_COLUMNS).to_csv(SUBMISSIONS_FILE, index=False)
-            os.chmod(SUBMISSIONS_FILE, 0o666)
-        
-        # Initialize deleted entries file (unchanged)
-        if not os.path.exists(DELETED_ENTRIES_FILE) or os.path.getsize(DELETED_ENTRIES_FILE) == 0:
-            pd.DataFrame(columns=EXPECTED_COLUMNS).to_csv(DELETED_ENTRIES_FILE, index=False)
-            os.chmod(DELETED_ENTRIES_FILE, 0o666)
-        
         # SECURE USER INITIALIZATION (replaces hardcoded passwords)
         if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
             if "ADMIN_PASSWORD" not in st.secrets or "GUEST_PASSWORD" not in st.secrets:
@@ -93,22 +79,50 @@ def initialize_data_files():
         
     return True
 
-def ensure_ids_in_datafiles():
-    for csvfile in [SUBMISSIONS_FILE, DELETED_ENTRIES_FILE]:
-        if os.path.exists(csvfile) and os.path.getsize(csvfile) > 0:
-            df = pd.read_csv(csvfile)
-            # If id column is missing, add new UUIDs
-            if 'id' not in df.columns:
-                df['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
-            else:
-                # If id column is present but blank, fill with UUIDs
-                df['id'] = [i if pd.notna(i) and str(i).strip() and str(i) != "nan" else str(uuid.uuid4()) for i in df['id']]
-            df.to_csv(csvfile, index=False)
-ensure_ids_in_datafiles()
-
 # Initialize data files at startup
 initialize_data_files()
 
+# Storage backend shared by all data functions
+store = open_store(DATA_DIR)
+
+# Incremental backups of the data files under BACKUP_DIR
+backups = BackupEngine(BACKUP_DIR)
+
+def run_schema_migrations():
+    """Finish a write interrupted by a crash, then apply pending storage migrations once"""
+    try:
+        store.recover()
+        store.migrate()
+    except Exception as e:
+        st.error(f"Migration error: {str(e)}")
+run_schema_migrations()
+
+# Submissions are journaled and written to the store in batches by a background thread
+writer = open_queue(store, os.path.join(DATA_DIR, "queue"))
+
+# Content-addressed recordings in AUDIO_DIR and their manifest, so audio checks do not stat every file
+audio_store = open_audio_store(AUDIO_DIR, os.path.join(DATA_DIR, "audio_manifest.json"))
+
+# Rolling render timings of the app's sections, shown on the admin Performance page
+timer = open_timer()
+
+# Prometheus metrics of this process, served on FEEDBACK_METRICS_PORT and/or written to FEEDBACK_METRICS_FILE
+metrics = open_metrics(store, timer, DATA_DIR, writer)
+
+def sync_audio_references():
+    """Count which recordings stored submissions reference (once, after upgrading)"""
+    try:
+        if audio_store.needs_recount():
+            writer.flush()
+            paths = pd.concat([
+                store.load_submissions(['audio_file'])['audio_file'],
+                store.load_deleted_entries(['audio_file'])['audio_file']
+            ])
+            audio_store.recount(paths.dropna().tolist())
+    except Exception as e:
+        st.error(f"Audio reference count error: {str(e)}")
+sync_audio_references()
+
 def is_mobile():
     """Detect if user is on a mobile device"""
     try:
@@ -153,24 +167,18 @@ def mobile_adjusted_text_area(label, value="", height=100, key=None, placeholder
         return st.text_area(label, value, height=max(80, height//2), key=key, placeholder=placeholder)
     return st.text_area(label, value, height=height, key=key, placeholder=placeholder)
 
+@timer.timed("backup")
 def create_backup() -> bool:
-    """Create a backup of submissions with verification"""
+    """Take an incremental, deduplicated backup of the data files
+
+    Returns False when nothing changed since the last snapshot.
+    """
     try:
-        if not os.path.exists(SUBMISSIONS_FILE):
-            return False
-            
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"backup_{timestamp}.csv")
-        
-        shutil.copy2(SUBMISSIONS_FILE, backup_path)
-        os.chmod(backup_path, 0o666)
-        
-        # Verify backup was created
-        if not os.path.exists(backup_path):
-            raise Exception("Backup file not created")
-            
-        return True
+        writer.flush()
+        sources = store.data_files()
+        sources["users.json"] = USERS_FILE
+        sources["audio_manifest.json"] = audio_store.manifest_file
+        return backups.create_backup(sources) is not None
     except Exception as e:
         st.error(f"Backup failed: {str(e)}")
         return False
@@ -184,131 +192,169 @@ def load_lottiefile(filepath: str) -> Optional[dict]:
         st.error(f"Error loading Lottie file: {str(e)}")
         return None
 
+@timer.timed("save_submission")
 def save_submission(entry: dict) -> bool:
-    """Save submission with proper validation and error handling"""
+    """Queue a submission for writing; returns once it is safely journaled"""
     try:
         # Set a unique id if not already set
         if not entry.get('id'):
             entry['id'] = str(uuid.uuid4())
             
-        # Ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in entry:
-                entry[col] = None
-        
-        # Clean and validate data
-        entry = {k: (v.strip() if isinstance(v, str) else v) for k, v in entry.items()}
-        
-        # Load existing data
-        if os.path.exists(SUBMISSIONS_FILE) and os.path.getsize(SUBMISSIONS_FILE) > 0:
-            existing_df = pd.read_csv(SUBMISSIONS_FILE)
-            # Ensure all columns exist in the existing data
-            for col in EXPECTED_COLUMNS:
-                if col not in existing_df.columns:
-                    existing_df[col] = None
-        else:
-            existing_df = pd.DataFrame(columns=EXPECTED_COLUMNS)
-        
-        # Create new DataFrame with the entry
-        new_df = pd.DataFrame([entry])
-        
-        # Combine with existing data
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        
-        # Save to file
-        combined_df.to_csv(SUBMISSIONS_FILE, index=False)
-        os.chmod(SUBMISSIONS_FILE, 0o666)  # Ensure proper permissions
-        
+        # Referenced before it is queued, so the orphan sweep can never remove it in between
+        audio_store.acquire(entry.get('audio_file'))
+        try:
+            writer.submit(entry)
+        except Exception:
+            # The upload stays on disk so the visitor can submit again
+            audio_store.release(entry.get('audio_file'), remove=False)
+            raise
         return True
     except Exception as e:
         st.error(f"Error saving submission: {str(e)}")
         return False
 
-def load_submissions() -> pd.DataFrame:
-    """Load submissions with robust error handling"""
+@timer.timed("load_submissions")
+def load_submissions(columns: Optional[list] = None, date_range: Optional[tuple] = None) -> pd.DataFrame:
+    """Load submissions (only `columns`, and only within `date_range`, if given) with robust error handling"""
     try:
-        if not os.path.exists(SUBMISSIONS_FILE) or os.path.getsize(SUBMISSIONS_FILE) == 0:
-            return pd.DataFrame(columns=EXPECTED_COLUMNS)
-            
-        df = pd.read_csv(SUBMISSIONS_FILE)
-        
-        # Ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in df.columns:
-                df[col] = None
+        # Write queued submissions first so they show up
+        writer.flush()
+        df = store.load_submissions(columns, date_range=date_range)
                 
-        # Validate audio file paths
+        # Validate audio file paths against the audio manifest
         if 'audio_file' in df.columns:
-            df['audio_file'] = df['audio_file'].apply(
-                lambda x: x if isinstance(x, str) and os.path.exists(x) else None
-            )
+            df['audio_file'] = df['audio_file'].where(df['audio_file'].isin(audio_store.paths()), None)
             
         return df
     except Exception as e:
         st.error(f"Error loading submissions: {str(e)}")
-        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        return pd.DataFrame(columns=columns or EXPECTED_COLUMNS)
 
-def load_deleted_entries() -> pd.DataFrame:
-    """Load deleted entries with validation"""
+def load_deleted_entries(columns: Optional[list] = None) -> pd.DataFrame:
+    """Load deleted entries (only `columns` if given) with validation"""
     try:
-        if not os.path.exists(DELETED_ENTRIES_FILE) or os.path.getsize(DELETED_ENTRIES_FILE) == 0:
-            return pd.DataFrame(columns=EXPECTED_COLUMNS)
-            
-        df = pd.read_csv(DELETED_ENTRIES_FILE)
-        
-        # Ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in df.columns:
-                df[col] = None
-        
-        # Clean IDs by stripping whitespace
-        if 'id' in df.columns:
-            df['id'] = df['id'].astype(str).str.strip()
-                
-        return df
+        writer.flush()
+        return store.load_deleted_entries(columns)
     except Exception as e:
         st.error(f"Error loading deleted entries: {str(e)}")
-        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        return pd.DataFrame(columns=columns or EXPECTED_COLUMNS)
+
+def export_data(deleted: bool = False, fmt: str = "csv", compress: bool = False,
+                filters: Optional[dict] = None, date_range: Optional[tuple] = None) -> Optional[str]:
+    """Stream active (or deleted) submissions into a temporary export file and return its path
+
+    Filters are applied by the store while reading, so only matching rows
+    are serialized. Returns None when there is nothing to export.
+    Only writing the file is flat in memory: st.download_button reads the
+    whole file into memory to serve it, so large exports should be compressed.
+    """
+    try:
+        writer.flush()
+        name = "deleted_feedback" if deleted else "feedback"
+        chunks = store.iter_submissions(deleted=deleted, date_range=date_range, filters=filters)
+        return export_file(chunks, EXPORT_DIR, name, fmt=fmt, compress=compress)
+    except Exception as e:
+        st.error(f"Export failed: {str(e)}")
+        return None
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def export_filter_options(data_version: tuple) -> dict:
+    """Sorted school and group type values, recomputed only when the store's data changes"""
+    options = store.load_submissions(['school', 'group_type'])
+    return {col: sorted(options[col].dropna().unique()) for col in ['school', 'group_type']}
+
+def load_export_filter_options() -> dict:
+    try:
+        writer.flush()
+        return export_filter_options(store.data_version())
+    except Exception as e:
+        st.error(f"Error loading export filters: {str(e)}")
+        return {'school': [], 'group_type': []}
+
+def load_submission_page(columns: Optional[list] = None, deleted: bool = False, after: Optional[tuple] = None,
+                         limit: int = 10, date_range: Optional[tuple] = None, filters: Optional[dict] = None,
+                         with_comments: bool = False) -> Tuple[pd.DataFrame, Optional[tuple]]:
+    """One page of submissions (newest first) and the cursor of the next page"""
+    try:
+        writer.flush()
+        df, cursor = store.page_submissions(
+            columns, deleted=deleted, after=after, limit=limit,
+            date_range=date_range, filters=filters, with_comments=with_comments
+        )
+        if 'audio_file' in df.columns:
+            df['audio_file'] = df['audio_file'].where(df['audio_file'].isin(audio_store.paths()), None)
+        return df, cursor
+    except Exception as e:
+        st.error(f"Error loading submissions: {str(e)}")
+        return pd.DataFrame(columns=columns or EXPECTED_COLUMNS), None
+
+def count_submissions(deleted: bool = False, date_range: Optional[tuple] = None,
+                      filters: Optional[dict] = None, with_comments: bool = False) -> int:
+    """Number of submissions the matching pages hold"""
+    try:
+        writer.flush()
+        return store.count_submissions(deleted=deleted, date_range=date_range, filters=filters,
+                                       with_comments=with_comments)
+    except Exception as e:
+        st.error(f"Error counting submissions: {str(e)}")
+        return 0
+
+def load_matching_ids(deleted: bool = False, date_range: Optional[tuple] = None,
+                      filters: Optional[dict] = None, with_comments: bool = False) -> list:
+    """Ids of every submission the matching pages hold, for bulk actions beyond one page"""
+    try:
+        writer.flush()
+        return store.submission_ids(deleted=deleted, date_range=date_range, filters=filters,
+                                    with_comments=with_comments)
+    except Exception as e:
+        st.error(f"Error loading submission ids: {str(e)}")
+        return []
+
+def search_comments(query: str, limit: int = 50) -> list:
+    """Submissions whose comments match `query`, best first, each with a `snippet`"""
+    try:
+        writer.flush()
+        return store.search_comments(query, limit)
+    except Exception as e:
+        st.error(f"Search failed: {str(e)}")
+        return []
+
+def load_rating_rollups() -> dict:
+    """Per-category rating counts, sums and histograms for the analytics section"""
+    try:
+        writer.flush()
+        return store.rating_rollups()
+    except Exception as e:
+        st.error(f"Error loading rating summary: {str(e)}")
+        return {"submissions": 0, "ratings": {}}
+
+def get_submission_by_id(row_id: str) -> Optional[dict]:
+    """Look up a single submission by id without loading the whole dataset"""
+    try:
+        writer.flush()
+        return store.get(row_id)
+    except Exception as e:
+        st.error(f"Error loading submission: {str(e)}")
+        return None
+
+def delete_audio_file(audio_file) -> None:
+    """Release a permanently removed submission's recording; the file goes with its last reference"""
+    if audio_file and isinstance(audio_file, str):
+        try:
+            audio_store.release(audio_file)
+        except Exception as e:
+            st.error(f"Error deleting audio file: {str(e)}")
 
 def delete_submission_by_id(row_id: str, permanent: bool = False) -> bool:
     """Delete a submission by its unique id"""
     try:
-        df = load_submissions()
-        match = df[df['id'] == row_id]
-        if match.empty:
+        row = store.purge(row_id) if permanent else store.delete(row_id)
+        if row is None:
             st.error("Row not found!")
             return False
             
-        idx = match.index[0]
-        row_to_delete = df.loc[idx].copy()
-        audio_file = row_to_delete['audio_file']
-        
         if permanent:
-            # Remove from deleted_entries if it exists there
-            deleted_df = load_deleted_entries()
-            match_deleted = deleted_df[deleted_df['id'] == row_id]
-            if not match_deleted.empty:
-                deleted_df = deleted_df.drop(match_deleted.index)
-                deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-                os.chmod(DELETED_ENTRIES_FILE, 0o666)
-                
-            # Delete audio file if it exists
-            if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
-                try:
-                    os.remove(audio_file)
-                except Exception as e:
-                    st.error(f"Error deleting audio file: {str(e)}")
-        else:
-            # Move to deleted entries
-            deleted_df = load_deleted_entries()
-            deleted_df = pd.concat([deleted_df, pd.DataFrame([row_to_delete])], ignore_index=True)
-            deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-            os.chmod(DELETED_ENTRIES_FILE, 0o666)
-            
-        # Remove from main submissions
-        df = df.drop(idx)
-        df.to_csv(SUBMISSIONS_FILE, index=False)
-        os.chmod(SUBMISSIONS_FILE, 0o666)
+            delete_audio_file(row.get('audio_file'))
         return True
     except Exception as e:
         st.error(f"Deletion failed: {str(e)}")
@@ -317,55 +363,59 @@ def delete_submission_by_id(row_id: str, permanent: bool = False) -> bool:
 def restore_deleted_entry_by_id(row_id: str) -> bool:
     """Restore a deleted entry by its unique id"""
     try:
-        deleted_df = load_deleted_entries()
-        match = deleted_df[deleted_df['id'] == row_id]
-        if match.empty:
+        if store.restore(row_id) is None:
             st.error("Row not found!")
             return False
-            
-        idx = match.index[0]
-        entry = deleted_df.loc[idx].copy().to_dict()
-        
-        # Save to main submissions
-        if save_submission(entry):
-            # Remove from deleted entries
-            deleted_df = deleted_df.drop(idx)
-            deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-            os.chmod(DELETED_ENTRIES_FILE, 0o666)
-            return True
+        return True
     except Exception as e:
         st.error(f"Error restoring entry: {str(e)}")
     return False
 
 def permanently_delete_deleted_entry_by_id(row_id: str) -> bool:
-    """Permanently delete an entry from the deleted entries file by id."""
+    """Permanently delete a soft-deleted entry by id."""
     try:
-        deleted_df = load_deleted_entries()
-        match = deleted_df[deleted_df['id'] == row_id]
-        if match.empty:
+        row = store.purge(row_id, deleted=True)
+        if row is None:
             st.error("Row not found!")
             return False
 
-        idx = match.index[0]
-        row_to_delete = deleted_df.loc[idx].copy()
-        audio_file = row_to_delete['audio_file']
-
-        # Remove from deleted_entries
-        deleted_df = deleted_df.drop(idx)
-        deleted_df.to_csv(DELETED_ENTRIES_FILE, index=False)
-        os.chmod(DELETED_ENTRIES_FILE, 0o666)
-
-        # Optionally, delete audio file
-        if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
-            try:
-                os.remove(audio_file)
-            except Exception as e:
-                st.error(f"Error deleting audio file: {str(e)}")
+        delete_audio_file(row.get('audio_file'))
         return True
     except Exception as e:
         st.error(f"Permanent deletion failed: {str(e)}")
     return False
 
+def delete_submissions_by_ids(row_ids: list, permanent: bool = False) -> int:
+    """Delete several submissions in a single write and return how many were removed"""
+    try:
+        rows = store.purge_many(row_ids) if permanent else store.delete_many(row_ids)
+        if permanent:
+            for row in rows:
+                delete_audio_file(row.get('audio_file'))
+        return len(rows)
+    except Exception as e:
+        st.error(f"Bulk deletion failed: {str(e)}")
+        return 0
+
+def restore_deleted_entries_by_ids(row_ids: list) -> int:
+    """Restore several deleted entries in a single write and return how many were restored"""
+    try:
+        return len(store.restore_many(row_ids))
+    except Exception as e:
+        st.error(f"Bulk restore failed: {str(e)}")
+        return 0
+
+def permanently_delete_deleted_entries_by_ids(row_ids: list) -> int:
+    """Permanently delete several soft-deleted entries in a single write"""
+    try:
+        rows = store.purge_many(row_ids, deleted=True)
+        for row in rows:
+            delete_audio_file(row.get('audio_file'))
+        return len(rows)
+    except Exception as e:
+        st.error(f"Bulk permanent deletion failed: {str(e)}")
+        return 0
+
 def generate_qr_code(data: str) -> Tuple[str, Image.Image]:
     """Generate QR code from data"""
     try:
@@ -445,6 +495,71 @@ def show_confirmation_dialog(action: str, count: int) -> bool:
                 return False
     return False
 
+def select_rows_table(display_df: pd.DataFrame, key: str) -> list:
+    """Show rows with a selection checkbox column and return the selected ids"""
+    select_all = st.checkbox("Select all", key=f"{key}_select_all")
+    editor_df = display_df.copy()
+    editor_df.insert(0, 'Select', select_all)
+    edited_df = st.data_editor(
+        editor_df,
+        hide_index=True,
+        use_container_width=True,
+        disabled=[col for col in editor_df.columns if col != 'Select'],
+        column_config={'id': None},
+        key=f"{key}_editor"
+    )
+    return edited_df.loc[edited_df['Select'], 'id'].tolist()
+
+def select_bulk_ids(display_df: pd.DataFrame, key: str, total: int, deleted: bool = False) -> list:
+    """Ids a bulk action applies to: the rows ticked on this page, or every matching entry"""
+    if st.checkbox(f"Select all {total} matching entries", key=f"{key}_all_matching"):
+        st.caption("The action applies to every matching entry, not only the rows of this page.")
+        return load_matching_ids(deleted=deleted)
+    return select_rows_table(display_df, key)
+
+def page_cursors(key: str, signature) -> list:
+    """Keyset cursors of the pages visited so far (None for the first page)
+
+    Paging starts over when `signature` (page size, filters) changes.
+    """
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+    return st.session_state[f"{key}_cursors"]
+
+def show_pager(key: str, next_cursor: Optional[tuple], total: int, page_size: int) -> None:
+    """Newer/Older buttons stepping through the cursors kept by page_cursors()"""
+    cursors = st.session_state[f"{key}_cursors"]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Newer", key=f"{key}_newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.markdown(f"Page {len(cursors)} of {max(1, -(-total // page_size))} ({total} entries)")
+    with col3:
+        if st.button("Older ➡️", key=f"{key}_older", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def confirm_bulk_action(action: str, selected_ids: list, key: str) -> bool:
+    """Two-step confirmation for a bulk action; True once confirmed"""
+    if st.button(f"{action} Selected ({len(selected_ids)})", key=f"{key}_btn", disabled=not selected_ids):
+        st.session_state[f"pending_{key}"] = True
+    if st.session_state.get(f"pending_{key}", False) and selected_ids:
+        st.warning(f"You are about to {action.lower()} {len(selected_ids)} feedback submission(s).")
+        col1, col2 = st.columns(2)
+        with col1:
+            confirm = st.button(f"✅ Confirm {action}", key=f"{key}_confirm")
+        with col2:
+            cancel = st.button("❌ Cancel", key=f"{key}_cancel")
+        if cancel:
+            st.session_state[f"pending_{key}"] = False
+        if confirm:
+            st.session_state[f"pending_{key}"] = False
+            return True
+    return False
+
 def play_audio(filename: str) -> None:
     """Play audio with validation and download option"""
     try:
@@ -473,6 +588,7 @@ def play_audio(filename: str) -> None:
     except Exception as e:
         st.error(f"Error playing audio: {str(e)}")
 
+@timer.timed("authenticate")
 def authenticate() -> bool:
     """Handle user authentication"""
     if 'authenticated' not in st.session_state:
@@ -483,6 +599,7 @@ def authenticate() -> bool:
         st.session_state.username = None
 
     if not st.session_state.authenticated:
+        timer.section("login_page")
         try:
             moonkids_img = Image.open("play_africa_mag.jpg")
             paintingkids_img = Image.open("play2.jpg")
@@ -719,13 +836,8 @@ def handle_audio_upload() -> Optional[str]:
             else:
                 ext = "wav"  # default
             
-            # Generate unique filename with timestamp
-            filename = f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
-            audio_path = os.path.join(AUDIO_DIR, filename)
-            
-            # Save the file
-            with open(audio_path, "wb") as f:
-                f.write(upload.read())
+            # Store by content hash; re-uploading the same clip reuses the file
+            audio_path = audio_store.save(upload.getvalue(), ext)
             
             # Store in session state
             st.session_state.audio_file = audio_path
@@ -751,9 +863,11 @@ def handle_audio_upload() -> Optional[str]:
     
     return st.session_state.audio_file if st.session_state.audio_file and os.path.exists(st.session_state.audio_file) else None
 
+@timer.timed("feedback")
 def show_feedback() -> None:
     """Show feedback form"""
     colors = get_theme_colors()
+    timer.section("header")
     
     if is_mobile():
         st.markdown(f"<h2 style='color:{colors['text']}'>Play Africa Feedback</h2>", unsafe_allow_html=True)
@@ -770,8 +884,10 @@ def show_feedback() -> None:
         """, unsafe_allow_html=True)
     
     # Handle audio upload
+    timer.section("audio_upload")
     audio_file_path = handle_audio_upload()
 
+    timer.section("form")
     with st.form("feedback_form", clear_on_submit=True):
         st.markdown(f"<h3 style='color:{colors['text']}; font-size: {'18px' if is_mobile() else '20px'}'>About Your Group</h3>", unsafe_allow_html=True)
         
@@ -917,20 +1033,20 @@ def show_feedback() -> None:
                     "learning": ratings["Relevance of activities to children's learning"],
                     "planning": ratings["Planning and communication before the visit"],
                     "safety_space": ratings["Physical safety and comfort of the space"],
-                    "comments": json.dumps({
-                        "enjoyed": q1,
-                        "curiosity": q2,
-                        "support_goals": q3,
-                        "improve": q4,
-                        "recommend": q5,
-                        "future_topics": future_topics,
-                        "collaboration": future_collab
-                    }),
+                    "enjoyed": q1,
+                    "curiosity": q2,
+                    "support_goals": q3,
+                    "improve": q4,
+                    "recommend": q5,
+                    "future_topics": future_topics,
+                    "collaboration": future_collab,
                     "audio_file": audio_file_path if audio_file_path else None,
                     "device_type": "mobile" if is_mobile() else "desktop"
                 }
                 
-                if save_submission(entry):
+                with timer.span("feedback/save"):
+                    saved = save_submission(entry)
+                if saved:
                     st.success("Thank you for your feedback!")
                     st.balloons()
                     
@@ -952,11 +1068,13 @@ def show_feedback() -> None:
                     </div>
                     """, unsafe_allow_html=True)
 
+@timer.timed("dashboard")
 def show_dashboard() -> None:
     """Show admin dashboard with UUID-based deletion/restoration and comments view"""
     colors = get_theme_colors()
     st.markdown(f"<h1 style='color:{colors['text']}'>Feedback Dashboard</h1>", unsafe_allow_html=True)
     
+    timer.section("backup")
     if create_backup():
         st.toast("Backup created successfully", icon="✅")
     
@@ -964,12 +1082,17 @@ def show_dashboard() -> None:
     
     tab1, tab2, tab3 = st.tabs(["Active Feedback", "Deleted Feedback", "View Comments"])
     
+    timer.section("active_tab")
     with tab1:
-        df = load_submissions()
-        if df.empty:
+        display_cols = ['timestamp', 'school', 'group_type', 'children_no', 'children_age', 'adults_present', 'id', 'audio_file']
+        total = count_submissions()
+        if total == 0:
             st.info("No feedback submitted yet. Please check back later!")
         else:
-            display_cols = ['timestamp', 'school', 'group_type', 'children_no', 'children_age', 'adults_present', 'id']
+            # Only the rows of the current page are loaded
+            page_size = st.selectbox('Rows per page', [5, 10, 20, 50], index=1, key='active_page_size')
+            cursors = page_cursors("active_page", page_size)
+            df, next_cursor = load_submission_page(display_cols, after=cursors[-1], limit=page_size)
             for col in display_cols:
                 if col not in df.columns:
                     df[col] = 'N/A'
@@ -991,24 +1114,34 @@ def show_dashboard() -> None:
                 except:
                     pass
             
-            page_size = st.selectbox('Rows per page', [5, 10, 20, 50], index=1, key='active_page_size')
-            page_number = st.number_input('Page', min_value=1, max_value=max(1, len(display_df)//page_size + 1), 
-                                        value=1, key='active_page')
-            start_idx = (page_number - 1) * page_size
-            end_idx = min(start_idx + page_size, len(display_df))
+            with st.expander("☑️ Bulk Actions", expanded=False):
+                selected_ids = select_bulk_ids(display_df.drop(columns=['audio_file']), "active_bulk", total)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if confirm_bulk_action("Delete", selected_ids, "bulk_delete"):
+                        count = delete_submissions_by_ids(selected_ids)
+                        if count:
+                            st.success(f"{count} entries deleted")
+                            st.rerun()
+                with col2:
+                    if confirm_bulk_action("Permanently Delete", selected_ids, "bulk_perm_delete"):
+                        count = delete_submissions_by_ids(selected_ids, permanent=True)
+                        if count:
+                            st.success(f"{count} entries permanently deleted")
+                            st.rerun()
             
-            table_data = display_df.iloc[start_idx:end_idx] if not display_df.empty else display_df
+            show_pager("active_page", next_cursor, total, page_size)
             
-            for idx, row in table_data.iterrows():
+            for idx, row in display_df.iterrows():
                 row_id = row['id']
                 with st.expander(f"{row['Date']} - {row['Submitted by']}"):
                     st.write(f"Group Type: {row['Group Type']}")
                     st.write(f"Children: {row['Children']} (ages {row['Ages']})")
                     st.write(f"Adults: {row['Adults']}")
                     
-                    # Find audio file from df using id:
-                    audio_file = df.loc[df['id'] == row_id, 'audio_file'].values[0] if 'audio_file' in df.columns else None
-                    if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
+                    # The page already carries the audio path, checked against the manifest
+                    audio_file = row['audio_file']
+                    if audio_store.has(audio_file):
                         st.markdown("**Children's Voice Recording:**")
                         play_audio(audio_file)
                     else:
@@ -1046,10 +1179,17 @@ def show_dashboard() -> None:
                                 if cancel_perm:
                                     st.session_state[f"pending_perm_delete_{row_id}"] = False
     
+    timer.section("deleted_tab")
     with tab2:
-        deleted_df = load_deleted_entries()
-        if not deleted_df.empty:
-            deleted_display = deleted_df[['timestamp', 'school', 'group_type', 'id']].copy()
+        deleted_total = count_submissions(deleted=True)
+        if deleted_total > 0:
+            deleted_page_size = st.selectbox('Rows per page', [5, 10], index=0, key='deleted_page_size')
+            deleted_cursors = page_cursors("deleted_page", deleted_page_size)
+            deleted_df, deleted_next_cursor = load_submission_page(
+                ['timestamp', 'school', 'group_type', 'id', 'audio_file'], deleted=True,
+                after=deleted_cursors[-1], limit=deleted_page_size
+            )
+            deleted_display = deleted_df[['timestamp', 'school', 'group_type', 'id', 'audio_file']].copy()
             deleted_display = deleted_display.rename(columns={
                 'timestamp': 'Date',
                 'school': 'Submitted by',
@@ -1063,22 +1203,32 @@ def show_dashboard() -> None:
                 except:
                     pass
             
-            deleted_page_size = st.selectbox('Rows per page', [5, 10], index=0, key='deleted_page_size')
-            deleted_page_number = st.number_input('Page', min_value=1, 
-                                                max_value=max(1, len(deleted_display)//deleted_page_size + 1), 
-                                                value=1, key='deleted_page')
-            deleted_start_idx = (deleted_page_number - 1) * deleted_page_size
-            deleted_end_idx = min(deleted_start_idx + deleted_page_size, len(deleted_display))
+            with st.expander("☑️ Bulk Actions", expanded=False):
+                selected_deleted_ids = select_bulk_ids(deleted_display.drop(columns=['audio_file']), "deleted_bulk",
+                                                       deleted_total, deleted=True)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if confirm_bulk_action("Restore", selected_deleted_ids, "bulk_restore"):
+                        count = restore_deleted_entries_by_ids(selected_deleted_ids)
+                        if count:
+                            st.success(f"{count} entries restored")
+                            st.rerun()
+                with col2:
+                    if confirm_bulk_action("Permanently Delete", selected_deleted_ids, "bulk_perm_delete_deleted"):
+                        count = permanently_delete_deleted_entries_by_ids(selected_deleted_ids)
+                        if count:
+                            st.success(f"{count} entries permanently deleted")
+                            st.rerun()
             
-            deleted_table_data = deleted_display.iloc[deleted_start_idx:deleted_end_idx]
+            show_pager("deleted_page", deleted_next_cursor, deleted_total, deleted_page_size)
             
-            for idx, row in deleted_table_data.iterrows():
+            for idx, row in deleted_display.iterrows():
                 row_id = row['id']
                 with st.expander(f"{row['Date']} - {row['Submitted by']}"):
                     st.write(f"Group Type: {row['Group Type']}")
                     
-                    audio_file = deleted_df.loc[deleted_df['id'] == row_id, 'audio_file'].values[0] if 'audio_file' in deleted_df.columns else None
-                    if audio_file and isinstance(audio_file, str) and os.path.exists(audio_file):
+                    audio_file = row['audio_file']
+                    if audio_store.has(audio_file):
                         st.markdown("**Children's Voice Recording:**")
                         play_audio(audio_file)
                     else:
@@ -1118,133 +1268,126 @@ def show_dashboard() -> None:
         else:
             st.info("No deleted entries to display")
     
+    timer.section("comments_tab")
     with tab3:
         st.markdown(f"<h3 style='color:{colors['text']}'>User Comments</h3>", unsafe_allow_html=True)
         
-        df = load_submissions()
-        
-        if df.empty:
-            st.info("No feedback submitted yet. Please check back later!")
-            return
-        
-        # Ensure we have the comments column and it's not empty
-        if 'comments' not in df.columns or df['comments'].isna().all():
-            st.info("No comments available in the feedback submissions.")
-            return
-        
-        # Create a copy of the dataframe for comments processing
-        comments_df = df.copy()
-        
-        # Convert comments from JSON string to dictionary
-        try:
-            comments_df['comments'] = comments_df['comments'].apply(lambda x: json.loads(x) if pd.notna(x) else {})
-        except Exception as e:
-            st.error(f"Error parsing comments: {str(e)}")
-            return
-        
-        # Filter out submissions without comments
-        comments_df = comments_df[comments_df['comments'].apply(lambda x: bool(x))]
-        
-        if comments_df.empty:
-            st.info("No valid comments data available.")
-            return
-        
-        # Extract all comment fields into separate columns
-        comment_fields = ['enjoyed', 'curiosity', 'support_goals', 'improve', 'recommend', 'future_topics', 'collaboration']
-        
-        for field in comment_fields:
-            comments_df[field] = comments_df['comments'].apply(lambda x: x.get(field, ''))
-        
-        # Convert timestamp to datetime and sort
-        comments_df['date'] = pd.to_datetime(comments_df['timestamp'])
-        comments_df = comments_df.sort_values('date', ascending=False)
+        # Ranked full-text search over every comment field
+        query = st.text_input("🔎 Search comments", key="comment_search", placeholder="e.g. water play")
+        if query.strip():
+            results = search_comments(query)
+            if results:
+                st.markdown(f"**{len(results)} best matching comments**")
+                for result in results:
+                    st.markdown(f"""
+                    <div style='
+                        background: {colors['card_bg']};
+                        border-radius: 8px;
+                        padding: 15px;
+                        margin-bottom: 15px;
+                    '>
+                        <h4 style='color:{colors['text']}'>📝 {result['school']} - {str(result['timestamp'] or '')[:10]}</h4>
+                        <p style='color:{colors['text']}'>{highlight_snippet(result['snippet'])}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+            else:
+                st.warning("No comments match your search.")
         
-        # Add filtering options
+        # Pick the date range first so only the partitions covering it are read
         with st.expander("🔍 Filter Comments", expanded=True):
             col1, col2 = st.columns(2)
-            with col1:
-                school_filter = st.multiselect(
-                    "Filter by School/Organization",
-                    options=comments_df['school'].unique(),
-                    default=None,
-                    key="school_filter"
-                )
             with col2:
+                today = datetime.now().date()
                 date_range = st.date_input(
                     "Date Range",
-                    value=[comments_df['date'].min().date(), comments_df['date'].max().date()],
-                    min_value=comments_df['date'].min().date(),
-                    max_value=comments_df['date'].max().date(),
+                    value=[today - timedelta(days=90), today],
+                    max_value=today,
                     key="date_filter"
                 )
-        
-        # Apply filters
-        if school_filter:
-            comments_df = comments_df[comments_df['school'].isin(school_filter)]
-        
+        # While the second day is still being picked, the range is open-ended;
+        # a cleared range means no bounds, as in the export section
         if len(date_range) == 2:
-            start_date, end_date = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-            comments_df = comments_df[
-                (comments_df['date'] >= start_date) & 
-                (comments_df['date'] <= end_date + pd.Timedelta(days=1))  # Include the entire end date
-            ]
+            date_range = tuple(date_range)
+        elif date_range:
+            date_range = (date_range[0], None)
+        else:
+            date_range = None
         
-        # Show stats
-        st.markdown(f"**Showing {len(comments_df)} comments**")
+        # School options come from a one-column projection of the date range
+        schools = load_submissions(['school'], date_range=date_range)['school'].dropna().unique()
+        with col1:
+            school_filter = st.multiselect(
+                "Filter by School/Organization",
+                options=schools,
+                default=None,
+                key="school_filter"
+            )
+        filters = {'school': school_filter} if school_filter else None
+        
+        # Only entries with at least one comment, one page at a time
+        comment_fields = COMMENT_FIELDS
+        total = count_submissions(date_range=date_range, filters=filters, with_comments=True)
+        # An empty range is common (the default is the last 90 days), so only this tab reports it
+        if total == 0:
+            if school_filter:
+                st.info("No comments available for these filters.")
+            else:
+                st.info("No comments in this date range. Widen the Date Range above to see older feedback.")
+        else:
+            # Show stats
+            st.markdown(f"**Showing {total} comments**")
         
-        # Pagination
-        page_size = st.selectbox('Comments per page', [5, 10, 20], index=1, key='comments_page_size')
-        page_number = st.number_input('Page', min_value=1, 
-                                    max_value=max(1, len(comments_df)//page_size + 1), 
-                                    value=1, key='comments_page')
-        start_idx = (page_number - 1) * page_size
-        end_idx = min(start_idx + page_size, len(comments_df))
+            # Pagination
+            page_size = st.selectbox('Comments per page', [5, 10, 20], index=1, key='comments_page_size')
+            cursors = page_cursors("comments_page", (page_size, date_range, tuple(school_filter)))
+            comments_df, next_cursor = load_submission_page(
+                ['id', 'timestamp', 'school', *comment_fields], after=cursors[-1], limit=page_size,
+                date_range=date_range, filters=filters, with_comments=True
+            )
+            comments_df[comment_fields] = comments_df[comment_fields].fillna('')
+            comments_df['date'] = pd.to_datetime(comments_df['timestamp'])
+            show_pager("comments_page", next_cursor, total, page_size)
         
-        # Display comments
-        for idx, row in comments_df.iloc[start_idx:end_idx].iterrows():
-            with st.expander(f"📝 {row['school']} - {row['date'].strftime('%Y-%m-%d')}", expanded=False):
-                # Display each comment in a styled card
-                comment_cards = [
-                    ("What children enjoyed most", 'enjoyed'),
-                    ("Moments of curiosity/learning", 'curiosity'),
-                    ("How this supported teaching", 'support_goals'),
-                    ("Suggestions for improvement", 'improve'),
-                    ("Would you recommend us? Why?", 'recommend'),
-                    ("Future topics of interest", 'future_topics'),
-                    ("Future collaboration interest", 'collaboration')
-                ]
+            # Display comments
+            for idx, row in comments_df.iterrows():
+                with st.expander(f"📝 {row['school']} - {row['date'].strftime('%Y-%m-%d')}", expanded=False):
+                    # Display each comment in a styled card
+                    comment_cards = [
+                        ("What children enjoyed most", 'enjoyed'),
+                        ("Moments of curiosity/learning", 'curiosity'),
+                        ("How this supported teaching", 'support_goals'),
+                        ("Suggestions for improvement", 'improve'),
+                        ("Would you recommend us? Why?", 'recommend'),
+                        ("Future topics of interest", 'future_topics'),
+                        ("Future collaboration interest", 'collaboration')
+                    ]
                 
-                for title, field in comment_cards:
-                    comment = row[field]
-                    if comment:  # Only show if there's content
-                        st.markdown(f"""
-                        <div style='
-                            background: {colors['card_bg']};
-                            border-radius: 8px;
-                            padding: 15px;
-                            margin-bottom: 15px;
-                        '>
-                            <h4 style='color:{colors['text']}'>{title}:</h4>
-                            <p style='color:{colors['text']}'>{comment}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    for title, field in comment_cards:
+                        comment = row[field]
+                        if comment:  # Only show if there's content
+                            st.markdown(f"""
+                            <div style='
+                                background: {colors['card_bg']};
+                                border-radius: 8px;
+                                padding: 15px;
+                                margin-bottom: 15px;
+                            '>
+                                <h4 style='color:{colors['text']}'>{title}:</h4>
+                                <p style='color:{colors['text']}'>{comment}</p>
+                            </div>
+                            """, unsafe_allow_html=True)
         
-        # Show a message if no comments after filtering
-        if len(comments_df) == 0:
-            st.warning("No comments match your filters. Try adjusting your filter criteria.")
+            # Show a message if no comments after filtering
+            if len(comments_df) == 0:
+                st.warning("No comments match your filters. Try adjusting your filter criteria.")
 
+    timer.section("analytics")
     st.markdown(f"<h2 style='color:{colors['text']}'>Feedback Analytics</h2>", unsafe_allow_html=True)
     
-    df = load_submissions()
-    if not df.empty:
-        rating_columns = ["engagement", "safety", "cleanliness", "fun", "learning", "planning", "safety_space"]
-        for col in rating_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            else:
-                df[col] = 0
-
-        total = len(df)
+    # Counts, sums and histograms kept up to date by the store
+    rollups = load_rating_rollups()
+    total = rollups["submissions"]
+    if total > 0:
         categories_labels = [
             ("Overall experience", "engagement"),
             ("Facilitator professionalism", "safety"),
@@ -1255,9 +1398,10 @@ def show_dashboard() -> None:
             ("Space comfort & safety", "safety_space")
         ]
 
+        # Unrated answers count as 0, as they always have on these cards
         averages = {}
         for label, col in categories_labels:
-            averages[label] = round(df[col].mean(), 2) if total > 0 else 0
+            averages[label] = round(rollups["ratings"][col]["sum"] / total, 2)
 
         st.markdown(f"<h3 style='color:{colors['text']}'>Key Metrics</h3>", unsafe_allow_html=True)
         
@@ -1385,6 +1529,7 @@ def show_dashboard() -> None:
             unsafe_allow_html=True
         )
 
+        timer.section("charts")
         chart_col1, chart_col2 = st.columns([2, 1])
         
         with chart_col1:
@@ -1418,8 +1563,14 @@ def show_dashboard() -> None:
         with chart_col2:
             st.markdown(f"<h4 style='color:{colors['text']}; text-align: center;'>Rating Distribution</h4>", unsafe_allow_html=True)
             
-            rating_values = np.concatenate([df[col].values for _, col in categories_labels])
-            rating_dist = pd.Series(rating_values).value_counts().sort_index()
+            rating_counts = {0: total * len(categories_labels)}
+            for _, col in categories_labels:
+                stats = rollups["ratings"][col]
+                rating_counts[0] -= stats["count"]
+                for rating, count in enumerate(stats["histogram"], start=1):
+                    rating_counts[rating] = rating_counts.get(rating, 0) + count
+            rating_dist = pd.Series(rating_counts)
+            rating_dist = rating_dist[rating_dist > 0]
             
             pie_data = pd.DataFrame({
                 'Rating': rating_dist.index,
@@ -1437,36 +1588,127 @@ def show_dashboard() -> None:
             
             st.altair_chart(pie_chart, use_container_width=True)
 
+    timer.section("export")
     st.markdown(f"<h2 style='color:{colors['text']}'>Data Export</h2>", unsafe_allow_html=True)
     
+    # Files are only generated when an export button is clicked
+    format_labels = {"csv": "CSV", "jsonl": "JSON Lines", "parquet": "Parquet", "arrow": "Arrow IPC"}
+    with st.expander("Export Options", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            fmt = st.selectbox(
+                "Format",
+                available_formats(),
+                format_func=lambda f: format_labels[f],
+                key="export_format"
+            )
+            compress = st.checkbox(
+                "Compress (gzip)", value=False, key="export_gzip",
+                disabled=fmt in COLUMNAR_FORMATS,
+                help="Parquet and Arrow files are always compressed"
+            )
+            export_range = st.date_input("Date Range", value=[], key="export_date_range")
+        with col2:
+            options = load_export_filter_options()
+            school_filter = st.multiselect("School/Organization", options['school'], key="export_school")
+            group_filter = st.multiselect("Group Type", options['group_type'], key="export_group_type")
+    
+    filters = {}
+    if school_filter:
+        filters['school'] = school_filter
+    if group_filter:
+        filters['group_type'] = group_filter
+    date_range = None
+    if len(export_range) == 2:
+        date_range = tuple(export_range)
+    elif export_range:
+        date_range = (export_range[0], None)
+    suffix = file_suffix(fmt, compress)
+    mime = 'application/gzip' if suffix.endswith(".gz") else EXPORT_FORMATS[fmt][1]
+    
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Export Current Feedback Data"):
-            df = load_submissions()
-            if not df.empty:
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"play_africa_feedback_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime='text/csv'
-                )
+            path = export_data(fmt=fmt, compress=compress, filters=filters, date_range=date_range)
+            if path:
+                with open(path, "rb") as f:
+                    st.download_button(
+                        label=f"Download {format_labels[fmt]}",
+                        data=f,
+                        file_name=f"play_africa_feedback_{datetime.now().strftime('%Y%m%d')}.{suffix}",
+                        mime=mime
+                    )
             else:
                 st.warning("No data to export")
     
     with col2:
-        deleted_df = load_deleted_entries()
-        if not deleted_df.empty:
-            if st.button("Export Deleted Feedback Data"):
-                csv = deleted_df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"play_africa_deleted_feedback_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime='text/csv'
-                )
-        else:
-            st.warning("No deleted data to export")
+        if st.button("Export Deleted Feedback Data"):
+            path = export_data(deleted=True, fmt=fmt, compress=compress, filters=filters, date_range=date_range)
+            if path:
+                with open(path, "rb") as f:
+                    st.download_button(
+                        label=f"Download {format_labels[fmt]}",
+                        data=f,
+                        file_name=f"play_africa_deleted_feedback_{datetime.now().strftime('%Y%m%d')}.{suffix}",
+                        mime=mime
+                    )
+            else:
+                st.warning("No deleted data to export")
+
+def performance_stats() -> dict:
+    """Storage counters shown next to the timings and included in the JSON download"""
+    return {
+        "frame_cache": dict(CACHE_STATS),
+        "store_lock": lock_stats(),
+        "write_queue": {**writer.stats, "pending": writer.pending(), "last_error": writer.last_error},
+    }
+
+def show_performance() -> None:
+    """Show rolling section timings of this server process (admin only)"""
+    colors = get_theme_colors()
+    st.markdown(f"<h1 style='color:{colors['text']}'>Performance</h1>", unsafe_allow_html=True)
+    st.caption(
+        f"Render times of the app's sections across all sessions since "
+        f"{timer.started_at.strftime('%Y-%m-%d %H:%M:%S')}; percentiles cover the last {timer.window} samples of each."
+    )
+
+    rows = timer.summary()
+    if rows:
+        timings_df = pd.DataFrame(rows)
+        for col in ['p50', 'p95', 'max', 'last']:
+            timings_df[col] = (timings_df[col] * 1000).round(1)
+        timings_df = timings_df.rename(columns={
+            'span': 'Section', 'count': 'Calls', 'window': 'Samples',
+            'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'max': 'Max (ms)', 'last': 'Last (ms)'
+        })
+        st.dataframe(timings_df, hide_index=True, use_container_width=True)
+    else:
+        st.info("No timings recorded yet. Open the other pages to collect some.")
+
+    stats = performance_stats()
+    st.markdown(f"<h3 style='color:{colors['text']}'>Storage</h3>", unsafe_allow_html=True)
+    cache = stats["frame_cache"]
+    lookups = cache["hits"] + cache["misses"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Frame cache hit rate", f"{cache['hits'] / lookups:.0%}" if lookups else "n/a")
+    col2.metric("Store lock waits", stats["store_lock"]["contended"],
+                help=f"Longest wait {stats['store_lock']['max_wait_seconds']:.3f}s, "
+                     f"{stats['store_lock']['timeouts']} timeouts")
+    col3.metric("Queued submissions", stats["write_queue"]["pending"])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="Download as JSON",
+            data=timer.to_json(stats),
+            file_name=f"performance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with col2:
+        if st.button("Reset timings", use_container_width=True):
+            timer.reset()
+            st.rerun()
 
 def get_rating_stars(rating: float) -> str:
     """Generate star rating display"""
@@ -1484,8 +1726,10 @@ def get_rating_stars(rating: float) -> str:
     
     return " ".join(stars)
 
+@timer.timed("main")
 def main() -> None:
     """Main application function"""
+    timer.section("setup")
     st.set_page_config(
         page_title="Play Africa Feedback",
         page_icon=":children_crossing:",
@@ -1501,6 +1745,11 @@ def main() -> None:
     # Initialize session state for mobile detection
     if 'is_mobile' not in st.session_state:
         st.session_state.is_mobile = is_mobile()
+
+    # Count this session as active in the metrics
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    metrics.touch_session(st.session_state.session_id)
     
     # Custom CSS styling
     st.markdown(f"""
@@ -1606,6 +1855,7 @@ def main() -> None:
     """, unsafe_allow_html=True)
 
     # Handle authentication
+    timer.section("authenticate")
     if not authenticate():
         return
 
@@ -1615,6 +1865,7 @@ def main() -> None:
         return
 
     # Sidebar navigation
+    timer.section("sidebar")
     with st.sidebar:
         try:
             st.image("play_logo.jpeg", width=200)  # Replaced Lottie animation with play logo
@@ -1646,7 +1897,7 @@ def main() -> None:
         if st.session_state.role == "admin":
             menu = st.radio(
                 "Navigation",
-                ["Home", "Visitor Feedback", "Review Feedback"],
+                ["Home", "Visitor Feedback", "Review Feedback", "Performance"],
                 label_visibility="collapsed"
             )
         else:
@@ -1659,7 +1910,7 @@ def main() -> None:
         st.markdown("---")
         
         if st.session_state.role == "admin" and menu == "Review Feedback":
-            df = load_submissions()
+            df = load_submissions(['timestamp'])
             if not df.empty:
                 st.markdown(f"""
                 <div style='
@@ -1687,12 +1938,15 @@ def main() -> None:
         )
 
     # Main content routing
+    timer.section("page")
     if menu == "Home":
         show_home()
     elif menu == "Visitor Feedback":
         show_feedback()
     elif menu == "Review Feedback" and st.session_state.role == "admin":
         show_dashboard()
+    elif menu == "Performance" and st.session_state.role == "admin":
+        show_performance()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
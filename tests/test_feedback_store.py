@@ -0,0 +1,339 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from benchmarks.generate import generate_submissions, to_entries
+from feedback_store import (
+    SCHEMA_VERSION, CsvSubmissionStore, SqliteSubmissionStore, invalidate_cache, prepare_entry
+)
+
+
+def csv_store(data_dir) -> CsvSubmissionStore:
+    return CsvSubmissionStore(
+        os.path.join(data_dir, "submissions.csv"), os.path.join(data_dir, "deleted_entries.csv"),
+        partition_period="month"
+    )
+
+
+def sqlite_store(data_dir) -> SqliteSubmissionStore:
+    return SqliteSubmissionStore(os.path.join(data_dir, "submissions.db"))
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def store(request, tmp_path):
+    store = csv_store(str(tmp_path)) if request.param == "csv" else sqlite_store(str(tmp_path))
+    store.migrate()
+    return store
+
+
+def sample_entries(n: int = 300, seed: int = 1) -> list:
+    """Generated submissions plus a few without a timestamp and a few sharing one"""
+    entries = to_entries(generate_submissions(n, seed=seed, days=400, end=datetime(2025, 6, 30)))
+    for entry in entries[:5]:
+        entry['timestamp'] = None
+    for entry in entries[5:12]:
+        entry['timestamp'] = "2025-01-15T09:30:00"
+    return entries
+
+
+def test_legacy_files_migrate_to_partitions(tmp_path):
+    data_dir = str(tmp_path)
+    pd.DataFrame([
+        {"timestamp": "2024-01-02T10:00:00", "school": "Acorn", "engagement": 4,
+         "comments": json.dumps({"enjoyed": "The blocks", "improve": "More shade"})},
+        {"timestamp": "2024-03-05T11:00:00", "school": "Ubuntu", "engagement": 5, "comments": ""},
+    ]).to_csv(os.path.join(data_dir, "submissions.csv"), index=False)
+    pd.DataFrame([
+        {"id": "gone-1", "timestamp": "2023-11-20T09:00:00", "school": "Thaba", "engagement": 2,
+         "comments": json.dumps({"enjoyed": "Water play"})},
+    ]).to_csv(os.path.join(data_dir, "deleted_entries.csv"), index=False)
+
+    store = csv_store(data_dir)
+    store.migrate()
+
+    assert store.schema_version() == SCHEMA_VERSION
+    assert not os.path.exists(os.path.join(data_dir, "submissions.csv"))
+    assert not os.path.exists(os.path.join(data_dir, "deleted_entries.csv"))
+    assert sorted(os.listdir(os.path.join(data_dir, "submissions"))) == [
+        "2023-11.csv", "2023-11.idx", "2024-01.csv", "2024-01.idx", "2024-03.csv", "2024-03.idx"
+    ]
+    active = store.load_submissions()
+    assert sorted(active['school'].astype(str)) == ["Acorn", "Ubuntu"]
+    assert active['id'].str.len().gt(0).all()
+    acorn = active[active['school'] == "Acorn"].iloc[0]
+    assert (acorn['enjoyed'], acorn['improve']) == ("The blocks", "More shade")
+    deleted = store.load_deleted_entries(['id', 'enjoyed'])
+    assert deleted[['id', 'enjoyed']].values.tolist() == [["gone-1", "Water play"]]
+    assert store.rating_rollups()["submissions"] == 2
+
+    # Reading the migrated files again from scratch gives the same rows
+    invalidate_cache()
+    assert sorted(csv_store(data_dir).load_submissions()['id']) == sorted(active['id'])
+
+
+def test_delete_restore_and_purge(store):
+    ids = store.save_many(sample_entries(20))
+
+    assert store.delete(ids[0])['id'] == ids[0]
+    assert store.delete(ids[0]) is None
+    assert store.delete_many(ids[1:3]) and store.count_submissions(deleted=True) == 3
+    assert ids[0] not in set(store.load_submissions(['id'])['id'])
+    assert store.count_submissions() == 17
+    assert store.rating_rollups()["submissions"] == 17
+
+    assert store.restore(ids[0])['id'] == ids[0]
+    assert store.restore(ids[0]) is None
+    assert ids[0] in set(store.load_submissions(['id'])['id'])
+
+    # Purging only matches rows in the given state
+    assert store.purge_many([ids[1]]) == []
+    assert [row['id'] for row in store.purge_many([ids[1]], deleted=True)] == [ids[1]]
+    assert [row['id'] for row in store.purge_many([ids[3]])] == [ids[3]]
+    assert store.get(ids[1]) is None and store.get(ids[3]) is None
+    assert store.load_deleted_entries(['id'])['id'].tolist() == [ids[2]]
+    assert store.count_submissions() == 17
+    assert store.rating_rollups()["submissions"] == 17
+
+
+def test_soft_deletes_are_tombstones(tmp_path):
+    store = csv_store(str(tmp_path))
+    store.migrate()
+    ids = store.save_many(sample_entries(5))
+    partitions = {name: os.path.getsize(os.path.join(store.partition_dir, name))
+                  for name in os.listdir(store.partition_dir)}
+
+    store.delete(ids[0])
+    store.restore(ids[0])
+    store.delete(ids[0])
+
+    # The submission files are untouched; the last tombstone record decides
+    assert {name: os.path.getsize(os.path.join(store.partition_dir, name))
+            for name in os.listdir(store.partition_dir)} == partitions
+    tombstones = pd.read_csv(store.tombstone_file, dtype=str)
+    assert tombstones['deleted'].tolist() == ["1", "0", "1"]
+    assert store.load_deleted_entries(['id'])['id'].tolist() == [ids[0]]
+
+
+def test_journal_replays_a_save_interrupted_between_begin_and_commit(tmp_path):
+    data_dir = str(tmp_path)
+    store = csv_store(data_dir)
+    store.migrate()
+    store.save_many([{"timestamp": f"2025-0{month}-10T10:00:00", "school": "Acorn"} for month in (1, 2)])
+
+    entries = [
+        prepare_entry({"timestamp": "2025-01-11T10:00:00", "school": "Ubuntu", "engagement": 5}),
+        prepare_entry({"timestamp": "2025-02-11T10:00:00", "school": "Thaba", "engagement": 3}),
+    ]
+    store.journal.begin("save", {"entries": entries}, store._journal_files("save", {"entries": entries}))
+    # The process dies after the first partition was written and halfway through the second
+    store._append(store._partition_path("2025-01"), [entries[0]])
+    with open(store._partition_path("2025-02"), "ab") as f:
+        f.write(b'torn-id,2025-02-11T10:00:00,"half a rec')
+
+    invalidate_cache()
+    restarted = csv_store(data_dir)
+    assert restarted.recover() == "save"
+    assert not restarted.journal.active()
+    assert restarted.recover() is None
+
+    df = restarted.load_submissions()
+    assert sorted(df['school'].astype(str)) == ["Acorn", "Acorn", "Thaba", "Ubuntu"]
+    assert df['id'].is_unique
+    assert restarted.rating_rollups()["submissions"] == 4
+    assert restarted.rating_rollups()["ratings"]["engagement"]["sum"] == 8
+
+
+def test_journal_replays_a_delete_with_a_torn_tombstone(tmp_path):
+    store = csv_store(str(tmp_path))
+    store.migrate()
+    ids = store.save_many(sample_entries(4))
+    store.delete(ids[3])
+
+    store.journal.begin("delete", {"row_ids": ids[:2]}, store._journal_files("delete", {"row_ids": ids[:2]}))
+    with open(store.tombstone_file, "ab") as f:
+        f.write(ids[0][:10].encode())
+
+    invalidate_cache()
+    restarted = csv_store(str(tmp_path))
+    assert restarted.recover() == "delete"
+    assert sorted(restarted.load_deleted_entries(['id'])['id']) == sorted([ids[0], ids[1], ids[3]])
+    assert restarted.count_submissions() == 1
+
+
+def test_journal_replays_a_purge_interrupted_before_tombstone_compaction(tmp_path):
+    store = csv_store(str(tmp_path))
+    store.migrate()
+    ids = store.save_many(sample_entries(4))
+    store.delete_many(ids[:2])
+    assert store.recorded_counts() == {"active": 2, "deleted": 2}
+
+    args = {"row_ids": [ids[0]], "deleted": True}
+    store.journal.begin("purge", args, store._journal_files("purge", args))
+    # The process dies after the partitions were rewritten, with the tombstone still there
+    store._rewrite_without({ids[0]})
+
+    invalidate_cache()
+    restarted = csv_store(str(tmp_path))
+    assert restarted.recover() == "purge"
+    tombstones = pd.read_csv(restarted.tombstone_file, dtype=str)
+    assert ids[0] not in set(tombstones['id'])
+    assert restarted.load_deleted_entries(['id'])['id'].tolist() == [ids[1]]
+    assert restarted.count_submissions(deleted=True) == 1
+    assert restarted.recorded_counts() == {"active": 2, "deleted": 1}
+
+
+def test_torn_journal_intent_is_dropped(tmp_path):
+    store = csv_store(str(tmp_path))
+    store.migrate()
+    ids = store.save_many(sample_entries(3))
+    with open(store.journal.path, "w") as f:
+        f.write('{"op": "sa')
+
+    assert store.recover() is None
+    assert not store.journal.active()
+    assert sorted(store.load_submissions(['id'])['id']) == sorted(ids)
+
+
+def expected_order(df: pd.DataFrame) -> list:
+    return df.sort_values(['timestamp', 'id'], ascending=False, na_position='last')['id'].tolist()
+
+
+def walk_pages(store, limit: int, **kwargs) -> list:
+    ids, cursor = [], None
+    while True:
+        page, cursor = store.page_submissions(['id', 'timestamp'], after=cursor, limit=limit, **kwargs)
+        assert len(page) <= limit
+        ids += page['id'].tolist()
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"date_range": ("2025-01-01", "2025-03-31")},
+    {"with_comments": True},
+    {"deleted": True},
+])
+def test_keyset_pages_match_a_full_sort(store, kwargs):
+    ids = store.save_many(sample_entries())
+    store.delete_many(ids[::7])
+
+    if kwargs.get("deleted"):
+        full = store.load_deleted_entries(['id', 'timestamp', 'enjoyed'])
+    else:
+        full = store.load_submissions(['id', 'timestamp', *['enjoyed', 'curiosity', 'support_goals', 'improve',
+                                                           'recommend', 'future_topics', 'collaboration']],
+                                      date_range=kwargs.get("date_range"))
+    if kwargs.get("with_comments"):
+        comments = full.drop(columns=['id', 'timestamp']).fillna('').astype(str)
+        full = full[comments.ne('').any(axis=1)]
+
+    paged = walk_pages(store, 13, **kwargs)
+    assert paged == expected_order(full)
+    assert store.count_submissions(**kwargs) == len(paged)
+    assert store.submission_ids(**kwargs) == paged
+
+
+def test_keyset_pages_span_overlapping_partitions(tmp_path):
+    data_dir = str(tmp_path)
+    store = csv_store(data_dir)
+    store.migrate()
+    store.save_many([{"timestamp": f"2025-0{month}-0{day}T10:00:00", "school": "Acorn"}
+                     for month in (4, 5, 6) for day in (1, 2)])
+    # After a switch to quarters, newer rows land in a file spanning the same months
+    quarterly = CsvSubmissionStore(
+        os.path.join(data_dir, "submissions.csv"), os.path.join(data_dir, "deleted_entries.csv"),
+        partition_period="quarter"
+    )
+    quarterly.save_many([{"timestamp": "2025-04-20T10:00:00", "school": "Ubuntu"},
+                         {"timestamp": "2025-05-20T10:00:00", "school": "Ubuntu"}])
+    assert "2025-Q2.csv" in os.listdir(quarterly.partition_dir)
+
+    page, cursor = quarterly.page_submissions(['id', 'timestamp'], limit=3)
+    assert [t.isoformat() for t in page['timestamp']] == [
+        "2025-06-02T10:00:00", "2025-06-01T10:00:00", "2025-05-20T10:00:00"
+    ]
+    full = quarterly.load_submissions(['id', 'timestamp'])
+    assert walk_pages(quarterly, 3) == expected_order(full)
+
+
+def test_csv_and_sqlite_agree_on_counts_and_rollups(tmp_path):
+    os.makedirs(tmp_path / "csv")
+    os.makedirs(tmp_path / "sqlite")
+    stores = [csv_store(str(tmp_path / "csv")), sqlite_store(str(tmp_path / "sqlite"))]
+    entries = sample_entries(400, seed=7)
+    for store in stores:
+        store.migrate()
+        ids = store.save_many(entries)
+        store.delete_many(ids[::5])
+        store.restore_many(ids[::10])
+        store.purge_many(ids[1:40:3])
+
+    school = entries[50]['school']
+    for kwargs in [
+        {},
+        {"deleted": True},
+        {"date_range": ("2025-01-01", "2025-06-30")},
+        {"filters": {"school": [school]}},
+        {"with_comments": True, "date_range": ("2024-12-01", None)},
+    ]:
+        csv_count, sqlite_count = (store.count_submissions(**kwargs) for store in stores)
+        assert csv_count == sqlite_count, kwargs
+
+    csv_rollups, sqlite_rollups = (store.rating_rollups() for store in stores)
+    assert csv_rollups == sqlite_rollups
+    assert csv_rollups["submissions"] == stores[0].count_submissions()
+
+
+def test_sqlite_imports_legacy_csv_files_without_changing_them(tmp_path):
+    data_dir = str(tmp_path)
+    pd.DataFrame([
+        {"timestamp": "2024-01-02T10:00:00", "school": "Acorn", "engagement": 4,
+         "comments": json.dumps({"enjoyed": "The blocks"})},
+    ]).to_csv(os.path.join(data_dir, "submissions.csv"), index=False)
+    pd.DataFrame([
+        {"id": "gone-1", "timestamp": "2023-11-20T09:00:00", "school": "Thaba", "engagement": 2, "comments": ""},
+    ]).to_csv(os.path.join(data_dir, "deleted_entries.csv"), index=False)
+    before = {name: open(os.path.join(data_dir, name), "rb").read() for name in os.listdir(data_dir)}
+
+    store = SqliteSubmissionStore(os.path.join(data_dir, "submissions.db"), import_from=csv_store(data_dir))
+    store.migrate()
+
+    after = {name: open(os.path.join(data_dir, name), "rb").read() for name in before}
+    assert after == before
+    assert not os.path.exists(os.path.join(data_dir, "submissions"))
+    assert store.load_submissions(['school', 'enjoyed']).values.tolist() == [["Acorn", "The blocks"]]
+    assert store.load_deleted_entries(['id'])['id'].tolist() == ["gone-1"]
+    assert store.rating_rollups()["ratings"]["engagement"]["sum"] == 4
+
+
+def test_sqlite_imports_legacy_files_only_once(tmp_path):
+    data_dir = str(tmp_path)
+    pd.DataFrame([
+        {"timestamp": "2024-01-02T10:00:00", "school": "Acorn", "engagement": 4, "comments": ""},
+    ]).to_csv(os.path.join(data_dir, "submissions.csv"), index=False)
+    store = SqliteSubmissionStore(os.path.join(data_dir, "submissions.db"), import_from=csv_store(data_dir))
+    store.migrate()
+    ids = store.load_submissions(['id'])['id'].tolist()
+    assert len(ids) == 1
+
+    store.purge_many(ids)
+    # Opening the emptied database again must not bring the purged row back
+    store = SqliteSubmissionStore(os.path.join(data_dir, "submissions.db"), import_from=csv_store(data_dir))
+    store.migrate()
+    assert store.count_submissions() == 0
+    assert store.count_submissions(deleted=True) == 0
+
+
+def test_saving_a_deleted_id_again_leaves_it_deleted(store):
+    entries = sample_entries(3)
+    ids = store.save_many(entries)
+    store.delete(ids[0])
+
+    assert store.save(dict(entries[0], id=ids[0])) == ids[0]
+    assert store.count_submissions(deleted=True) == 1
+    assert store.count_submissions() == 2
+    assert store.rating_rollups()["submissions"] == 2